@@ -1,79 +1,192 @@
+import os
 import sys
+import time
+import numpy as np
 from PyQt5.QtWidgets import *
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QPoint
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal, Qt, QPoint, QPointF, QRectF
 from PyQt5.QtGui import *
-import pyaudio
-import numpy as np
-import crepe
-import wave
-import os
+from pitch_estimators import ESTIMATORS, DEFAULT_ESTIMATOR, CREPE_CAPACITIES, CrepeEstimator, crepe_runtime_options, warm_up
+from pitch_pipeline import WINDOW_SIZE, HOP_SIZE
+from recorder import StreamingRecorder
+from audio_source import create_source
+from tuning import INSTRUMENTS, TUNINGS, IN_TUNE_CENTS, A4_FREQUENCY, Tuning, cents_between, guitar_strings
+from polyphonic import StrumAnalyzer, StrumTracker
+from strobe import StrobeTuner
+from spectrum import SpectrumAnalyzer
+from estimation_scheduler import MAX_STALENESS
+from estimation_worker import EstimationWorker, FAILED
+from session_log import SessionLogger, create_session_pipeline
+from metrics import Metrics
+from multichannel import MultiChannelPipeline
 
 # Audio settings
 SAMPLE_RATE = 16000
 BUFFER_SIZE = 1024
 
-class GuitarString:
-    """
-    Represents a guitar string with a name and frequency.
+# The pitch slider spans this many cents either side of the target
+SLIDER_RANGE_CENTS = 50
 
-    Attributes:
-        name (str): The name of the guitar string (e.g., 'E', 'A', 'D', 'G', 'B', 'E').
-        frequency (float): The frequency of the guitar string in Hz.
-    """
+# The display is refreshed at most this many times per second, with the newest estimate
+DISPLAY_FPS = 60
+
+# TUNER_CREPE_MODEL / TUNER_CREPE_THREADS run CREPE from an exported ONNX or TFLite model instead of Keras
+CREPE_RUNTIME_OPTIONS = crepe_runtime_options()
+
+# The most inputs of one audio interface that can be tuned at once
+MAX_CHANNELS = 8
 
-    def __init__(self, name, frequency):
-        self.name = name
-        self.frequency = frequency
+# Spectrogram rows kept on screen (about 10 s at one row per capture block), and partials of the target marked on it
+SPECTROGRAM_HISTORY = 160
+SPECTROGRAM_MARKED_PARTIALS = 8
 
 
+def spectrogram_color_table():
+    """The 256 spectrogram colors, black through blue and red to yellow, as used by the web page"""
+    x = np.arange(256) / 255
+    red = np.clip(2 * x - 0.4, 0, 1)
+    green = np.clip(2 * x - 1, 0, 1)
+    blue = np.minimum(1, 2 * x) * (1 - np.clip(2 * x - 1, 0, 1))
+    return [qRgb(int(round(255 * r)), int(round(255 * g)), int(round(255 * b))) for r, g, b in zip(red, green, blue)]
+
 class PitchEstimationThread(QThread):
     """
-    A thread class for continuous pitch estimation using the CREPE library.
+    A thread class for continuous pitch estimation using a pluggable estimator backend.
     """
 
-    pitch_estimated = pyqtSignal(float)  # Signal emitted when a pitch is estimated
+    pitch_estimated = pyqtSignal(float, float)  # Signal emitted with the (smoothed) pitch and its confidence
     decibel_calculated = pyqtSignal(float)  # Signal emitted when the decibel rating is calculated
+    strum_analyzed = pyqtSignal(object)  # Signal emitted with the StringDeviation list of a strum analysis
+    channels_estimated = pyqtSignal(object)  # Signal emitted with the newest PitchResult (or None) of every further input
+    spectrum_computed = pyqtSignal(object)  # Signal emitted with the (rows, bins) uint8 spectrogram rows of a block
 
     def __init__(self):
         super().__init__()
         self.is_running = False  # Flag to control the thread execution
+        self.estimator_name = DEFAULT_ESTIMATOR  # Name of the pitch estimator backend to use
+        self.estimator_options = {}  # Extra options for the backend (e.g. CREPE model capacity)
+        self.window_size = WINDOW_SIZE  # Analysis window length in samples
+        self.hop_size = HOP_SIZE  # Samples between consecutive estimates
+        self.recorder = None  # StreamingRecorder that captured blocks are written to, if recording
+        self.strum_tracker = None  # StrumTracker that estimates all strings at once, in strum mode
+        self.strobe = None  # StrobeTuner that replaces the estimator while tuning to one known target, in strobe mode
+        self.spectrum = None  # SpectrumAnalyzer fed with the capture stream while the spectrogram is shown
+        self.max_staleness = float(os.environ.get('TUNER_MAX_STALENESS') or 0) or None  # Power saving: estimate at onsets only
+        self.source_spec = os.environ.get('TUNER_AUDIO_SOURCE', 'microphone')  # Where audio comes from
+        self.channels = int(os.environ.get('TUNER_CHANNELS') or 1)  # Inputs tuned at once; the first drives the main display
+        self.source = None  # The running audio source
+        self.session_log_dir = os.environ.get('TUNER_SESSION_LOG')  # Directory that session logs are written to, if any
+        self.target_pitch = 0.0  # The pitch being tuned to, recorded in session logs
+        self.metrics = Metrics(os.environ.get('TUNER_METRICS') == '1')  # Stage timings of the estimation loop
+        self.last_emit_time = 0.0  # When the latest pitch was emitted, for measuring signal delivery
+        self.metrics.gauge('queue_depth', lambda: self.source.queue_depth if self.source else 0)
+        self.metrics.gauge('dropped_blocks', lambda: self.source.dropped_blocks if self.source else 0)
 
     def run(self):
         """
         The main method of the thread, which runs the pitch estimation loop.
         """
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paFloat32,
-                        channels=1,
-                        rate=SAMPLE_RATE,
-                        input=True,
-                        frames_per_buffer=BUFFER_SIZE)
-
-        while self.is_running:
-            # Read audio data from the stream
-            data = stream.read(BUFFER_SIZE)
-            audio = np.frombuffer(data, dtype=np.float32)
-
-            # Calculate the RMS (root mean square) of the audio samples
-            rms = np.sqrt(np.mean(np.square(audio)))
-
-            # Convert RMS to decibels
-            decibels = 20 * np.log10(rms)
-
-            # Check if the decibel rating is above the threshold (-60 dB)
-            if decibels > -60:
-                # Estimate the pitch using the CREPE library
-                time, frequency, confidence, activation = crepe.predict(audio, SAMPLE_RATE, viterbi=True)
-                self.pitch_estimated.emit(frequency[-1])  # Emit the estimated pitch
-                self.decibel_calculated.emit(decibels)  # Emit the decibel rating
-            else:
-                self.pitch_estimated.emit(0)  # Emit 0 as pitch if the decibel rating is below the threshold
-                self.decibel_calculated.emit(decibels)  # Emit the decibel rating
+        # The pipeline is built from the same settings a session log records, so replays match the live run
+        settings = {'estimator': self.estimator_name, 'estimator_options': self.estimator_options,
+                    'window_size': self.window_size, 'hop_size': self.hop_size, 'max_staleness': self.max_staleness,
+                    'smoothing': True, 'block_size': BUFFER_SIZE, 'source': self.source_spec}
+        pipeline = create_session_pipeline(settings, SAMPLE_RATE, self.metrics)
+        channel_pipeline = None
+        if self.channels > 1:
+            channel_pipeline = MultiChannelPipeline(lambda channel: create_session_pipeline(settings, SAMPLE_RATE, self.metrics),
+                                                    self.channels - 1)
+        session_log = None
+        if self.session_log_dir:
+            os.makedirs(self.session_log_dir, exist_ok=True)
+            path = os.path.join(self.session_log_dir, time.strftime('session_%Y%m%d_%H%M%S.tlog'))
+            session_log = SessionLogger(path, SAMPLE_RATE, settings)
+        read_timer = self.metrics.timer('read')
+        emit_timer = self.metrics.timer('emit')
+
+        # Capture runs on the audio callback thread and keeps going while the estimator is busy
+        source = create_source(self.source_spec, SAMPLE_RATE, BUFFER_SIZE, self.channels)
+        source.start()
+        self.source = source
+
+        try:
+            while self.is_running:
+                # Wait for the next captured block, checking regularly whether we should stop
+                with read_timer:
+                    audio = source.read(timeout=0.5)
+                if audio is None:
+                    continue
+
+                # Write the block to disk if a recording is in progress
+                recorder = self.recorder
+                if recorder is not None:
+                    recorder.write(audio)
+
+                # Tune the further inputs of a multi-channel interface; the first one goes through the modes below
+                if channel_pipeline is not None:
+                    channel_results = channel_pipeline.process(audio[:, 1:])
+                    if any(channel_results):
+                        self.channels_estimated.emit([results[-1] if results else None for results in channel_results])
+                    audio = audio[:, 0]
+
+                # Spectrogram rows for the display, computed incrementally from the same blocks
+                spectrum = self.spectrum
+                if spectrum is not None:
+                    rows = spectrum.process(audio)
+                    if len(rows):
+                        self.spectrum_computed.emit(rows)
+
+                # In strum mode, estimate every string of the instrument from the chord
+                strum_tracker = self.strum_tracker
+                if strum_tracker is not None:
+                    deviations = strum_tracker.process(audio)
+                    if deviations is not None:
+                        self.strum_analyzed.emit(deviations)
+
+                # In strobe mode, only the offset from the selected target is measured
+                strobe = self.strobe
+                if strobe is not None:
+                    for reading in strobe.process(audio):
+                        self.last_emit_time = time.perf_counter()
+                        if reading is None:
+                            self.pitch_estimated.emit(0.0, 0.0)  # Silent, or the target is not what is sounding
+                        else:
+                            self.pitch_estimated.emit(reading.frequency, reading.confidence)
+                            self.decibel_calculated.emit(reading.decibels)
+                    continue
+
+                # Run every analysis window completed by this block through the pipeline
+                results = pipeline.process(audio)
+                if session_log is not None:
+                    session_log.write_block(audio)
+                    session_log.write_results(results, self.target_pitch)
+                for result in results:
+                    with emit_timer:
+                        self.last_emit_time = time.perf_counter()
+                        self.pitch_estimated.emit(result.frequency, result.confidence)  # Emit the pitch (0 below the threshold)
+                        self.decibel_calculated.emit(result.decibels)  # Emit the decibel rating
+        finally:
+            # Clean up the audio source
+            self.source = None
+            source.stop()
+            if channel_pipeline is not None:
+                channel_pipeline.close()
+            if session_log is not None:
+                session_log.close()
+
+
+class ModelWarmupThread(QThread):
+    """
+    A thread that waits for an estimator backend to finish its background warm-up.
+    """
+
+    warmed_up = pyqtSignal(object)  # Signal emitted with the finished EstimatorWarmup
+
+    def __init__(self, warmup):
+        super().__init__()
+        self.warmup = warmup
 
-        # Clean up the audio stream
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+    def run(self):
+        self.warmup.wait()
+        self.warmed_up.emit(self.warmup)
 
 
 class PitchSlider(QWidget):
@@ -82,20 +195,33 @@ class PitchSlider(QWidget):
         self.target_pitch = target_pitch
         self.estimated_pitch = 0
         self.is_estimating = False
+        self.painted_state = None  # (fill position, estimating) as last painted, to skip unchanged repaints
         self.setFixedSize(800, 50)
+        self.build_background()
+
+    def build_background(self):
+        """Build the rounded background path, which only depends on the widget size"""
+        self.background_path = QPainterPath()
+        self.background_path.addRoundedRect(0, 0, self.width(), self.height(), 25, 25)
+
+    def resizeEvent(self, event):
+        self.build_background()
+        super().resizeEvent(event)
+
+    def estimated_x(self):
+        """The x position of the estimated pitch, clamped to the slider range in cents"""
+        cents = cents_between(self.estimated_pitch, self.target_pitch) if self.estimated_pitch > 0 and self.target_pitch > 0 else 0.0
+        cents = max(-SLIDER_RANGE_CENTS, min(SLIDER_RANGE_CENTS, cents))
+        return int((cents + SLIDER_RANGE_CENTS) / (2 * SLIDER_RANGE_CENTS) * self.width())
 
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        # Create a rounded rectangle path for the slider
-        path = QPainterPath()
-        path.addRoundedRect(0, 0, self.width(), self.height(), 25, 25)
-
-        # Draw background
+        # Draw the cached background
         painter.setPen(Qt.NoPen)
         painter.setBrush(QColor(200, 200, 200))
-        painter.drawPath(path)
+        painter.drawPath(self.background_path)
 
         # Draw target pitch line
         painter.setPen(QColor(0, 0, 0))
@@ -104,27 +230,91 @@ class PitchSlider(QWidget):
 
         # Fill the section between estimated pitch and target pitch with orange color
         # only if pitch estimation is running
+        estimated_x = self.estimated_x()
         if self.is_estimating:
             painter.setPen(Qt.NoPen)
             painter.setBrush(QColor(255, 165, 0))  # Orange color
-            estimated_x = int((self.estimated_pitch - self.target_pitch + 500) / 1000 * self.width())
-            if estimated_x < target_x:
-                path = QPainterPath()
-                path.addRoundedRect(estimated_x, 0, target_x - estimated_x, self.height(), 25, 25)
-                painter.drawPath(path)
-            else:
-                path = QPainterPath()
-                path.addRoundedRect(target_x, 0, estimated_x - target_x, self.height(), 25, 25)
-                painter.drawPath(path)
+            painter.drawRoundedRect(min(estimated_x, target_x), 0, abs(estimated_x - target_x), self.height(), 25, 25)
+        self.painted_state = (estimated_x, self.is_estimating)
+
+    def set_state(self, estimated_pitch, is_estimating):
+        """Update the estimated pitch and estimating state, repainting only if the slider would change"""
+        self.estimated_pitch = estimated_pitch
+        self.is_estimating = is_estimating
+        if (self.estimated_x(), is_estimating) != self.painted_state:
+            self.update()
 
     def update_estimated_pitch(self, pitch):
-        self.estimated_pitch = pitch
-        self.update()
+        self.set_state(pitch, self.is_estimating)
 
     def set_estimating_state(self, is_estimating):
-        self.is_estimating = is_estimating
+        self.set_state(self.estimated_pitch, is_estimating)
+
+
+class SpectrogramWidget(QWidget):
+    """
+    A scrolling spectrogram of quantized SpectrumAnalyzer rows.
+
+    The rows live in a ring buffer that is a view of the pixel memory of
+    an indexed QImage, so a new row is one array copy and nothing is moved to
+    scroll: the image is painted in two parts, older rows above the ring's
+    write position and newer rows below it. The newest row is also drawn as
+    a spectrum curve, and the target's partials as vertical markers.
+    """
+
+    def __init__(self, bins, history=SPECTROGRAM_HISTORY):
+        super().__init__()
+        self.image = QImage(bins, history, QImage.Format_Indexed8)
+        self.image.setColorTable(spectrogram_color_table())
+        bits = self.image.bits()
+        bits.setsize(self.image.byteCount())
+        self.rows = np.frombuffer(bits, dtype=np.uint8).reshape(history, self.image.bytesPerLine())[:, :bins]
+        self.rows[:] = 0
+        self.next_row = 0  # Ring position the next row is written to, the oldest row on screen
+        self.marker_columns = []  # Display columns of the target's partials, the fundamental first
+        self.setFixedSize(800, 160)
+
+    def add_rows(self, rows):
+        """Append (rows, bins) uint8 rows, overwriting the oldest ones"""
+        rows = rows[-len(self.rows):]
+        first = min(len(rows), len(self.rows) - self.next_row)
+        self.rows[self.next_row:self.next_row + first] = rows[:first]
+        self.rows[:len(rows) - first] = rows[first:]
+        self.next_row = (self.next_row + len(rows)) % len(self.rows)
+        self.update()
+
+    def set_markers(self, columns):
+        self.marker_columns = columns
+        self.update()
+
+    def clear(self):
+        self.rows[:] = 0
         self.update()
 
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        history, bins = self.rows.shape
+        width, height = self.width(), self.height()
+
+        # The ring from the write position down is the older part, shown on top; the rest follows below
+        older = history - self.next_row
+        split = height * older // history
+        painter.drawImage(QRectF(0, 0, width, split), self.image, QRectF(0, self.next_row, bins, older))
+        painter.drawImage(QRectF(0, split, width, height - split), self.image, QRectF(0, 0, bins, self.next_row))
+
+        # The newest row as a spectrum curve
+        newest = self.rows[self.next_row - 1]
+        x = (np.arange(bins) + 0.5) * width / bins
+        y = height - newest * (height / 255)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(255, 255, 255, 160), 1))
+        painter.drawPolyline(QPolygonF([QPointF(px, py) for px, py in zip(x, y)]))
+
+        for index, column in enumerate(self.marker_columns):
+            painter.setPen(QColor(0, 255, 0, 200) if index == 0 else QColor(255, 255, 255, 90))
+            marker_x = (column + 0.5) * width / bins
+            painter.drawLine(QPointF(marker_x, 0), QPointF(marker_x, height))
+
 
 class PitchEstimationGUI(QWidget):
     def __init__(self):
@@ -171,6 +361,7 @@ class PitchEstimationGUI(QWidget):
         self.pitch_indicator = QWidget(self.pitch_slider)
         self.pitch_indicator.setFixedSize(100, 100)
         self.pitch_indicator.setAutoFillBackground(True)
+        self.indicator_color = None  # The color currently shown, so unchanged colors are not reapplied
         self.set_pitch_indicator_color(QColor(255, 0, 0))  # Set initial color to red
 
         # Create and configure the string label as an overlay
@@ -198,10 +389,35 @@ class PitchEstimationGUI(QWidget):
 
         # Create and configure the instrument dropdown menu
         self.instrument_dropdown = QComboBox()
-        self.instrument_dropdown.addItems(['Guitar', 'Banjo', 'Ukulele', 'Violin'])
+        self.instrument_dropdown.addItems(list(INSTRUMENTS))
         self.instrument_dropdown.currentIndexChanged.connect(self.update_instrument)
         instrument_record_layout.addWidget(self.instrument_dropdown)
 
+        # Create and configure the tuning dropdown menu, listing the alternate tunings of the instrument
+        self.tuning_dropdown = QComboBox()
+        self.tuning_dropdown.addItems(list(TUNINGS['Guitar']))
+        self.tuning_dropdown.currentIndexChanged.connect(self.update_tuning)
+        instrument_record_layout.addWidget(self.tuning_dropdown)
+
+        # Create and configure the reference pitch (A4) box
+        self.reference_spinbox = QDoubleSpinBox()
+        self.reference_spinbox.setRange(400.0, 480.0)
+        self.reference_spinbox.setSingleStep(0.5)
+        self.reference_spinbox.setDecimals(1)
+        self.reference_spinbox.setPrefix('A4 = ')
+        self.reference_spinbox.setSuffix(' Hz')
+        self.reference_spinbox.setValue(A4_FREQUENCY)
+        self.reference_spinbox.valueChanged.connect(self.update_tuning)
+        instrument_record_layout.addWidget(self.reference_spinbox)
+
+        # Create and configure the inputs spinbox, which tunes several inputs of one audio interface at once
+        self.channels_spinbox = QSpinBox()
+        self.channels_spinbox.setRange(1, MAX_CHANNELS)
+        self.channels_spinbox.setPrefix('Inputs: ')
+        self.channels_spinbox.setStyleSheet("font-size: 18px;")
+        self.channels_spinbox.setToolTip('Tune this many inputs of the audio interface, each against its own string')
+        instrument_record_layout.addWidget(self.channels_spinbox)
+
         # Create and configure the record button
         self.record_button = QPushButton('Record')
         self.record_button.setStyleSheet("font-size: 18px; padding: 5px;")
@@ -209,12 +425,33 @@ class PitchEstimationGUI(QWidget):
         self.record_button.toggled.connect(self.toggle_recording)
         instrument_record_layout.addWidget(self.record_button)
 
+        # Create and configure the estimator dropdown menu
+        self.estimator_dropdown = QComboBox()
+        self.estimator_dropdown.addItems([name.upper() for name in ESTIMATORS])
+        self.estimator_dropdown.setCurrentIndex(list(ESTIMATORS).index(DEFAULT_ESTIMATOR))
+        self.estimator_dropdown.currentIndexChanged.connect(self.update_estimator)
+        instrument_record_layout.addWidget(self.estimator_dropdown)
+
+        # Create and configure the CREPE model capacity dropdown menu
+        self.capacity_dropdown = QComboBox()
+        self.capacity_dropdown.addItems([capacity.capitalize() for capacity in CREPE_CAPACITIES])
+        self.capacity_dropdown.setCurrentIndex(CREPE_CAPACITIES.index('full'))
+        self.capacity_dropdown.currentIndexChanged.connect(self.update_estimator)
+        instrument_record_layout.addWidget(self.capacity_dropdown)
+
+        # Create the model status label, which reports when a heavy estimator is ready
+        self.model_status_label = QLabel('')
+        self.model_status_label.setStyleSheet("font-size: 14px;")
+        instrument_record_layout.addWidget(self.model_status_label)
+        self.warmup_threads = []
+        self.update_estimator(self.estimator_dropdown.currentIndex())
+
         # Add the instrument and record layout to the main layout
         layout.addLayout(instrument_record_layout)
 
         # Create and configure the string dropdown menu
         self.string_dropdown = QComboBox()
-        self.string_dropdown.addItems([f"{guitar_string.name} - {guitar_string.frequency:.2f} Hz" for guitar_string in reversed(guitar_strings)])
+        self.string_dropdown.addItems([f"{guitar_string.note} - {guitar_string.frequency:.2f} Hz" for guitar_string in reversed(guitar_strings)])
         self.string_dropdown.currentIndexChanged.connect(self.update_target_pitch)
         layout.addWidget(self.string_dropdown)
 
@@ -264,9 +501,79 @@ class PitchEstimationGUI(QWidget):
         spacer = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
         auto_custom_layout.addItem(spacer)
 
+        # Create and configure the metrics checkbox
+        self.metrics_checkbox = QCheckBox('Show Metrics')
+        self.metrics_checkbox.setStyleSheet("font-size: 18px;")
+        self.metrics_checkbox.stateChanged.connect(self.toggle_metrics)
+        auto_custom_layout.addWidget(self.metrics_checkbox)
+
+        # Create and configure the strum mode checkbox
+        self.strum_mode_checkbox = QCheckBox('Strum Mode')
+        self.strum_mode_checkbox.setStyleSheet("font-size: 18px;")
+        self.strum_mode_checkbox.stateChanged.connect(self.toggle_strum_mode)
+        auto_custom_layout.insertWidget(1, self.strum_mode_checkbox)
+
+        # Create and configure the power saving checkbox, which only runs the estimator at onsets
+        self.power_saving_checkbox = QCheckBox('Power Saving')
+        self.power_saving_checkbox.setStyleSheet("font-size: 18px;")
+        self.power_saving_checkbox.setToolTip('Run the full estimator only when a new note starts, '
+                                              'following the pitch cheaply in between')
+        auto_custom_layout.insertWidget(2, self.power_saving_checkbox)
+
+        # Create and configure the separate process checkbox, which moves capture and estimation out of the GUI process
+        self.worker_process_checkbox = QCheckBox('Separate Process')
+        self.worker_process_checkbox.setStyleSheet("font-size: 18px;")
+        self.worker_process_checkbox.setToolTip('Capture and estimate in a worker process, so the estimator '
+                                                'never competes with the display')
+        self.worker_process_checkbox.setChecked(os.environ.get('TUNER_WORKER_PROCESS') == '1')
+        auto_custom_layout.insertWidget(3, self.worker_process_checkbox)
+
+        # Create and configure the strobe mode checkbox, which measures the offset from the selected target only
+        self.strobe_mode_checkbox = QCheckBox('Strobe Mode')
+        self.strobe_mode_checkbox.setStyleSheet("font-size: 18px;")
+        self.strobe_mode_checkbox.setToolTip('Follow the phase of the target and its partials for sub-cent readings')
+        self.strobe_mode_checkbox.stateChanged.connect(self.toggle_strobe_mode)
+        auto_custom_layout.insertWidget(2, self.strobe_mode_checkbox)
+
+        # Create and configure the spectrum checkbox, which shows what the tuner hears (overtones, hum) as a spectrogram
+        self.spectrum_checkbox = QCheckBox('Spectrum')
+        self.spectrum_checkbox.setStyleSheet("font-size: 18px;")
+        self.spectrum_checkbox.setToolTip('Show a live spectrogram with the partials of the target marked')
+        self.spectrum_checkbox.stateChanged.connect(self.toggle_spectrum)
+        auto_custom_layout.insertWidget(4, self.spectrum_checkbox)
+
         # Add the automatic mode and custom pitch layout to the main layout
         layout.addLayout(auto_custom_layout)
 
+        # Create the strum panel, with one label per string, shown in strum mode
+        self.strum_panel = QWidget()
+        self.strum_layout = QHBoxLayout()
+        self.strum_panel.setLayout(self.strum_layout)
+        self.strum_panel.setVisible(False)
+        self.strum_labels = []
+        layout.addWidget(self.strum_panel)
+
+        # Create the spectrogram, shown while the spectrum checkbox is checked
+        self.spectrum_analyzer = SpectrumAnalyzer(SAMPLE_RATE, max_block_size=BUFFER_SIZE)
+        self.spectrogram = SpectrogramWidget(self.spectrum_analyzer.bins)
+        self.spectrogram.setVisible(False)
+        layout.addWidget(self.spectrogram, alignment=Qt.AlignCenter)
+
+        # Create the channel panel, with a target and a reading for every further input, shown when tuning several inputs
+        self.channel_panel = QWidget()
+        self.channel_layout = QHBoxLayout()
+        self.channel_panel.setLayout(self.channel_layout)
+        self.channel_panel.setVisible(False)
+        self.channel_targets = []
+        self.channel_labels = []
+        layout.addWidget(self.channel_panel)
+
+        # Create the metrics overlay, shown while the metrics checkbox is checked
+        self.metrics_label = QLabel()
+        self.metrics_label.setStyleSheet("font-family: monospace; font-size: 12px;")
+        self.metrics_label.setVisible(False)
+        layout.addWidget(self.metrics_label)
+
         # Set the main layout for the GUI
         self.setLayout(layout)
 
@@ -276,15 +583,46 @@ class PitchEstimationGUI(QWidget):
 
         # Create and configure the pitch estimation thread
         self.estimation_thread = PitchEstimationThread()
-        self.estimation_thread.pitch_estimated.connect(self.update_pitch)
-        self.estimation_thread.decibel_calculated.connect(self.update_decibel_rating)
+        self.estimation_thread.pitch_estimated.connect(self.on_pitch_estimated)
+        self.estimation_thread.decibel_calculated.connect(self.on_decibels_calculated)
+        self.estimation_thread.strum_analyzed.connect(self.update_strum)
+        self.estimation_thread.channels_estimated.connect(self.on_channels_estimated)
+        self.estimation_thread.spectrum_computed.connect(self.on_spectrum_computed)
+
+        # Time spent updating the widgets for each estimate, and a timer that refreshes the metrics overlay
+        self.metrics = self.estimation_thread.metrics
+        self.gui_update_timer = self.metrics.timer('gui_update')
+
+        # Estimates are coalesced and shown at most DISPLAY_FPS times per second, so a fast estimator cannot flood the event loop
+        self.pending_pitch = None
+        self.pending_decibels = None
+        self.pending_channels = None
+        self.pending_spectrum = []
+        self.display_timer = QTimer(self)
+        self.display_timer.setInterval(1000 // DISPLAY_FPS)
+        self.display_timer.timeout.connect(self.refresh_display)
+
+        # The worker process, when estimating in a separate process; its results are polled by the display timer
+        self.worker = None
+        self.metrics_refresh_timer = QTimer(self)
+        self.metrics_refresh_timer.timeout.connect(self.update_metrics_overlay)
+        if self.metrics.enabled:
+            self.metrics_checkbox.setChecked(True)
+        if self.estimation_thread.max_staleness:
+            self.power_saving_checkbox.setChecked(True)
+        self.channels_spinbox.setValue(min(self.estimation_thread.channels, MAX_CHANNELS))
+        self.channels_spinbox.valueChanged.connect(self.update_channels)
+        self.update_channels(self.channels_spinbox.value())
 
         # Initialize recording variables
         self.recording = False
-        self.audio_frames = []
+        self.recorder = None
 
     def set_pitch_indicator_color(self, color):
         """Set the color of the pitch indicator widget"""
+        if color == self.indicator_color:
+            return  # Avoid rebuilding the palette and repainting for an unchanged color
+        self.indicator_color = color
         palette = self.pitch_indicator.palette()
         palette.setColor(QPalette.Window, color)
         self.pitch_indicator.setPalette(palette)
@@ -300,28 +638,73 @@ class PitchEstimationGUI(QWidget):
     def update_instrument(self, index):
         """Update the instrument based on the selected instrument from the dropdown menu"""
         instrument = self.instrument_dropdown.currentText()
+
+        # List the tunings of the new instrument without reloading the strings for each one
+        self.tuning_dropdown.blockSignals(True)
+        self.tuning_dropdown.clear()
+        self.tuning_dropdown.addItems(list(TUNINGS[instrument]))
+        self.tuning_dropdown.blockSignals(False)
         self.load_instrument_strings(instrument)
 
+    def update_tuning(self, value):
+        """Reload the strings when the tuning or the reference pitch changes"""
+        self.load_instrument_strings(self.instrument_dropdown.currentText())
+
+    def update_estimator(self, index):
+        """Only offer the model capacity choice when the CREPE estimator is selected, and load the model in the background"""
+        is_crepe = self.estimator_dropdown.currentText().lower() == CrepeEstimator.name
+        self.capacity_dropdown.setEnabled(is_crepe)
+        if not is_crepe:
+            self.model_status_label.setText('')
+            return
+
+        # The model loads and runs a dummy inference off the GUI thread; pressing Start meanwhile just waits for it
+        capacity = self.capacity_dropdown.currentText().lower()
+        warmup = warm_up(CrepeEstimator.name, SAMPLE_RATE, model_capacity=capacity, **CREPE_RUNTIME_OPTIONS)
+        if warmup.ready.is_set():
+            self.show_warmup_status(warmup)
+            return
+        self.model_status_label.setText(f'Loading CREPE ({capacity})...')
+        thread = ModelWarmupThread(warmup)
+        thread.warmed_up.connect(self.show_warmup_status)
+        thread.finished.connect(lambda: self.warmup_threads.remove(thread))
+        self.warmup_threads.append(thread)
+        thread.start()
+
+    def show_warmup_status(self, warmup):
+        """Report the outcome of a model warm-up, if it is for the currently selected model"""
+        capacity = self.capacity_dropdown.currentText().lower()
+        if self.estimator_dropdown.currentText().lower() != warmup.name or warmup.options.get('model_capacity') != capacity:
+            return
+        if warmup.error is not None:
+            self.model_status_label.setText(f'CREPE failed to load: {warmup.error}')
+        else:
+            self.model_status_label.setText(f'CREPE ({capacity}) ready in {warmup.load_time:.1f} s')
+
     def load_instrument_strings(self, instrument):
-        """Load the strings for the selected instrument"""
-        if instrument == 'Guitar':
-            self.instrument_strings = guitar_strings
-        elif instrument == 'Banjo':
-            self.instrument_strings = banjo_strings
-        elif instrument == 'Ukulele':
-            self.instrument_strings = ukulele_strings
-        elif instrument == 'Violin':
-            self.instrument_strings = violin_strings
+        """Load the strings for the selected instrument, tuning and reference pitch"""
+        tuning = self.tuning_dropdown.currentText()
+        self.tuning = Tuning(instrument, tuning if tuning in TUNINGS[instrument] else None, self.reference_spinbox.value())
+        self.instrument_strings = self.tuning.strings
 
         self.string_dropdown.clear()
-        self.string_dropdown.addItems([f"{string.name} - {string.frequency:.2f} Hz" for string in reversed(self.instrument_strings)])
+        self.string_dropdown.addItems([f"{string.note} - {string.frequency:.2f} Hz" for string in reversed(self.instrument_strings)])
         self.update_target_pitch(0)
+        if self.strum_mode_checkbox.isChecked():
+            self.setup_strum_mode()
+        self.setup_channel_panel()
 
     def update_target_pitch(self, index):
         """Update the target pitch based on the selected string from the dropdown menu"""
+        if index < 0:
+            return  # The dropdown is being cleared
+
         self.target_pitch = self.instrument_strings[len(self.instrument_strings) - index - 1].frequency
         self.target_pitch_label.setText(f'Target Pitch: {self.target_pitch:.2f} Hz')
         self.pitch_slider.target_pitch = self.target_pitch
+        self.estimation_thread.target_pitch = self.target_pitch
+        self.setup_strobe_mode()
+        self.update_spectrum_markers()
         self.pitch_slider.update()
 
         # Update the string label with the selected string name
@@ -345,6 +728,9 @@ class PitchEstimationGUI(QWidget):
                 self.target_pitch = float(custom_pitch)
                 self.target_pitch_label.setText(f'Target Pitch: {self.target_pitch:.2f} Hz')
                 self.pitch_slider.target_pitch = self.target_pitch
+                self.estimation_thread.target_pitch = self.target_pitch
+                self.setup_strobe_mode()
+                self.update_spectrum_markers()
                 self.pitch_slider.update()
 
                 # Clear the string label text when a custom pitch is set
@@ -359,17 +745,62 @@ class PitchEstimationGUI(QWidget):
             index = self.string_dropdown.currentIndex()
             self.update_target_pitch(index)
 
-        self.estimation_thread.is_running = True
-        self.estimation_thread.start()
+        self.estimation_thread.estimator_name = self.estimator_dropdown.currentText().lower()
+        if self.estimation_thread.estimator_name == CrepeEstimator.name:
+            self.estimation_thread.estimator_options = {'model_capacity': self.capacity_dropdown.currentText().lower(),
+                                                        **CREPE_RUNTIME_OPTIONS}
+        else:
+            self.estimation_thread.estimator_options = {}
+        if self.power_saving_checkbox.isChecked():
+            self.estimation_thread.max_staleness = self.estimation_thread.max_staleness or MAX_STALENESS
+        else:
+            self.estimation_thread.max_staleness = None
+
+        if self.worker_process_checkbox.isChecked():
+            # Audio stays in the worker process, so recording, strum, strobe mode and the spectrum are unavailable meanwhile
+            self.worker = EstimationWorker(SAMPLE_RATE, BUFFER_SIZE, self.estimation_thread.source_spec)
+            self.worker.start(self.estimation_thread.estimator_name, self.estimation_thread.estimator_options,
+                              self.estimation_thread.window_size, self.estimation_thread.hop_size,
+                              self.estimation_thread.max_staleness)
+            self.record_button.setEnabled(False)
+            self.strum_mode_checkbox.setChecked(False)
+            self.strum_mode_checkbox.setEnabled(False)
+            self.strobe_mode_checkbox.setChecked(False)
+            self.strobe_mode_checkbox.setEnabled(False)
+            self.spectrum_checkbox.setChecked(False)
+            self.spectrum_checkbox.setEnabled(False)
+        else:
+            self.estimation_thread.is_running = True
+            self.estimation_thread.start()
+        self.display_timer.start()
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
+        self.estimator_dropdown.setEnabled(False)
+        self.capacity_dropdown.setEnabled(False)
+        self.power_saving_checkbox.setEnabled(False)
+        self.worker_process_checkbox.setEnabled(False)
+        self.channels_spinbox.setEnabled(False)
 
     def stop_estimation(self):
         """Stop the pitch estimation thread"""
         self.estimation_thread.is_running = False
         self.estimation_thread.wait()
+        self.display_timer.stop()
+        self.refresh_display()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+        self.record_button.setEnabled(True)
+        self.strum_mode_checkbox.setEnabled(True)
+        self.strobe_mode_checkbox.setEnabled(True)
+        self.spectrum_checkbox.setEnabled(True)
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
+        self.estimator_dropdown.setEnabled(True)
+        self.power_saving_checkbox.setEnabled(True)
+        self.worker_process_checkbox.setEnabled(self.channels_spinbox.value() == 1)
+        self.channels_spinbox.setEnabled(not self.recording)  # The recording's channel count is fixed
+        self.update_estimator(self.estimator_dropdown.currentIndex())
 
     def toggle_auto_mode(self, state):
         """Toggle automatic mode based on the checkbox state"""
@@ -385,39 +816,211 @@ class PitchEstimationGUI(QWidget):
                 self.custom_pitch_entry.setVisible(True)  # Show the custom pitch entry box if custom pitch is checked
                 self.custom_pitch_button.setVisible(True)  # Show the custom pitch button if custom pitch is checked
 
-    def find_closest_string(self, estimated_pitch):
-        """Find the string with the closest frequency to the estimated pitch"""
-        closest_string = None
-        min_difference = float('inf')
-
+    def toggle_strum_mode(self, state):
+        """Estimate all strings from one strum while the checkbox is checked"""
+        if state == Qt.Checked:
+            self.setup_strum_mode()
+        else:
+            self.estimation_thread.strum_tracker = None
+        self.strum_panel.setVisible(state == Qt.Checked)
+
+    def setup_strum_mode(self):
+        """Create the strum tracker and one label per string for the current instrument"""
+        frequencies = [string.frequency for string in self.instrument_strings]
+        self.estimation_thread.strum_tracker = StrumTracker(StrumAnalyzer(frequencies, SAMPLE_RATE), max_block_size=BUFFER_SIZE)
+
+        for label in self.strum_labels:
+            self.strum_layout.removeWidget(label)
+            label.deleteLater()
+        self.strum_labels = []
         for string in self.instrument_strings:
-            difference = abs(estimated_pitch - string.frequency)
-            if difference < min_difference:
-                min_difference = difference
-                closest_string = string
+            label = QLabel(f'{string.name}\n-')
+            label.setAlignment(Qt.AlignCenter)
+            label.setFixedSize(100, 60)
+            label.setStyleSheet("font-size: 18px; color: white; background-color: rgb(200, 200, 200);")
+            self.strum_layout.addWidget(label)
+            self.strum_labels.append(label)
+
+    def update_strum(self, deviations):
+        """Show the cents offset of every string from a strum analysis"""
+        if [deviation.target for deviation in deviations] != [string.frequency for string in self.instrument_strings]:
+            return  # The instrument changed while the analysis was in flight
+
+        for label, string, deviation in zip(self.strum_labels, self.instrument_strings, deviations):
+            if deviation.cents is None:
+                label.setText(f'{string.name}\n-')
+                color = 'rgb(200, 200, 200)'  # Gray when the string is not sounding
+            else:
+                label.setText(f'{string.name}\n{deviation.cents:+.1f} c')
+                color = 'rgb(0, 200, 0)' if abs(deviation.cents) <= IN_TUNE_CENTS else 'rgb(255, 0, 0)'
+            label.setStyleSheet(f"font-size: 18px; color: white; background-color: {color};")
 
-        return closest_string
+    def toggle_strobe_mode(self, state):
+        """Measure the offset from the target with the strobe instead of estimating the pitch while the checkbox is checked"""
+        if state == Qt.Checked:
+            # The strobe needs a fixed target, so the string is not chosen automatically meanwhile
+            self.auto_mode_checkbox.setChecked(False)
+        self.auto_mode_checkbox.setEnabled(state != Qt.Checked)
+        self.setup_strobe_mode()
+
+    def setup_strobe_mode(self):
+        """Create the strobe for the current target, or remove it when strobe mode is off"""
+        target = getattr(self, 'target_pitch', None)
+        if self.strobe_mode_checkbox.isChecked() and target:
+            self.estimation_thread.strobe = StrobeTuner(target, SAMPLE_RATE, max_block_size=BUFFER_SIZE)
+        else:
+            self.estimation_thread.strobe = None
+
+    def update_channels(self, channels):
+        """Tune this many inputs from the next start on"""
+        self.estimation_thread.channels = channels
+        if channels > 1:
+            # The worker process captures a single input
+            self.worker_process_checkbox.setChecked(False)
+        self.worker_process_checkbox.setEnabled(channels == 1)
+        if hasattr(self, 'instrument_strings'):
+            self.setup_channel_panel()
+
+    def setup_channel_panel(self):
+        """Create a target dropdown and a reading label for every input after the first"""
+        previous = [dropdown.currentIndex() for dropdown in self.channel_targets]
+        while self.channel_layout.count():
+            self.channel_layout.takeAt(0).widget().deleteLater()
+        self.channel_targets = []
+        self.channel_labels = []
+
+        # Further inputs default to the other strings, so a rig of several instruments starts out sensible
+        strings = list(reversed(self.instrument_strings))
+        for channel in range(1, self.channels_spinbox.value()):
+            dropdown = QComboBox()
+            dropdown.setStyleSheet("font-size: 14px;")
+            for string in strings:
+                dropdown.addItem(f'Input {channel + 1}: {string.note} - {string.frequency:.2f} Hz', string.frequency)
+            keep = channel - 1 < len(previous) and previous[channel - 1] >= 0
+            dropdown.setCurrentIndex(min(previous[channel - 1], len(strings) - 1) if keep else channel % len(strings))
+            label = QLabel('-')
+            label.setAlignment(Qt.AlignCenter)
+            label.setFixedSize(180, 40)
+            label.setStyleSheet("font-size: 16px; color: white; background-color: rgb(200, 200, 200);")
+            column = QWidget()
+            column_layout = QVBoxLayout()
+            column_layout.setContentsMargins(0, 0, 0, 0)
+            column_layout.addWidget(dropdown)
+            column_layout.addWidget(label)
+            column.setLayout(column_layout)
+            self.channel_layout.addWidget(column)
+            self.channel_targets.append(dropdown)
+            self.channel_labels.append(label)
+        self.channel_panel.setVisible(bool(self.channel_labels))
+
+    def on_channels_estimated(self, results):
+        """Keep the newest estimate of every further input until the next display refresh"""
+        pending = self.pending_channels or [None] * len(results)
+        self.pending_channels = [result if result is not None else kept for result, kept in zip(results, pending)]
+
+    def update_channels_display(self, results):
+        """Show the offset of every further input from its own target"""
+        for label, dropdown, result in zip(self.channel_labels, self.channel_targets, results):
+            if result is None:
+                continue
+            if result.frequency == 0:
+                label.setText('-')
+                color = 'rgb(200, 200, 200)'  # Gray when the input is silent
+            else:
+                cents = cents_between(result.frequency, dropdown.currentData())
+                label.setText(f'{result.frequency:.2f} Hz ({cents:+.0f} c)')
+                color = 'rgb(0, 200, 0)' if abs(cents) <= IN_TUNE_CENTS else 'rgb(255, 0, 0)'
+            label.setStyleSheet(f"font-size: 16px; color: white; background-color: {color};")
 
-    def update_pitch(self, estimated_pitch):
-        """Update the pitch labels and indicators based on the estimated pitch"""
+    def toggle_spectrum(self, state):
+        """Feed the spectrum analyzer and show the spectrogram while the checkbox is checked"""
+        if state == Qt.Checked:
+            # A fresh stream, so the rows do not start with audio from before the spectrogram was hidden
+            self.spectrum_analyzer.reset()
+            self.spectrogram.clear()
+            self.update_spectrum_markers()
+            self.estimation_thread.spectrum = self.spectrum_analyzer
+        else:
+            self.estimation_thread.spectrum = None
+            self.pending_spectrum = []
+        self.spectrogram.setVisible(state == Qt.Checked)
+
+    def update_spectrum_markers(self):
+        """Mark the target's partials that fall inside the spectrogram"""
+        target = getattr(self, 'target_pitch', None)
+        if not target or not hasattr(self, 'spectrogram'):
+            return
+        analyzer = self.spectrum_analyzer
+        frequencies = [target * partial for partial in range(1, SPECTROGRAM_MARKED_PARTIALS + 1)]
+        self.spectrogram.set_markers([analyzer.frequency_column(frequency) for frequency in frequencies
+                                      if analyzer.min_frequency <= frequency < analyzer.max_frequency])
+
+    def on_spectrum_computed(self, rows):
+        """Keep the spectrogram rows until the next display refresh, which adds them all at once"""
+        self.pending_spectrum.append(rows)
+
+    def find_closest_string(self, estimated_pitch):
+        """Find the string closest to the estimated pitch in cents"""
+        return self.tuning.closest_string(estimated_pitch)
+
+    def on_pitch_estimated(self, estimated_pitch, confidence):
+        """Keep the newest pitch emitted by the estimation thread until the next display refresh"""
+        if self.metrics.enabled:
+            self.metrics.observe('signal_delivery', time.perf_counter() - self.estimation_thread.last_emit_time)
+            if self.pending_pitch is not None:
+                self.metrics.increment('estimates_coalesced')
+        self.pending_pitch = (estimated_pitch, confidence)
+
+    def on_decibels_calculated(self, decibels):
+        """Keep the newest decibel rating until the next display refresh"""
+        self.pending_decibels = decibels
+
+    def poll_worker(self):
+        """Take the newest result from the worker process's shared-memory ring"""
+        results = self.worker.read()
+        if len(results):
+            newest = results[-1]
+            if self.metrics.enabled:
+                self.metrics.observe('signal_delivery', time.monotonic() - newest['published'])
+                self.metrics.increment('estimates_coalesced', len(results) - 1)
+            self.pending_pitch = (float(newest['frequency']), float(newest['confidence']))
+            self.pending_decibels = float(newest['decibels'])
+        elif self.worker.status == FAILED:
+            worker, self.worker = self.worker, None
+            error = worker.failure()
+            worker.stop()
+            self.stop_estimation()
+            QMessageBox.warning(self, 'Estimation Failed', f'The estimation process stopped: {error}')
+
+    def refresh_display(self):
+        """Show the newest estimate, if one arrived since the last refresh"""
+        if self.worker is not None:
+            self.poll_worker()
+        if self.pending_pitch is None and self.pending_decibels is None and self.pending_channels is None \
+                and not self.pending_spectrum:
+            return
+        with self.gui_update_timer:
+            if self.pending_spectrum:
+                self.spectrogram.add_rows(np.concatenate(self.pending_spectrum))
+                self.pending_spectrum = []
+            if self.pending_channels is not None:
+                self.update_channels_display(self.pending_channels)
+                self.pending_channels = None
+            if self.pending_pitch is not None:
+                self.update_pitch(*self.pending_pitch)
+                self.pending_pitch = None
+            if self.pending_decibels is not None:
+                self.update_decibel_rating(self.pending_decibels)
+                self.pending_decibels = None
+
+    def update_pitch(self, estimated_pitch, confidence=1.0):
+        """Update the pitch labels and indicators based on the estimated pitch and its confidence"""
         if estimated_pitch == 0:
             self.estimated_pitch_label.setText('Estimated Pitch: -')
             self.set_pitch_indicator_color(QColor(200, 200, 200))  # Set color to gray when no sound is detected
-            self.pitch_slider.update_estimated_pitch(0)
-            self.pitch_slider.set_estimating_state(False)  # Set the estimating state to False
+            self.pitch_slider.set_state(0, False)
         else:
-            self.estimated_pitch_label.setText(f'Estimated Pitch: {estimated_pitch:.2f} Hz')
-            pitch_difference = estimated_pitch - self.target_pitch
-
-            if abs(pitch_difference) <= 10:
-                self.set_pitch_indicator_color(QColor(0, 255, 0))  # Green color
-            else:
-                self.set_pitch_indicator_color(QColor(255, 0, 0))  # Red color
-
-            self.pitch_slider.update_estimated_pitch(estimated_pitch)
-            self.pitch_slider.set_estimating_state(True)  # Set the estimating state to True
-
-            # Automatically choose the closest string if auto mode is enabled
+            # Automatically choose the closest string if auto mode is enabled, before judging the tuning
             if self.auto_mode_checkbox.isChecked():
                 closest_string = self.find_closest_string(estimated_pitch)
                 if closest_string:
@@ -425,76 +1028,81 @@ class PitchEstimationGUI(QWidget):
                     self.string_dropdown.setCurrentIndex(len(self.instrument_strings) - index - 1)
                     self.update_target_pitch(len(self.instrument_strings) - index - 1)
 
+            # The strobe resolves fractions of a cent, so show them
+            cents = cents_between(estimated_pitch, self.target_pitch)
+            precision = 1 if self.estimation_thread.strobe is not None else 0
+            self.estimated_pitch_label.setText(f'Estimated Pitch: {estimated_pitch:.2f} Hz ({cents:+.{precision}f} c, '
+                                               f'{100 * confidence:.0f}% confidence)')
+
+            if abs(cents) <= IN_TUNE_CENTS:
+                self.set_pitch_indicator_color(QColor(0, 255, 0))  # Green color
+            else:
+                self.set_pitch_indicator_color(QColor(255, 0, 0))  # Red color
+
+            self.pitch_slider.set_state(estimated_pitch, True)
+
     def update_decibel_rating(self, decibels):
-        """Update the decibel rating label"""
+        """Update the decibel rating label (the pipeline's gate already decides whether a pitch is shown)"""
         self.decibel_label.setText(f'Decibel Rating: {decibels:.2f} dB')
 
-        # Set the estimating state based on the decibel rating
-        if decibels > -60:
-            self.pitch_slider.set_estimating_state(True)
+    def toggle_metrics(self, state):
+        """Enable the hot-path instrumentation and show its overlay while the checkbox is checked"""
+        enabled = state == Qt.Checked
+        self.metrics.enabled = enabled
+        self.metrics_label.setVisible(enabled)
+        if enabled:
+            self.metrics_refresh_timer.start(1000)
+            self.update_metrics_overlay()
         else:
-            self.pitch_slider.set_estimating_state(False)
+            self.metrics_refresh_timer.stop()
+
+    def update_metrics_overlay(self):
+        """Show rolling stage timings, frame counts and queue depth"""
+        summary = self.metrics.summary()
+        lines = [f"{stage:<16} n={stats['count']:<8} p50={1000 * stats['p50']:7.3f} ms  p99={1000 * stats['p99']:7.3f} ms"
+                 for stage, stats in sorted(summary['stages'].items())]
+        counts = {**summary['counters'], **summary['gauges']}
+        lines.append('  '.join(f'{name}={value}' for name, value in sorted(counts.items())))
+        self.metrics_label.setText('\n'.join(lines))
 
     def toggle_recording(self, checked):
         """Toggle audio recording"""
         self.recording = checked
+        self.channels_spinbox.setEnabled(not checked and not self.stop_button.isEnabled())
         if self.recording:
-            self.audio_frames = []  # Clear previous recording
+            # Captured blocks are streamed to a temporary file by the estimation thread
+            self.recorder = StreamingRecorder(SAMPLE_RATE, self.estimation_thread.channels)
+            self.estimation_thread.recorder = self.recorder
             self.record_button.setText('Stop Recording')
         else:
+            self.estimation_thread.recorder = None
             self.record_button.setText('Record')
             self.save_recording()
 
     def save_recording(self):
         """Save the recorded audio to a WAV file"""
-        if len(self.audio_frames) > 0:
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return
+
+        recorder.stop()
+        if recorder.frames > 0:
             wav_file = QFileDialog.getSaveFileName(self, 'Save Recording', '', 'WAV Files (*.wav)')[0]
             if wav_file:
-                wf = wave.open(wav_file, 'wb')
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(SAMPLE_RATE)
-                wf.writeframes(b''.join(self.audio_frames))
-                wf.close()
+                recorder.save_as(wav_file)
+                return
+        recorder.discard()
 
     def closeEvent(self, event):
         """Handle the window close event"""
         self.stop_estimation()
+        if self.recorder is not None:
+            self.estimation_thread.recorder = None
+            self.recorder.discard()
         event.accept()
 
 
 if __name__ == '__main__':
-    guitar_strings = [
-        GuitarString('E', 82.41),
-        GuitarString('A', 110.00),
-        GuitarString('D', 146.83),
-        GuitarString('G', 196.00),
-        GuitarString('B', 246.94),
-        GuitarString('E', 329.63)
-    ]
-
-    banjo_strings = [
-        GuitarString('D', 294),
-        GuitarString('B', 248),
-        GuitarString('G', 196),
-        GuitarString('D', 147),
-        GuitarString('G', 98)
-    ]
-
-    ukulele_strings = [
-        GuitarString('A', 440),
-        GuitarString('E', 329.63),
-        GuitarString('C', 261.63),
-        GuitarString('G', 392)
-    ]
-
-    violin_strings = [
-        GuitarString('G', 196),
-        GuitarString('D', 293.66),
-        GuitarString('A', 440),
-        GuitarString('E', 659.25)
-    ]
-
     app = QApplication(sys.argv)
     gui = PitchEstimationGUI()
     gui.load_instrument_strings('Guitar')  # Set the default instrument to Guitar
@@ -1,109 +1,242 @@
-from flask import Flask, render_template, jsonify, request
-import pyaudio
+from flask import Flask, Response, render_template, jsonify, request, session
+import base64
+import json
+import multiprocessing
+import os
+import uuid
 import numpy as np
-import crepe
-import threading
+from pitch_estimators import DEFAULT_ESTIMATOR, CrepeEstimator, create_estimator, crepe_runtime_options, warm_up
+from pitch_pipeline import PitchPipeline, WINDOW_SIZE, HOP_SIZE
+from estimation_scheduler import EstimationScheduler
+from pitch_smoothing import PitchSmoother
+from estimation_engine import EstimationEngine
+from upload_sessions import UploadSessionStore
+from tuning import TUNINGS, IN_TUNE_CENTS, A4_FREQUENCY, Tuning
 
 app = Flask(__name__)
 
+# Sessions identify clients of the shared estimation engine
+app.secret_key = os.environ.get('TUNER_SECRET_KEY') or os.urandom(16)
+
 # Audio settings
 SAMPLE_RATE = 16000
 BUFFER_SIZE = 1024
 
-# Global variables for storing estimated pitch and decibels
-estimated_pitch_value = 0
-decibels_value = 0
-
-class GuitarString:
-    def __init__(self, name, frequency):
-        self.name = name
-        self.frequency = frequency
-
-# List of guitar strings with their names and frequencies
-guitar_strings = [
-    GuitarString('E', 82.41),
-    GuitarString('A', 110.00),
-    GuitarString('D', 146.83),
-    GuitarString('G', 196.00),
-    GuitarString('B', 246.94),
-    GuitarString('E', 329.63)
-]
-
-# Add the Banjo strings
-banjo_strings = [
-    GuitarString('D', 294),
-    GuitarString('B', 248),
-    GuitarString('G', 196),
-    GuitarString('D#', 147),
-    GuitarString('G#', 393)
-]
-
-# Create a PyAudio object
-p = pyaudio.PyAudio()
-stream = None
+# One capture and estimation thread shared by every client session.
+# TUNER_AUDIO_SOURCE selects the input: 'microphone' (default), 'synthetic' or 'file:<path.wav>'.
+# TUNER_METRICS=1 turns on the stage timings exported at /metrics.
+# TUNER_MAX_STALENESS=0.25 only runs the estimator at onsets and at least every 0.25 s, tracking the pitch in between.
+# TUNER_WORKER_PROCESS=1 runs capture and estimation in a separate process that hands results back through shared memory.
+# TUNER_CHANNELS=4 tunes the first four inputs of the interface independently (/estimate_pitch?channel=N).
+MAX_STALENESS = float(os.environ.get('TUNER_MAX_STALENESS') or 0) or None
+engine = EstimationEngine(SAMPLE_RATE, BUFFER_SIZE, os.environ.get('TUNER_AUDIO_SOURCE', 'microphone'),
+                          metrics_enabled=os.environ.get('TUNER_METRICS') == '1', max_staleness=MAX_STALENESS,
+                          worker_process=os.environ.get('TUNER_WORKER_PROCESS') == '1',
+                          channels=int(os.environ.get('TUNER_CHANNELS') or 1))
+
+# Per-session pipelines for audio captured in the browser and posted to /upload_audio
+upload_sessions = UploadSessionStore()
+engine.metrics.gauge('upload_sessions', lambda: len(upload_sessions))
+
+# TUNER_CREPE_MODEL / TUNER_CREPE_THREADS run CREPE from an exported ONNX or TFLite model instead of Keras
+CREPE_RUNTIME_OPTIONS = crepe_runtime_options()
+
+def estimator_options(name, model_capacity=None):
+    """The options for an estimator backend, including the CREPE runtime selected in the environment"""
+    options = {'model_capacity': model_capacity} if model_capacity else {}
+    if name == CrepeEstimator.name:
+        options.update(CREPE_RUNTIME_OPTIONS)
+    return options
+
+# Heavy estimators listed in TUNER_WARMUP (e.g. 'crepe:tiny,crepe:full') are loaded in the background at startup.
+# Estimation worker processes re-import this module when they are spawned; they load their own estimator.
+if multiprocessing.parent_process() is None:
+    for spec in filter(None, os.environ.get('TUNER_WARMUP', '').split(',')):
+        name, _, capacity = spec.partition(':')
+        warm_up(name, SAMPLE_RATE, **estimator_options(name, capacity))
+
+# Largest accepted upload, in frames, and the sample formats the browser may send
+MAX_UPLOAD_FRAMES = 65536
+UPLOAD_FORMATS = {'float32': np.dtype('<f4'), 'int16': np.dtype('<i2')}
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_KEEPALIVE = 15
 
 @app.route('/')
 def index():
-    instrument = request.args.get('instrument', 'guitar')
-    strings = guitar_strings if instrument == 'guitar' else banjo_strings
-    return render_template('index.html', instrument=instrument, strings=strings)
-
-def pitch_estimation_thread():
-    global stream, estimated_pitch_value, decibels_value
-    while True:
-        if stream is not None:
-            # Read audio data from the stream
-            data = stream.read(BUFFER_SIZE)
-            audio = np.frombuffer(data, dtype=np.float32)
-
-            # Calculate the RMS (Root Mean Square) of the audio data
-            rms = np.sqrt(np.mean(np.square(audio)))
-            # Convert RMS to decibels
-            decibels = 20 * np.log10(rms)
-
-            if decibels > -60:
-                # Estimate the pitch using CREPE
-                time, frequency, confidence, activation = crepe.predict(audio, SAMPLE_RATE, viterbi=True)
-                estimated_pitch = frequency[-1]
-            else:
-                estimated_pitch = 0
+    # e.g. /?instrument=guitar&tuning=Drop+D&reference=442
+    instrument = request.args.get('instrument', 'guitar').capitalize()
+    if instrument not in TUNINGS:
+        instrument = 'Guitar'
+    tuning = request.args.get('tuning')
+    if tuning not in TUNINGS[instrument]:
+        tuning = None
+    reference = request.args.get('reference', A4_FREQUENCY, type=float)
+    if not 400 <= reference <= 480:
+        reference = A4_FREQUENCY
+    tuning = Tuning(instrument, tuning, reference)
+    return render_template('index.html', instrument=instrument.lower(), tunings=list(TUNINGS[instrument]),
+                           tuning=tuning.name, reference=reference, strings=tuning.strings, in_tune_cents=IN_TUNE_CENTS)
 
-            # Store the estimated pitch and decibels in global variables
-            estimated_pitch_value = estimated_pitch
-            decibels_value = decibels
+def session_id():
+    """Return the id of the current client session, creating one if needed"""
+    if 'id' not in session:
+        session['id'] = uuid.uuid4().hex
+    return session['id']
 
 @app.route('/start_estimation')
 def start_estimation():
-    global stream
-    if stream is None:
-        # Open the audio stream if it's not already running
-        stream = p.open(format=pyaudio.paFloat32,
-                        channels=1,
-                        rate=SAMPLE_RATE,
-                        input=True,
-                        frames_per_buffer=BUFFER_SIZE)
-        # Start the pitch estimation thread
-        thread = threading.Thread(target=pitch_estimation_thread)
-        thread.daemon = True
-        thread.start()
-    return jsonify({'message': 'Pitch estimation started'})
+    try:
+        # Select the estimator backend and analysis window (e.g. ?estimator=crepe&model_capacity=tiny).
+        # These apply when capture starts; later sessions join the running engine.
+        estimator = request.args.get('estimator', DEFAULT_ESTIMATOR)
+        options = estimator_options(estimator, request.args.get('model_capacity'))
+        window_size = request.args.get('window_size', WINDOW_SIZE, type=int)
+        hop_size = request.args.get('hop_size', HOP_SIZE, type=int)
+        if window_size <= 0 or hop_size <= 0:
+            raise ValueError('window_size and hop_size must be positive')
+        settings = engine.start(session_id(), estimator, options, window_size, hop_size)
+    except (ValueError, TypeError) as error:
+        return jsonify({'error': str(error)}), 400
+
+    # A session joining a running engine shares its pipeline; say so when that differs from what was asked for
+    requested = {'estimator': estimator, 'estimator_options': options, 'window_size': window_size, 'hop_size': hop_size}
+    applied = all(settings[key] == value for key, value in requested.items())
+    message = 'Pitch estimation started' if applied else \
+        'Joined the running pitch estimation; the requested settings were not applied'
+    return jsonify({'message': message, 'estimator': settings['estimator'], 'settings': settings, 'applied': applied})
 
 @app.route('/estimate_pitch')
 def estimate_pitch():
-    global estimated_pitch_value, decibels_value
-    # Return the current estimated pitch and decibels as JSON
-    return jsonify({'estimated_pitch': estimated_pitch_value, 'decibels': decibels_value})
+    # Return the current estimated pitch, its confidence and the decibels as JSON, for one channel if asked
+    engine.touch(session_id())
+    channel = request.args.get('channel', type=int)
+    if channel is None:
+        return jsonify(engine.latest)
+    try:
+        return jsonify(engine.estimate(channel))
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+@app.route('/stream_pitch')
+def stream_pitch():
+    # Push each new estimate as a Server-Sent Event; slow clients skip straight to the latest one
+    client = session_id()
+
+    def events():
+        subscription = engine.broadcaster.subscribe()
+        while True:
+            engine.touch(client)
+            data = subscription.wait(timeout=STREAM_KEEPALIVE)
+            if data is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'data: {json.dumps(data)}\n\n'
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(events(), mimetype='text/event-stream', headers=headers)
+
+@app.route('/stream_spectrum')
+def stream_spectrum():
+    # Push spectrogram rows of the server capture as Server-Sent Events: a 'layout' event describing the
+    # frequency axis, then base64 rows of one byte per log-spaced column, oldest first
+    if engine.worker_process:
+        return jsonify({'error': 'The spectrum is not available while estimating in a worker process'}), 400
+    client = session_id()
+    spectrum = engine.spectrum
+    layout = {'bins': spectrum.bins, 'min_frequency': spectrum.min_frequency, 'max_frequency': spectrum.max_frequency,
+              'floor_db': spectrum.floor_db, 'ceiling_db': spectrum.ceiling_db,
+              'rows_per_second': spectrum.sample_rate / spectrum.hop_size}
+
+    def events():
+        subscription = engine.subscribe_spectrum()
+        try:
+            yield f'event: layout\ndata: {json.dumps(layout)}\n\n'
+            while True:
+                engine.touch(client)
+                rows = subscription.wait(timeout=STREAM_KEEPALIVE)
+                if rows is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield f"data: {base64.b64encode(rows.tobytes()).decode('ascii')}\n\n"
+        finally:
+            engine.unsubscribe_spectrum()
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(events(), mimetype='text/event-stream', headers=headers)
 
 @app.route('/stop_estimation')
 def stop_estimation():
-    global stream
-    if stream is not None:
-        # Stop and close the audio stream
-        stream.stop_stream()
-        stream.close()
-        stream = None
+    engine.stop(session_id())
     return jsonify({'message': 'Pitch estimation stopped'})
 
+@app.route('/upload_audio', methods=['POST'])
+def upload_audio():
+    # Raw mono PCM captured in the browser, e.g. POST /upload_audio?format=float32&sample_rate=16000
+    sample_format = request.args.get('format', 'float32')
+    sample_rate = request.args.get('sample_rate', SAMPLE_RATE, type=int)
+    if sample_format not in UPLOAD_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(UPLOAD_FORMATS)}"}), 400
+    if sample_rate != SAMPLE_RATE:
+        return jsonify({'error': f'audio must be sampled at {SAMPLE_RATE} Hz'}), 400
+
+    dtype = UPLOAD_FORMATS[sample_format]
+    if request.content_length is None or request.content_length > MAX_UPLOAD_FRAMES * dtype.itemsize:
+        return jsonify({'error': f'upload at most {MAX_UPLOAD_FRAMES} frames per request'}), 413
+    body = request.get_data(cache=False)
+    if len(body) % dtype.itemsize:
+        return jsonify({'error': 'body length is not a whole number of samples'}), 400
+
+    # View the request body in place; only int16 needs a converted copy
+    audio = np.frombuffer(body, dtype=dtype)
+    if dtype.kind == 'i':
+        audio = audio.astype(np.float32) / 32768
+
+    def create_pipeline():
+        name = request.args.get('estimator', DEFAULT_ESTIMATOR)
+        estimator = create_estimator(name, SAMPLE_RATE, **estimator_options(name, request.args.get('model_capacity')))
+        scheduler = EstimationScheduler(SAMPLE_RATE, MAX_STALENESS) if MAX_STALENESS else None
+        return PitchPipeline(estimator, SAMPLE_RATE, max_block_size=BUFFER_SIZE, metrics=engine.metrics,
+                             scheduler=scheduler, smoother=PitchSmoother())
+
+    try:
+        upload = upload_sessions.get(session_id(), create_pipeline)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+    results = []
+    with upload.lock:
+        for start in range(0, len(audio), BUFFER_SIZE):
+            results.extend(upload.pipeline.process(audio[start:start + BUFFER_SIZE]))
+
+    response = {'results': [{'time': result.time, 'estimated_pitch': result.frequency,
+                             'confidence': result.confidence, 'decibels': result.decibels} for result in results]}
+    if results:
+        response['estimated_pitch'] = results[-1].frequency
+        response['confidence'] = results[-1].confidence
+        response['decibels'] = results[-1].decibels
+    return jsonify(response)
+
+@app.route('/stop_upload', methods=['POST'])
+def stop_upload():
+    upload_sessions.discard(session_id())
+    return jsonify({'message': 'Upload session closed'})
+
+@app.route('/model_status')
+def model_status():
+    # Load an estimator in the background (if it is not loaded yet) and report whether it is ready
+    name = request.args.get('estimator', DEFAULT_ESTIMATOR)
+    warmup = warm_up(name, SAMPLE_RATE, **estimator_options(name, request.args.get('model_capacity')))
+    status = {'estimator': name, 'status': warmup.status, 'load_time': warmup.load_time}
+    if warmup.error is not None:
+        status['error'] = str(warmup.error)
+    return jsonify(status)
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format; upload sessions share the engine's metrics
+    return Response(engine.metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/about')
 def about():
     return render_template('about.html')
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    A preallocated ring buffer of float32 samples.
+
+    Every sample is stored twice, once in each half of a buffer of twice the
+    capacity, so the most recent samples are always available as one
+    contiguous slice. Windows are returned as views into the buffer and are
+    only valid until the next call to `write`.
+
+    Attributes:
+        capacity (int): The number of samples the buffer holds.
+        count (int): The total number of samples written so far.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        self.data = np.zeros(2 * capacity, dtype=np.float32)
+
+    def write(self, block):
+        """Append a block of samples, overwriting the oldest ones"""
+        total = len(block)
+        block = block[-self.capacity:]  # Only the newest samples survive an oversized block
+        start = (self.count + total - len(block)) % self.capacity
+        first = min(len(block), self.capacity - start)
+
+        # Write the block into both halves, wrapping around the end of each half
+        for offset in (0, self.capacity):
+            self.data[offset + start:offset + start + first] = block[:first]
+            self.data[offset:offset + len(block) - first] = block[first:]
+
+        self.count += total
+
+    def window(self, length, end=None):
+        """
+        Return a view of `length` samples ending at the absolute sample index
+        `end` (defaults to the most recently written sample).
+        """
+        if end is None:
+            end = self.count
+        if length > self.capacity or end > self.count or end - length < self.count - self.capacity:
+            raise ValueError('Requested window is not available in the ring buffer')
+
+        stop = end % self.capacity + self.capacity
+        return self.data[stop - length:stop]
+
+
+class SlidingWindow:
+    """
+    Splits a stream of capture blocks into overlapping analysis windows.
+
+    Windows of `window_size` samples are produced every `hop_size` samples,
+    independently of the size of the blocks passed to `push`.
+
+    Attributes:
+        window_size (int): The number of samples in each analysis window.
+        hop_size (int): The number of samples between consecutive windows.
+    """
+
+    def __init__(self, window_size, hop_size, max_block_size):
+        self.window_size = window_size
+        self.hop_size = hop_size
+        self.buffer = RingBuffer(window_size + max_block_size)
+        self.next_end = window_size  # Absolute index at which the next window ends
+
+    def push(self, block):
+        """
+        Append a capture block and return the (end, window) pairs that became
+        available. `end` is the absolute sample index the window ends at.
+        """
+        self.buffer.write(block)
+
+        # Skip windows that have already been overwritten (e.g. after a very large block)
+        oldest_end = self.buffer.count - self.buffer.capacity + self.window_size
+        if self.next_end < oldest_end:
+            self.next_end += -(-(oldest_end - self.next_end) // self.hop_size) * self.hop_size
+
+        windows = []
+        while self.next_end <= self.buffer.count:
+            windows.append((self.next_end, self.buffer.window(self.window_size, self.next_end)))
+            self.next_end += self.hop_size
+        return windows
@@ -0,0 +1,266 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from synthetic import pluck
+from wav_io import WavReader
+
+# What a source does when its queue is full: discard the oldest queued block, or the incoming one
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+
+class AudioSource:
+    """
+    Base class for audio sources that deliver float32 blocks through a bounded queue.
+
+    Mono sources deliver 1-D blocks. Multi-channel sources deliver blocks
+    shaped (frames, channels), whose columns are strided views of the
+    interleaved capture buffer; `block[:, channel]` is one channel without a copy.
+
+    A live producer (an audio callback or a real-time feeder thread) never
+    blocks: when the consumer falls behind and the queue is full, a block is
+    dropped according to `drop_policy` and counted in `dropped_blocks`.
+
+    Attributes:
+        sample_rate (int): The sample rate in Hz.
+        block_size (int): The number of frames per block.
+        channels (int): The number of channels per block.
+        drop_policy (str): DROP_OLDEST (keep latency low) or DROP_NEWEST (keep old audio).
+        captured_blocks (int): Blocks produced by the source.
+        dropped_blocks (int): Blocks discarded because the queue was full.
+        input_overflows (int): Overruns reported by the audio device itself.
+    """
+
+    def __init__(self, sample_rate, block_size, queue_size=32, drop_policy=DROP_OLDEST, channels=1):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy '{drop_policy}'")
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.channels = channels
+        self.drop_policy = drop_policy
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.captured_blocks = 0
+        self.dropped_blocks = 0
+        self.input_overflows = 0
+        self.finished = False  # Set by finite sources once their last block is queued
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def read(self, timeout=None):
+        """Return the next block, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def is_exhausted(self):
+        """Whether a finite source has delivered all of its audio"""
+        return self.finished and self.queue.empty()
+
+    def _enqueue(self, block):
+        """Queue a block without blocking, applying the drop policy when full"""
+        self.captured_blocks += 1
+        try:
+            self.queue.put_nowait(block)
+            return
+        except queue.Full:
+            self.dropped_blocks += 1
+        if self.drop_policy == DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(block)
+            except queue.Full:
+                pass
+
+
+class PyAudioSource(AudioSource):
+    """
+    Captures from the default input device using a PyAudio stream callback.
+
+    PortAudio calls back on its own thread for every block, so capture keeps
+    running while the consumer is busy estimating. With several channels the
+    interleaved buffer is only reshaped, never copied.
+    """
+
+    def __init__(self, sample_rate, block_size, queue_size=32, drop_policy=DROP_OLDEST, channels=1):
+        super().__init__(sample_rate, block_size, queue_size, drop_policy, channels)
+        self.pyaudio = None
+        self.audio = None
+        self.stream = None
+
+    def start(self):
+        # PyAudio is only needed for live capture, so it is imported here rather than at module level
+        import pyaudio
+        self.pyaudio = pyaudio
+        self.audio = pyaudio.PyAudio()
+        try:
+            self.stream = self.audio.open(format=pyaudio.paFloat32,
+                                          channels=self.channels,
+                                          rate=self.sample_rate,
+                                          input=True,
+                                          frames_per_buffer=self.block_size,
+                                          stream_callback=self._callback)
+            self.stream.start_stream()
+        except Exception:
+            self.audio.terminate()
+            self.audio = None
+            raise
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & self.pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        block = np.frombuffer(in_data, dtype=np.float32)
+        self._enqueue(block.reshape(-1, self.channels) if self.channels > 1 else block)
+        return None, self.pyaudio.paContinue
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.audio is not None:
+            self.audio.terminate()
+            self.audio = None
+
+
+class FeederSource(AudioSource):
+    """
+    Base class for sources that generate blocks on a background feeder thread.
+
+    When `realtime` is set the feeder is paced at the audio rate, like a sound
+    card; otherwise it produces blocks as fast as the queue drains and
+    never drops them.
+    """
+
+    def __init__(self, sample_rate, block_size, realtime=True, queue_size=32, drop_policy=DROP_OLDEST, channels=1):
+        super().__init__(sample_rate, block_size, queue_size, drop_policy, channels)
+        self.realtime = realtime
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.finished = False
+        self.thread = threading.Thread(target=self._feed, name=type(self).__name__, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def generate(self):
+        """Yield the blocks of the source; subclasses implement this"""
+        raise NotImplementedError
+
+    def _feed(self):
+        period = self.block_size / self.sample_rate
+        next_time = time.monotonic()
+        for block in self.generate():
+            if self.stop_event.is_set():
+                return
+            if self.realtime:
+                next_time += period
+                self.stop_event.wait(max(0.0, next_time - time.monotonic()))
+                self._enqueue(block)
+            else:
+                # Offline sources apply backpressure instead of dropping audio
+                while not self.stop_event.is_set():
+                    try:
+                        self.queue.put(block, timeout=0.1)
+                        self.captured_blocks += 1
+                        break
+                    except queue.Full:
+                        pass
+        self.finished = True
+
+
+class WavFileSource(FeederSource):
+    """
+    Plays a WAV file as if it were captured live: mixed down to mono, or
+    the file's first `channels` channels for multi-channel capture.
+
+    Attributes:
+        path (str): The WAV file to read.
+        loop (bool): Start again from the beginning when the file ends.
+    """
+
+    def __init__(self, path, sample_rate, block_size, realtime=True, loop=False, **kwargs):
+        super().__init__(sample_rate, block_size, realtime, **kwargs)
+        self.path = path
+        self.loop = loop
+        with WavReader(path) as reader:
+            if reader.sample_rate != sample_rate:
+                raise ValueError(f'{path} is sampled at {reader.sample_rate} Hz, expected {sample_rate} Hz')
+            if reader.channels < self.channels:
+                raise ValueError(f'{path} has {reader.channels} channels, expected at least {self.channels}')
+
+    def generate(self):
+        while True:
+            with WavReader(self.path) as reader:
+                for block in reader.blocks(self.block_size):
+                    if self.channels > 1:
+                        yield block[:, :self.channels]
+                    else:
+                        yield block.mean(axis=1) if reader.channels > 1 else block[:, 0]
+            if not self.loop:
+                return
+
+
+class SyntheticSource(FeederSource):
+    """
+    An endless sequence of synthetic plucked notes, for running without a sound card.
+    With several channels, each channel plays the sequence one note later than the previous one.
+
+    Attributes:
+        frequencies (list): The notes to pluck in turn, in Hz.
+        note_duration (float): Seconds between plucks.
+    """
+
+    def __init__(self, sample_rate, block_size, frequencies=(82.41, 110.00, 146.83, 196.00, 246.94, 329.63),
+                 note_duration=2.0, detune_cents=0.0, noise_db=-70.0, realtime=True, **kwargs):
+        super().__init__(sample_rate, block_size, realtime, **kwargs)
+        self.frequencies = list(frequencies)
+        self.note_duration = note_duration
+        self.detune_cents = detune_cents
+        self.noise_db = noise_db
+
+    def generate(self):
+        notes = [pluck(frequency, self.note_duration, self.sample_rate, detune_cents=self.detune_cents,
+                       noise_db=self.noise_db, seed=index) for index, frequency in enumerate(self.frequencies)]
+        signal = np.concatenate(notes)
+        offsets = np.arange(self.channels) * int(self.note_duration * self.sample_rate)
+        position = 0
+        while True:
+            indices = np.arange(position, position + self.block_size) % len(signal)
+            position = (position + self.block_size) % len(signal)
+            yield signal[(indices[:, None] + offsets) % len(signal)] if self.channels > 1 else signal[indices]
+
+
+def create_source(spec, sample_rate, block_size, channels=1):
+    """
+    Create an audio source from a short description:
+    'microphone' (default), 'synthetic', or 'file:<path>' (looped).
+    """
+    if not spec or spec == 'microphone':
+        return PyAudioSource(sample_rate, block_size, channels=channels)
+    if spec == 'synthetic':
+        return SyntheticSource(sample_rate, block_size, channels=channels)
+    if spec.startswith('file:'):
+        return WavFileSource(spec[len('file:'):], sample_rate, block_size, loop=True, channels=channels)
+    raise ValueError(f"Unknown audio source '{spec}'")
@@ -0,0 +1,154 @@
+"""
+Offline tuning analysis of WAV recordings.
+
+Streams each file through the same RMS gate and pitch pipeline the live
+tuner uses and writes a per-frame track (time, pitch, confidence, dB, nearest
+note and cents offset) to CSV or Parquet. Files are spread over a pool of
+worker processes.
+
+Usage:
+    python batch_analysis.py recordings/ --output-dir tracks --workers 8
+    python batch_analysis.py take1.wav take2.wav --estimator crepe --model-capacity tiny --format parquet
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from pitch_estimators import ESTIMATORS, DEFAULT_ESTIMATOR, CREPE_CAPACITIES, create_estimator
+from pitch_pipeline import PitchPipeline, WINDOW_SIZE, HOP_SIZE, THRESHOLD_DB
+from tuning import A4_FREQUENCY, nearest_note
+from wav_io import WavReader
+
+# The pipeline runs at the same rate as the live tuner; other files are resampled
+SAMPLE_RATE = 16000
+
+# Number of frames read from a file at a time
+READ_BLOCK_SIZE = 16384
+
+TRACK_COLUMNS = ['time', 'frequency', 'confidence', 'decibels', 'note', 'cents']
+
+# Per-process state, created once by the pool initializer
+worker_estimator = None
+worker_settings = None
+
+
+def read_mono_blocks(path):
+    """Yield mono float32 blocks at SAMPLE_RATE from a WAV file"""
+    with WavReader(path) as reader:
+        if reader.sample_rate == SAMPLE_RATE:
+            for block in reader.blocks(READ_BLOCK_SIZE):
+                yield block.mean(axis=1) if reader.channels > 1 else block[:, 0]
+            return
+
+        # Polyphase resampling needs the whole signal to avoid artefacts at block edges
+        from scipy.signal import resample_poly
+        audio = reader.read(reader.frames).mean(axis=1)
+        divisor = np.gcd(SAMPLE_RATE, reader.sample_rate)
+        audio = resample_poly(audio, SAMPLE_RATE // divisor, reader.sample_rate // divisor).astype(np.float32)
+        for start in range(0, len(audio), READ_BLOCK_SIZE):
+            yield audio[start:start + READ_BLOCK_SIZE]
+
+
+def init_worker(estimator_name, estimator_options, settings):
+    """Build the estimator once per worker process"""
+    global worker_estimator, worker_settings
+    worker_estimator = create_estimator(estimator_name, SAMPLE_RATE, **estimator_options)
+    worker_settings = settings
+
+
+def analyze_file(path):
+    """Run one file through the pitch pipeline and return its track as a list of rows"""
+    worker_estimator.reset()
+    pipeline = PitchPipeline(worker_estimator, SAMPLE_RATE, worker_settings['window_size'], worker_settings['hop_size'],
+                             max_block_size=READ_BLOCK_SIZE, threshold_db=worker_settings['threshold_db'])
+    rows = []
+    for block in read_mono_blocks(path):
+        for result in pipeline.process(block):
+            note, cents = nearest_note(result.frequency, worker_settings['reference'])
+            rows.append((result.time, result.frequency, result.confidence, result.decibels, note, cents))
+    return rows
+
+
+def write_track(rows, output_path, output_format):
+    """Write a track to CSV or Parquet"""
+    if output_format == 'parquet':
+        import pandas as pd
+        pd.DataFrame(rows, columns=TRACK_COLUMNS).to_parquet(output_path, index=False)
+    else:
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRACK_COLUMNS)
+            writer.writerows(rows)
+
+
+def process_file(path, output_path, output_format):
+    """Analyze one file in a worker, write its track and return a short summary"""
+    rows = analyze_file(path)
+    write_track(rows, output_path, output_format)
+    voiced = [row for row in rows if row[1] > 0]
+    median_pitch = float(np.median([row[1] for row in voiced])) if voiced else 0.0
+    return path, len(rows), len(voiced), median_pitch
+
+
+def collect_wav_files(paths):
+    """Expand directories into the WAV files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.wav'), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze the tuning of WAV recordings offline.')
+    parser.add_argument('paths', nargs='+', help='WAV files or directories containing WAV files')
+    parser.add_argument('--output-dir', default='tracks', help='Directory for the per-file tracks')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Track file format')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--estimator', choices=list(ESTIMATORS), default=DEFAULT_ESTIMATOR)
+    parser.add_argument('--model-capacity', choices=CREPE_CAPACITIES, help='CREPE model capacity')
+    parser.add_argument('--window-size', type=int, default=WINDOW_SIZE)
+    parser.add_argument('--hop-size', type=int, default=HOP_SIZE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD_DB, help='Gate threshold in dB')
+    parser.add_argument('--reference', type=float, default=A4_FREQUENCY, help='Frequency of A4 in Hz for note names')
+    args = parser.parse_args(argv)
+
+    files = collect_wav_files(args.paths)
+    if not files:
+        parser.error('no WAV files found')
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    estimator_options = {'model_capacity': args.model_capacity} if args.model_capacity else {}
+    settings = {'window_size': args.window_size, 'hop_size': args.hop_size, 'threshold_db': args.threshold,
+                'reference': args.reference}
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.estimator, estimator_options, settings)) as pool:
+        futures = {}
+        for index, path in enumerate(files):
+            # Prefix with the index so files with the same name in different directories do not collide
+            name = f'{index:05d}_{os.path.splitext(os.path.basename(path))[0]}.{args.format}'
+            futures[pool.submit(process_file, path, os.path.join(args.output_dir, name), args.format)] = path
+
+        for future in as_completed(futures):
+            try:
+                path, frames, voiced, median_pitch = future.result()
+            except Exception as error:
+                failures += 1
+                print(f'{futures[future]}: failed ({error})', file=sys.stderr)
+            else:
+                print(f'{path}: {frames} frames, {voiced} voiced, median pitch {median_pitch:.2f} Hz')
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark for batched CREPE inference.
+
+Compares the old per-buffer `crepe.predict(..., viterbi=True)` call with the
+batched CrepeEstimator at several batch sizes and reports throughput, CPU
+time per estimate and the median error in cents on synthetic tones.
+
+Usage:
+    python benchmarks/bench_crepe_batch.py --capacity tiny --seconds 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crepe
+from audio_buffer import SlidingWindow
+from pitch_estimators import CREPE_CAPACITIES, CREPE_SAMPLE_RATE, CrepeEstimator
+
+# Open guitar strings used as test tones
+TEST_FREQUENCIES = [82.41, 110.00, 146.83, 196.00, 246.94, 329.63]
+
+
+def make_windows(seconds, window_size, hop_size):
+    """Generate harmonic test tones and split them into analysis windows with their true frequency"""
+    windows = []
+    samples = int(seconds * CREPE_SAMPLE_RATE / len(TEST_FREQUENCIES))
+    t = np.arange(samples) / CREPE_SAMPLE_RATE
+    for frequency in TEST_FREQUENCIES:
+        tone = sum(np.sin(2 * np.pi * frequency * harmonic * t) / harmonic for harmonic in range(1, 5))
+        tone = (0.3 * tone).astype(np.float32)
+        sliding = SlidingWindow(window_size, hop_size, len(tone))
+        windows.extend((window.copy(), frequency) for end, window in sliding.push(tone))
+    return windows
+
+
+def cents_error(estimated, expected):
+    """Absolute error in cents, ignoring windows without an estimate"""
+    estimated = np.asarray(estimated, dtype=np.float64)
+    valid = estimated > 0
+    return np.abs(1200 * np.log2(estimated[valid] / np.asarray(expected)[valid]))
+
+
+def run(label, windows, estimate_all):
+    """Time one strategy and print a result line"""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    estimates = estimate_all([window for window, frequency in windows])
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    errors = cents_error(estimates, [frequency for window, frequency in windows])
+    median_error = np.median(errors) if len(errors) else float('nan')
+    print(f'{label:<24} {len(windows) / wall:10.1f} est/s {1000 * cpu / len(windows):10.2f} ms CPU/est '
+          f'{median_error:8.2f} cents median error')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-buffer versus batched CREPE inference.')
+    parser.add_argument('--capacity', choices=CREPE_CAPACITIES, default='full', help='CREPE model capacity')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Length of the synthetic test signal')
+    parser.add_argument('--window-size', type=int, default=2048)
+    parser.add_argument('--hop-size', type=int, default=512)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    windows = make_windows(args.seconds, args.window_size, args.hop_size)
+    print(f'{len(windows)} windows, model capacity {args.capacity}')
+
+    def per_buffer_predict(frames):
+        # The original code path: one predict call with Viterbi decoding per buffer
+        return [crepe.predict(frame, CREPE_SAMPLE_RATE, model_capacity=args.capacity,
+                              viterbi=True, verbose=0)[1][-1] for frame in frames]
+
+    run('crepe.predict', windows, per_buffer_predict)
+
+    estimator = CrepeEstimator(CREPE_SAMPLE_RATE, model_capacity=args.capacity)
+    estimator.estimate_batch([windows[0][0]])  # Warm up the model before timing
+
+    for batch_size in args.batch_sizes:
+        def batched(frames):
+            estimator.reset()
+            estimates = []
+            for start in range(0, len(frames), batch_size):
+                estimates.extend(frequency for frequency, confidence in estimator.estimate_batch(frames[start:start + batch_size]))
+            return estimates
+
+        run(f'batched (batch={batch_size})', windows, batched)
+
+
+if __name__ == '__main__':
+    main()
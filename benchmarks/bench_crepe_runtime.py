@@ -0,0 +1,173 @@
+"""
+Side-by-side report of CREPE runtimes: stock Keras versus exported ONNX/TFLite models.
+
+Every configuration runs in its own process, so the peak RSS includes the
+runtime it imports (TensorFlow or not) and nothing else. The report lists
+load time, latency per window at batch size 1 and per window at a larger
+batch, peak RSS, the error against the true pitch of synthetic plucked
+strings, and the deviation from the stock model's estimates on the
+synthetic strings and on any recordings given.
+
+Usage:
+    python tools/export_crepe.py --capacity tiny --format onnx --quantize
+    python benchmarks/bench_crepe_runtime.py --capacity tiny --models models/crepe-tiny.onnx models/crepe-tiny-int8.onnx \
+        --wav recordings/*.wav --threads 2 --output crepe_runtimes.md
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_buffer import SlidingWindow
+from conditioning import calculate_decibels, THRESHOLD_DB
+from pitch_estimators import CREPE_CAPACITIES, CREPE_SAMPLE_RATE, CrepeEstimator
+from synthetic import pluck
+
+# Open guitar strings, played in tune and detuned
+TEST_FREQUENCIES = [82.41, 110.00, 146.83, 196.00, 246.94, 329.63]
+TEST_DETUNES = [-30.0, -7.0, 0.0, 12.0]
+
+WINDOW_SIZE = 2048
+HOP_SIZE = 512
+BATCH_SIZE = 16
+
+
+def synthetic_takes(seconds):
+    """Plucked test strings as (signal, true frequency) pairs"""
+    takes = []
+    for index, (frequency, detune) in enumerate((f, d) for f in TEST_FREQUENCIES for d in TEST_DETUNES):
+        signal = pluck(frequency, seconds, CREPE_SAMPLE_RATE, detune_cents=detune, noise_db=-55.0, seed=index)
+        takes.append((signal, frequency * 2 ** (detune / 1200)))
+    return takes
+
+
+def recorded_takes(paths):
+    """Recordings as (signal, None) pairs, resampled to the CREPE rate"""
+    from batch_analysis import read_mono_blocks
+    return [(np.concatenate(list(read_mono_blocks(path))), None) for path in paths]
+
+
+def voiced_windows(signal):
+    """The analysis windows of a take that pass the default gate"""
+    sliding = SlidingWindow(WINDOW_SIZE, HOP_SIZE, len(signal))
+    return [window.copy() for end, window in sliding.push(signal) if calculate_decibels(window) > THRESHOLD_DB]
+
+
+def measure(spec):
+    """Run one configuration in this process and return its measurements"""
+    capacity, model_path, threads, seconds, wavs = spec['capacity'], spec['model_path'], spec['threads'], \
+        spec['seconds'], spec['wavs']
+    takes = [voiced_windows(signal) for signal, frequency in synthetic_takes(seconds) + recorded_takes(wavs)]
+
+    start = time.perf_counter()
+    estimator = CrepeEstimator(CREPE_SAMPLE_RATE, model_capacity=capacity, model_path=model_path, threads=threads)
+    estimator.estimate_batch(takes[0][:1])
+    load_time = time.perf_counter() - start
+
+    # Streaming latency: one window per call, as a fast estimator sees it
+    single = []
+    for window in takes[0][:50]:
+        start = time.perf_counter()
+        estimator.estimate_batch([window])
+        single.append(time.perf_counter() - start)
+
+    # Estimates for the report, batched like the pipeline batches the windows of a block
+    estimates = []
+    batched_time, batched_windows = 0.0, 0
+    for windows in takes:
+        estimator.reset()
+        take = []
+        for begin in range(0, len(windows), BATCH_SIZE):
+            start = time.perf_counter()
+            take.extend(frequency for frequency, confidence in estimator.estimate_batch(windows[begin:begin + BATCH_SIZE]))
+            batched_time += time.perf_counter() - start
+            batched_windows += len(windows[begin:begin + BATCH_SIZE])
+        estimates.append(take)
+
+    return {
+        'load_time': load_time,
+        'single_ms': 1000 * float(np.median(single)),
+        'batched_ms': 1000 * batched_time / max(batched_windows, 1),
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'estimates': estimates,
+    }
+
+
+def run_isolated(spec):
+    """Measure a configuration in a fresh interpreter"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', json.dumps(spec)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cents(estimates, references):
+    """Absolute cent differences where both sides found a pitch"""
+    estimates, references = np.asarray(estimates, dtype=np.float64), np.asarray(references, dtype=np.float64)
+    valid = (estimates > 0) & (references > 0)
+    return np.abs(1200 * np.log2(estimates[valid] / references[valid]))
+
+
+def percentiles(values):
+    return f'{np.median(values):.2f} / {np.percentile(values, 95):.2f}' if len(values) else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare CREPE runtimes for latency, memory and accuracy.')
+    parser.add_argument('--capacity', choices=CREPE_CAPACITIES, default='tiny', help='CREPE model capacity')
+    parser.add_argument('--models', nargs='*', default=[], help='Exported .onnx/.tflite models of that capacity')
+    parser.add_argument('--threads', type=int, help='CPU threads for the exported models')
+    parser.add_argument('--wav', nargs='*', default=[], help='Recorded strings to compare on')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Length of each synthetic string')
+    parser.add_argument('--output', help='Also write the report to this Markdown file')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(json.loads(args.measure))))
+        return
+
+    base = {'capacity': args.capacity, 'threads': args.threads, 'seconds': args.seconds, 'wavs': args.wav}
+    configurations = [('keras', None)] + [(os.path.basename(path), path) for path in args.models]
+    results = {}
+    for label, path in configurations:
+        print(f'measuring {label}...', file=sys.stderr)
+        results[label] = run_isolated(dict(base, model_path=path))
+
+    takes = synthetic_takes(args.seconds)
+    truths = [frequency for signal, frequency in takes]
+    synthetic_count = len(takes)
+    stock = results['keras']['estimates']
+
+    lines = [f'CREPE {args.capacity}, {args.threads or "default"} threads, batch {BATCH_SIZE}, '
+             f'{synthetic_count} synthetic strings, {len(args.wav)} recordings', '',
+             '| runtime | load (s) | batch 1 (ms) | batched (ms/window) | peak RSS (MB) '
+             '| synthetic error, median / p95 (cents) | vs stock, synthetic | vs stock, recorded |',
+             '|---|---|---|---|---|---|---|---|']
+    for label, result in results.items():
+        estimates = result['estimates']
+        truth_error = np.concatenate([cents(take, [truth] * len(take))
+                                      for take, truth in zip(estimates[:synthetic_count], truths)])
+        synthetic_deviation = np.concatenate([cents(take, reference) for take, reference
+                                              in zip(estimates[:synthetic_count], stock[:synthetic_count])])
+        recorded = [cents(take, reference) for take, reference in zip(estimates[synthetic_count:], stock[synthetic_count:])]
+        recorded_deviation = np.concatenate(recorded) if recorded else np.zeros(0)
+        lines.append(f"| {label} | {result['load_time']:.2f} | {result['single_ms']:.2f} | {result['batched_ms']:.2f} "
+                     f"| {result['rss_mb']:.0f} | {percentiles(truth_error)} | {percentiles(synthetic_deviation)} "
+                     f"| {percentiles(recorded_deviation)} |")
+
+    report = '\n'.join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Latency, throughput and accuracy benchmark for the tuning pipeline.
+
+Synthetic plucked strings (harmonics, decay, detuning and noise) are
+generated for every string of every instrument and pushed block by block
+through PitchPipeline, exactly as the live tuner does. For each estimator
+backend the benchmark reports per-block latency percentiles, frames per
+second, CPU time and the error in cents, and writes everything to JSON so
+runs from different versions can be compared. The per-block cost of the
+conditioning stage (high-pass filter, level and adaptive gate) is reported
+separately. With --max-staleness, every estimator is also run behind the
+onset-driven scheduler (as '<name>+scheduler') to show the CPU saved.
+
+A sustain check plays one slowly decaying string (3 dB/s over -75 dB noise)
+behind the adaptive gate and behind the fixed base threshold. The adaptive
+gate must track the note as long as the fixed one does; otherwise the
+benchmark exits with status 1.
+
+Usage:
+    python benchmarks/bench_pipeline.py --estimators yin crepe --output bench.json
+    python benchmarks/bench_pipeline.py --baseline bench.json
+    python benchmarks/bench_pipeline.py --max-staleness 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pitch_estimators import ESTIMATORS, create_estimator
+from pitch_pipeline import PitchPipeline, WINDOW_SIZE, HOP_SIZE
+from conditioning import SignalConditioner, calculate_decibels
+from estimation_scheduler import EstimationScheduler
+from metrics import Metrics
+from synthetic import pluck
+from tuning import INSTRUMENTS
+
+SAMPLE_RATE = 16000
+BUFFER_SIZE = 1024
+
+# Seconds of the attack that are not scored, while the estimate settles
+SETTLE_TIME = 0.15
+
+# The sustain check: an A string decaying at 3 dB/s (amplitude e^-0.345t) over quiet noise, and how much
+# sooner than behind the fixed gate the adaptive gate may lose it
+SUSTAIN_FREQUENCY = 110.0
+SUSTAIN_DURATION = 12.0
+SUSTAIN_DECAY = 0.345
+SUSTAIN_NOISE_DB = -75.0
+SUSTAIN_TOLERANCE = 0.25
+
+
+def make_cases(duration, detune_range, noise_db, seed):
+    """Build one plucked-string test case per string of every instrument"""
+    rng = np.random.default_rng(seed)
+    cases = []
+    for instrument, strings in INSTRUMENTS.items():
+        for index, string in enumerate(strings):
+            detune = float(rng.uniform(-detune_range, detune_range))
+            audio = pluck(string.frequency, duration, SAMPLE_RATE, harmonics=8, decay=1.5,
+                          detune_cents=detune, noise_db=noise_db, seed=int(rng.integers(1 << 31)))
+            cases.append({'instrument': instrument, 'string': f'{string.name}{index + 1}',
+                          'frequency': string.frequency * 2 ** (detune / 1200), 'audio': audio})
+    return cases
+
+
+def run_estimator(name, cases, window_size, hop_size, max_staleness=None):
+    """Push every case through a fresh pipeline and collect timings and errors"""
+    estimator = create_estimator(name, SAMPLE_RATE)
+    estimator.estimate(cases[0]['audio'][:window_size])  # Warm up (model loading, FFT caches)
+
+    latencies = []
+    errors = []
+    frames = 0
+    gated = 0
+    metrics = Metrics(enabled=True)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for case in cases:
+        estimator.reset()
+        scheduler = EstimationScheduler(SAMPLE_RATE, max_staleness) if max_staleness else None
+        pipeline = PitchPipeline(estimator, SAMPLE_RATE, window_size, hop_size, max_block_size=BUFFER_SIZE,
+                                 metrics=metrics, scheduler=scheduler)
+        audio = case['audio']
+        for start in range(0, len(audio), BUFFER_SIZE):
+            block_start = time.perf_counter()
+            results = pipeline.process(audio[start:start + BUFFER_SIZE])
+            elapsed = time.perf_counter() - block_start
+            if results:
+                latencies.append(elapsed)
+            for result in results:
+                frames += 1
+                if result.frequency <= 0:
+                    gated += 1
+                elif result.time >= SETTLE_TIME:
+                    errors.append(1200 * np.log2(result.frequency / case['frequency']))
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    latencies = np.array(latencies) * 1000
+    abs_errors = np.abs(errors)
+    audio_seconds = sum(len(case['audio']) for case in cases) / SAMPLE_RATE
+    return {
+        'frames': frames,
+        'gated_frames': gated,
+        'estimated_frames': metrics.counters.get('frames_estimated', 0),
+        'frames_per_second': frames / wall,
+        'realtime_factor': audio_seconds / wall,
+        'cpu_seconds': cpu,
+        'cpu_ms_per_frame': 1000 * cpu / frames,
+        'latency_ms': {f'p{q}': float(np.percentile(latencies, q)) for q in (50, 90, 99)} | {'max': float(latencies.max())},
+        'cents_error': {
+            'median': float(np.median(abs_errors)),
+            'p90': float(np.percentile(abs_errors, 90)),
+            'within_5_cents': float(np.mean(abs_errors <= 5)),
+            'octave_errors': float(np.mean(abs_errors >= 600)),
+        },
+    }
+
+
+def run_conditioning(cases, window_size):
+    """Time the conditioning stage alone, per capture block"""
+    conditioner = SignalConditioner(SAMPLE_RATE, window_size, window='hann')
+    filter_times, gate_times = [], []
+    for case in cases:
+        conditioner.reset()
+        audio = case['audio']
+        for start in range(0, len(audio) - BUFFER_SIZE + 1, BUFFER_SIZE):
+            block_start = time.perf_counter()
+            block = conditioner.filter(audio[start:start + BUFFER_SIZE])
+            filtered = time.perf_counter()
+            conditioner.gate(calculate_decibels(block), BUFFER_SIZE / SAMPLE_RATE)
+            filter_times.append(filtered - block_start)
+            gate_times.append(time.perf_counter() - filtered)
+
+    windows = [case['audio'][:window_size] for case in cases[:8]]
+    taper_start = time.perf_counter()
+    for _ in range(100):
+        conditioner.taper(windows)
+    taper_time = (time.perf_counter() - taper_start) / (100 * len(windows))
+
+    filter_times, gate_times = np.array(filter_times) * 1e6, np.array(gate_times) * 1e6
+    return {
+        'blocks': len(filter_times),
+        'filter_us': {f'p{q}': float(np.percentile(filter_times, q)) for q in (50, 99)},
+        'level_and_gate_us': {f'p{q}': float(np.percentile(gate_times, q)) for q in (50, 99)},
+        'taper_us_per_window': taper_time * 1e6,
+    }
+
+
+def run_sustain(name, window_size, hop_size):
+    """Seconds of a slowly decaying note that are tracked behind the adaptive gate and behind the fixed one"""
+    audio = pluck(SUSTAIN_FREQUENCY, SUSTAIN_DURATION, SAMPLE_RATE, decay=SUSTAIN_DECAY, noise_db=SUSTAIN_NOISE_DB,
+                  seed=0)
+    tracked = {}
+    for gate, adaptive in (('adaptive', True), ('fixed', False)):
+        conditioner = SignalConditioner(SAMPLE_RATE, window_size, adaptive_threshold=adaptive)
+        pipeline = PitchPipeline(create_estimator(name, SAMPLE_RATE), SAMPLE_RATE, window_size, hop_size,
+                                 max_block_size=BUFFER_SIZE, conditioner=conditioner)
+        tracked[gate] = 0.0
+        for start in range(0, len(audio), BUFFER_SIZE):
+            for result in pipeline.process(audio[start:start + BUFFER_SIZE]):
+                if result.frequency > 0 and abs(1200 * np.log2(result.frequency / SUSTAIN_FREQUENCY)) < 50:
+                    tracked[gate] = result.time
+    return {'adaptive_gate_seconds': tracked['adaptive'], 'fixed_gate_seconds': tracked['fixed'],
+            'passed': tracked['adaptive'] >= tracked['fixed'] - SUSTAIN_TOLERANCE}
+
+
+def git_version():
+    """Describe the checked-out commit, if this is a git checkout"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    conditioning = report['conditioning']
+    print(f"conditioning: filter p50 {conditioning['filter_us']['p50']:.1f} us p99 {conditioning['filter_us']['p99']:.1f} us, "
+          f"level and gate p50 {conditioning['level_and_gate_us']['p50']:.1f} us per {BUFFER_SIZE}-sample block, "
+          f"taper {conditioning['taper_us_per_window']:.1f} us per window")
+    for name, sustain in report['sustain'].items():
+        print(f"{name} sustain: a {SUSTAIN_DURATION:.0f} s decaying note is tracked for "
+              f"{sustain['adaptive_gate_seconds']:.2f} s behind the adaptive gate, "
+              f"{sustain['fixed_gate_seconds']:.2f} s behind the fixed one{'' if sustain['passed'] else ' (REGRESSION)'}")
+    for name, result in report['results'].items():
+        print(f"{name}: {result['frames_per_second']:.0f} frames/s ({result['realtime_factor']:.1f}x real time), "
+              f"{result['cpu_ms_per_frame']:.3f} ms CPU/frame, latency p50 {result['latency_ms']['p50']:.2f} ms "
+              f"p99 {result['latency_ms']['p99']:.2f} ms, median error {result['cents_error']['median']:.2f} cents, "
+              f"{100 * result['cents_error']['within_5_cents']:.1f}% within 5 cents, "
+              f"{result['estimated_frames']}/{result['frames']} frames estimated")
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous:
+            for label, key, path in (('frames/s', 'frames_per_second', None),
+                                     ('CPU ms/frame', 'cpu_ms_per_frame', None),
+                                     ('latency p99 ms', 'p99', 'latency_ms'),
+                                     ('median cents error', 'median', 'cents_error')):
+                old = previous[path][key] if path else previous[key]
+                new = result[path][key] if path else result[key]
+                change = 100 * (new - old) / old if old else float('nan')
+                print(f'    {label:<20} {old:10.3f} -> {new:10.3f} ({change:+.1f}%)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the tuning pipeline on synthetic plucked strings.')
+    parser.add_argument('--estimators', nargs='+', choices=list(ESTIMATORS), default=['yin'])
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds per plucked string')
+    parser.add_argument('--detune', type=float, default=30.0, help='Maximum random detuning in cents')
+    parser.add_argument('--noise', type=float, default=-60.0, help='Noise level in dB relative to full scale')
+    parser.add_argument('--window-size', type=int, default=WINDOW_SIZE)
+    parser.add_argument('--hop-size', type=int, default=HOP_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-staleness', type=float,
+                        help='Also run each estimator behind the onset scheduler with this maximum staleness in seconds')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against the results in this JSON file')
+    args = parser.parse_args()
+
+    cases = make_cases(args.duration, args.detune, args.noise, args.seed)
+    report = {
+        'version': git_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine()},
+        'settings': {'duration': args.duration, 'detune': args.detune, 'noise_db': args.noise,
+                     'window_size': args.window_size, 'hop_size': args.hop_size, 'seed': args.seed,
+                     'cases': len(cases)},
+        'conditioning': run_conditioning(cases, args.window_size),
+        'sustain': {name: run_sustain(name, args.window_size, args.hop_size) for name in args.estimators},
+        'results': {name: run_estimator(name, cases, args.window_size, args.hop_size) for name in args.estimators},
+    }
+    if args.max_staleness:
+        report['settings']['max_staleness'] = args.max_staleness
+        for name in args.estimators:
+            report['results'][f'{name}+scheduler'] = run_estimator(name, cases, args.window_size, args.hop_size,
+                                                                   args.max_staleness)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    # The adaptive gate closing on a note the fixed gate still passes is a regression in the tuner's core use
+    return 0 if all(sustain['passed'] for sustain in report['sustain'].values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
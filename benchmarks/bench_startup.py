@@ -0,0 +1,118 @@
+"""
+Startup benchmark.
+
+Measures, each in a fresh interpreter, how long it takes to import the
+shared modules and the Flask app, to show the Qt window, and to load and
+warm up the CREPE model, then compares the first and second inference.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 5 --capacity tiny
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_startup.py --skip-crepe
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Snippets run in a fresh interpreter; each prints the elapsed seconds (or a JSON object)
+SNIPPETS = {
+    'import pitch_estimators': 'import pitch_estimators',
+    'import app (Flask)': 'import app',
+    'Qt window shown': '''
+import runpy
+from PyQt5.QtWidgets import QApplication
+qt_app = QApplication([])
+namespace = runpy.run_path('Guitar Tuner.py', run_name='startup_benchmark')
+gui = namespace['PitchEstimationGUI']()
+gui.load_instrument_strings('Guitar')
+gui.show()
+qt_app.processEvents()
+''',
+}
+
+TIMED = '''
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+{body}
+print(time.perf_counter() - start)
+'''
+
+CREPE_WARMUP = '''
+import json, sys, time
+import numpy as np
+sys.path.insert(0, {root!r})
+from pitch_estimators import warm_up, create_estimator
+start = time.perf_counter()
+warmup = warm_up('crepe', 16000, model_capacity={capacity!r})
+warmup.wait()
+if warmup.error is not None:
+    raise warmup.error
+estimator = create_estimator('crepe', 16000, model_capacity={capacity!r})
+window = np.random.default_rng(1).standard_normal(2048).astype(np.float32) * 0.1
+inference_start = time.perf_counter()
+estimator.estimate(window)
+print(json.dumps({{'warm_up': warmup.load_time, 'inference_after_warm_up': time.perf_counter() - inference_start}}))
+'''
+
+CREPE_COLD = '''
+import json, sys, time
+import numpy as np
+sys.path.insert(0, {root!r})
+from pitch_estimators import create_estimator
+window = np.random.default_rng(1).standard_normal(2048).astype(np.float32) * 0.1
+start = time.perf_counter()
+estimator = create_estimator('crepe', 16000, model_capacity={capacity!r})
+estimator.estimate(window)
+print(json.dumps({{'first_inference_cold': time.perf_counter() - start}}))
+'''
+
+
+def run_snippet(code):
+    """Run code in a fresh interpreter from the repository root and return its last output line"""
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import, startup and model warm-up times.')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters per measurement')
+    parser.add_argument('--capacity', default='full', help='CREPE model capacity to warm up')
+    parser.add_argument('--skip-crepe', action='store_true', help='Do not measure CREPE loading')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    report = {}
+    for label, body in SNIPPETS.items():
+        try:
+            times = [float(run_snippet(TIMED.format(root=ROOT, body=body))) for _ in range(args.repeat)]
+        except RuntimeError as error:
+            print(f'{label:<28} skipped ({error})')
+            continue
+        report[label] = float(np.median(times))
+        print(f'{label:<28} {1000 * report[label]:9.1f} ms (median of {args.repeat})')
+
+    if not args.skip_crepe:
+        try:
+            report.update(json.loads(run_snippet(CREPE_COLD.format(root=ROOT, capacity=args.capacity))))
+            report.update(json.loads(run_snippet(CREPE_WARMUP.format(root=ROOT, capacity=args.capacity))))
+        except RuntimeError as error:
+            print(f'CREPE measurements skipped ({error})')
+        else:
+            for label in ('first_inference_cold', 'warm_up', 'inference_after_warm_up'):
+                print(f'CREPE {args.capacity} {label:<22} {1000 * report[label]:9.1f} ms')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
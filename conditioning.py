@@ -0,0 +1,164 @@
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+# High-pass corner below the lowest supported string (drop D is 73 Hz), removing DC offset and rumble
+HIGHPASS_CUTOFF = 40.0
+HIGHPASS_ORDER = 2
+
+# Default gate threshold in decibels, used until the noise floor has been measured
+THRESHOLD_DB = -60
+
+# Level reported for digital silence, instead of -inf
+MIN_DECIBELS = -120.0
+
+# The adaptive gate sits this far above the tracked noise floor, within these limits of the base threshold;
+# the ceiling (-50 dB by default) stays below the tail of a sustained note
+NOISE_MARGIN_DB = 12.0
+MIN_THRESHOLD_OFFSET_DB = -15.0
+MAX_THRESHOLD_OFFSET_DB = 10.0
+
+# The noise floor follows quieter windows quickly and rises slowly, and only on windows without a pitch
+FLOOR_FALL_COEFFICIENT = 0.3
+FLOOR_RISE_DB_PER_SECOND = 6.0
+
+# Below the gate, the floor only rises once the gate has been closed this long, so a note's tail is not noise
+FLOOR_HOLD_SECONDS = 1.0
+
+# Windows that pass the gate but are estimated with less confidence than this hold no pitch: they are noise
+UNVOICED_CONFIDENCE = 0.3
+
+
+def calculate_decibels(audio):
+    """Calculate the RMS level of the audio samples in decibels, without allocating temporaries"""
+    energy = float(np.dot(audio, audio))
+    return max(10 * float(np.log10(energy / len(audio))), MIN_DECIBELS) if energy > 0 else MIN_DECIBELS
+
+
+class NoiseFloorTracker:
+    """
+    Tracks the background noise level and derives the gate threshold from it.
+
+    The floor starts just below the base threshold, drops quickly towards any
+    quieter window and creeps up slowly towards windows without a pitch: those
+    the gate has been closing on for a while (not the tail of a note that just
+    fell below it), and those reported through `unvoiced` because the
+    estimator found no pitch in them. So it settles on the level between
+    notes, and a sustained note never raises it. (Starting from the first
+    window instead would lock onto a note that is already sounding and follow
+    its decay.) The threshold is the floor plus a margin, kept within limits
+    around the base threshold so a very quiet or very noisy room cannot
+    disable the gate.
+
+    Attributes:
+        floor (float): The current noise floor estimate in decibels.
+        threshold (float): The current gate threshold in decibels.
+    """
+
+    def __init__(self, threshold_db=THRESHOLD_DB, margin_db=NOISE_MARGIN_DB, min_offset_db=MIN_THRESHOLD_OFFSET_DB,
+                 max_offset_db=MAX_THRESHOLD_OFFSET_DB, fall_coefficient=FLOOR_FALL_COEFFICIENT,
+                 rise_db_per_second=FLOOR_RISE_DB_PER_SECOND, hold_seconds=FLOOR_HOLD_SECONDS):
+        self.margin_db = margin_db
+        self.min_threshold = threshold_db + min_offset_db
+        self.max_threshold = threshold_db + max_offset_db
+        self.fall_coefficient = fall_coefficient
+        self.rise_db_per_second = rise_db_per_second
+        self.hold_seconds = hold_seconds
+        self.floor = threshold_db - margin_db
+        self.threshold = threshold_db
+        self.closed_seconds = hold_seconds  # How long the gate has been closed
+
+    def update(self, decibels, seconds):
+        """Account for a window at `decibels`, `seconds` after the previous one, and return the new threshold"""
+        self.closed_seconds = self.closed_seconds + seconds if decibels <= self.threshold else 0.0
+        if decibels < self.floor:
+            self.floor += (decibels - self.floor) * self.fall_coefficient
+        elif self.closed_seconds > self.hold_seconds:
+            self.floor += min(decibels - self.floor, self.rise_db_per_second * seconds)
+        self.threshold = min(max(self.floor + self.margin_db, self.min_threshold), self.max_threshold)
+        return self.threshold
+
+    def unvoiced(self, decibels, seconds):
+        """Let the floor rise towards a window that passed the gate but held no pitch, e.g. noise above the gate"""
+        if decibels > self.floor:
+            self.floor += min(decibels - self.floor, self.rise_db_per_second * seconds)
+            self.threshold = min(max(self.floor + self.margin_db, self.min_threshold), self.max_threshold)
+
+
+class SignalConditioner:
+    """
+    Conditions capture blocks and analysis windows before pitch estimation.
+
+    Blocks are high-pass filtered with a persistent filter state, so
+    consecutive blocks are filtered as one continuous signal. Levels are
+    computed without temporaries, windows are gated against a fixed or
+    noise-adaptive threshold, and an optional analysis window (taper) is
+    applied in place into a preallocated batch buffer.
+
+    Attributes:
+        sample_rate (int): The sample rate of the incoming audio.
+        tracker (NoiseFloorTracker): The adaptive gate, or None for a fixed threshold.
+        threshold_db (float): The fixed threshold, used when there is no tracker.
+    """
+
+    def __init__(self, sample_rate, window_size=None, highpass_cutoff=HIGHPASS_CUTOFF,
+                 threshold_db=THRESHOLD_DB, adaptive_threshold=True, window=None, max_batch_size=16):
+        self.sample_rate = sample_rate
+        self.threshold_db = threshold_db
+        self.tracker = NoiseFloorTracker(threshold_db) if adaptive_threshold else None
+
+        # Second-order sections and their state carry the filter across block boundaries
+        if highpass_cutoff:
+            self.sos = butter(HIGHPASS_ORDER, highpass_cutoff, 'highpass', fs=sample_rate, output='sos')
+            self.zi = np.zeros((self.sos.shape[0], 2))
+        else:
+            self.sos = None
+
+        # The taper and the buffer the tapered windows of one batch are written into
+        if window is not None:
+            self.window = np.hanning(window_size).astype(np.float32) if window == 'hann' else np.asarray(window, dtype=np.float32)
+            self.tapered = np.zeros((max_batch_size, len(self.window)), dtype=np.float32)
+        else:
+            self.window = None
+
+    @property
+    def threshold(self):
+        """The current gate threshold in decibels"""
+        return self.tracker.threshold if self.tracker is not None else self.threshold_db
+
+    def filter(self, block):
+        """
+        High-pass filter a capture block. The result is the float64 array
+        sosfilt allocates; it is not copied again here, since the sliding
+        window converts it to float32 as it stores it anyway.
+        """
+        if self.sos is None:
+            return block
+        filtered, self.zi = sosfilt(self.sos, block, zi=self.zi)
+        return filtered
+
+    def gate(self, decibels, seconds):
+        """Whether a window at `decibels`, `seconds` after the previous window, is loud enough to estimate"""
+        threshold = self.tracker.update(decibels, seconds) if self.tracker is not None else self.threshold_db
+        return decibels > threshold
+
+    def estimated(self, decibels, seconds, frequency, confidence):
+        """Account for the estimate of a window that passed the gate, so noise above the gate raises the floor"""
+        if self.tracker is not None and (frequency <= 0 or confidence < UNVOICED_CONFIDENCE):
+            self.tracker.unvoiced(decibels, seconds)
+
+    def taper(self, windows):
+        """Apply the analysis window to a batch of windows; returns them unchanged when there is none"""
+        if self.window is None:
+            return windows
+        if len(windows) > len(self.tapered):
+            self.tapered = np.zeros((len(windows), len(self.window)), dtype=np.float32)
+        for row, window in zip(self.tapered, windows):
+            np.multiply(window, self.window, out=row)
+        return self.tapered[:len(windows)]
+
+    def reset(self):
+        """Forget the filter state and the noise floor, e.g. when a new stream starts"""
+        if self.sos is not None:
+            self.zi[:] = 0.0
+        if self.tracker is not None:
+            self.tracker = NoiseFloorTracker(self.threshold_db)
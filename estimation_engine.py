@@ -0,0 +1,327 @@
+import threading
+import time
+
+from audio_source import create_source
+from estimation_scheduler import EstimationScheduler
+from estimation_worker import EstimationWorker, FAILED
+from metrics import Metrics
+from multichannel import MultiChannelPipeline
+from pitch_broadcast import PitchBroadcaster
+from pitch_estimators import ESTIMATORS, DEFAULT_ESTIMATOR, create_estimator
+from pitch_pipeline import PitchPipeline, WINDOW_SIZE, HOP_SIZE
+from pitch_smoothing import PitchSmoother
+from spectrum import SpectrumAnalyzer
+
+# Sessions that have not been seen for this many seconds are released automatically
+SESSION_TIMEOUT = 60
+
+# How long to wait for a worker process to load its estimator and open the source
+WORKER_START_TIMEOUT = 60
+
+# Seconds between polls of the worker's result ring when it has nothing new
+RELAY_INTERVAL = 0.005
+
+# The estimate reported while nothing has been heard yet
+SILENT_ESTIMATE = {'estimated_pitch': 0, 'confidence': 0, 'decibels': 0}
+
+
+class EstimationEngine:
+    """
+    One shared capture and estimation thread serving any number of client sessions.
+
+    Sessions are reference counted: the audio source and the worker thread are
+    started by the first `start` and shut down when the last session stops or
+    times out. The source is only stopped after the worker thread has exited,
+    so it is never closed under a running read. Results are published to a
+    PitchBroadcaster for streaming clients and kept as the latest estimate for
+    polling clients.
+
+    With `worker_process`, capture and estimation run in an EstimationWorker
+    process instead, and the engine thread only relays results from its
+    shared-memory ring.
+
+    With several `channels`, every input of the interface is tuned by its own
+    pipeline. `latest` then carries a 'channels' list with each channel's
+    estimate; the top-level fields are those of channel 0.
+
+    While anyone listens to `spectrum_broadcaster`, the capture thread also
+    computes spectrogram rows of channel 0 and publishes them there.
+
+    Attributes:
+        sample_rate (int): The capture sample rate in Hz.
+        buffer_size (int): The number of frames per captured block.
+        source_spec (str): The audio source passed to `create_source` (e.g. 'microphone' or 'synthetic').
+        source (AudioSource): The running audio source, if any.
+        broadcaster (PitchBroadcaster): Receives every new estimate.
+        metrics (Metrics): Stage timings, frame counts and queue gauges of the estimation loop.
+        settings (dict): The estimator and window settings of the running pipeline.
+        max_staleness (float): If set, estimates are scheduled at onsets and at least this often (in seconds).
+        worker (EstimationWorker): The running worker process, in worker mode.
+        channels (int): The number of input channels that are tuned independently.
+        spectrum (SpectrumAnalyzer): Computes the spectrogram rows, on the engine thread.
+        spectrum_broadcaster (PitchBroadcaster): Receives the (rows, bins) uint8 array of every block.
+    """
+
+    def __init__(self, sample_rate, buffer_size, source_spec='microphone', session_timeout=SESSION_TIMEOUT,
+                 metrics_enabled=False, max_staleness=None, worker_process=False, channels=1):
+        if worker_process and channels > 1:
+            raise ValueError('Multi-channel capture is not supported in a worker process')
+        self.sample_rate = sample_rate
+        self.max_staleness = max_staleness
+        self.worker_process = worker_process
+        self.worker = None
+        self.channels = channels
+        self.buffer_size = buffer_size
+        self.source_spec = source_spec
+        self.source = None
+        self.session_timeout = session_timeout
+        self.broadcaster = PitchBroadcaster()
+        self.settings = None
+        self.spectrum = SpectrumAnalyzer(sample_rate, max_block_size=buffer_size)
+        self.spectrum_broadcaster = PitchBroadcaster()
+        self.spectrum_listeners = 0
+
+        self.metrics = Metrics(metrics_enabled)
+        self.metrics.gauge('sessions', lambda: len(self.sessions))
+        self.metrics.gauge('queue_depth', lambda: self.source.queue_depth if self.source else 0)
+        self.metrics.gauge('dropped_blocks', self._dropped_blocks)
+        self.metrics.gauge('input_overflows', lambda: self.source.input_overflows if self.source else 0)
+
+        self.lock = threading.Lock()  # Guards the session table and the thread lifecycle
+        self.sessions = {}  # Session id -> time it was last seen
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.latest = self._silence()
+
+    @property
+    def is_running(self):
+        """Whether capture runs and keeps running; a thread whose sessions all expired is only winding down"""
+        return self.thread is not None and self.thread.is_alive() and not self.stop_event.is_set()
+
+    def start(self, session_id, estimator=DEFAULT_ESTIMATOR, estimator_options=None,
+              window_size=WINDOW_SIZE, hop_size=HOP_SIZE):
+        """
+        Register a session, starting capture if it is the first one.
+
+        The estimator settings only take effect when capture starts; sessions
+        joining a running engine share the existing pipeline. Returns the
+        settings in use.
+        """
+        with self.lock:
+            if not self.is_running and self.worker_process:
+                if estimator not in ESTIMATORS:
+                    raise ValueError(f"Unknown pitch estimator '{estimator}'. Choose from: {', '.join(ESTIMATORS)}")
+                self.settings = {'estimator': estimator, 'estimator_options': estimator_options or {},
+                                 'window_size': window_size, 'hop_size': hop_size, 'max_staleness': self.max_staleness}
+                self.sessions.clear()
+                self._start_worker(self.settings)
+            elif not self.is_running:
+                estimator_options = estimator_options or {}
+
+                def create_pipeline(channel=0):
+                    scheduler = EstimationScheduler(self.sample_rate, self.max_staleness) if self.max_staleness else None
+                    return PitchPipeline(create_estimator(estimator, self.sample_rate, **estimator_options),
+                                         self.sample_rate, window_size, hop_size, max_block_size=self.buffer_size,
+                                         metrics=self.metrics, scheduler=scheduler, smoother=PitchSmoother())
+
+                if self.channels > 1:
+                    pipeline = MultiChannelPipeline(create_pipeline, self.channels)
+                else:
+                    pipeline = create_pipeline()
+                self.settings = {'estimator': estimator, 'estimator_options': estimator_options,
+                                 'window_size': window_size, 'hop_size': hop_size, 'max_staleness': self.max_staleness}
+                self.sessions.clear()
+                self._start_thread(pipeline)
+            self.sessions[session_id] = time.monotonic()
+            return self.settings
+
+    def stop(self, session_id):
+        """Release a session, stopping capture when no sessions remain"""
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            if not self.sessions:
+                self._stop_thread()
+
+    def touch(self, session_id):
+        """Mark a session as alive so it does not time out"""
+        with self.lock:
+            if session_id in self.sessions:
+                self.sessions[session_id] = time.monotonic()
+
+    def shutdown(self):
+        """Stop capture regardless of the sessions"""
+        with self.lock:
+            self.sessions.clear()
+            self._stop_thread()
+
+    def _start_thread(self, pipeline):
+        # A thread that exited after its sessions expired may have left its source behind
+        self._stop_thread()
+
+        # Start the source here so device errors reach the caller
+        self.source = create_source(self.source_spec, self.sample_rate, self.buffer_size, self.channels)
+        self.source.start()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(self.source, pipeline), name='EstimationEngine', daemon=True)
+        self.thread.start()
+
+    def _start_worker(self, settings):
+        # Likewise, release a worker whose relay thread exited after its sessions expired
+        self._stop_thread()
+
+        # Wait for the worker here so estimator and device errors reach the caller
+        self.worker = EstimationWorker(self.sample_rate, self.buffer_size, self.source_spec)
+        self.worker.start(settings['estimator'], settings['estimator_options'], settings['window_size'],
+                          settings['hop_size'], settings['max_staleness'])
+        try:
+            self.worker.wait_until_running(WORKER_START_TIMEOUT)
+        except RuntimeError:
+            self.worker.stop()
+            self.worker = None
+            raise
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._relay, args=(self.worker,), name='EstimationEngine', daemon=True)
+        self.thread.start()
+
+    def _stop_thread(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+            self.latest = self._silence()
+        if self.source is not None:
+            self.source.stop()
+            self.source = None
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+    def subscribe_spectrum(self):
+        """Subscribe to the spectrogram rows; they are only computed while someone listens"""
+        if self.worker_process:
+            raise ValueError('The spectrum is not available while estimating in a worker process')
+        with self.lock:
+            self.spectrum_listeners += 1
+        return self.spectrum_broadcaster.subscribe()
+
+    def unsubscribe_spectrum(self):
+        with self.lock:
+            self.spectrum_listeners -= 1
+
+    def _silence(self):
+        if self.channels > 1:
+            return dict(SILENT_ESTIMATE, channels=[dict(SILENT_ESTIMATE) for channel in range(self.channels)])
+        return dict(SILENT_ESTIMATE)
+
+    def estimate(self, channel=0):
+        """The latest estimate of one input channel"""
+        if not 0 <= channel < self.channels:
+            raise ValueError(f'Channel {channel} out of range; the engine captures {self.channels} channel(s)')
+        latest = self.latest
+        return latest['channels'][channel] if self.channels > 1 else latest
+
+    def _dropped_blocks(self):
+        if self.source is not None:
+            return self.source.dropped_blocks
+        return self.worker.dropped_blocks if self.worker is not None else 0
+
+    def _expire_sessions(self):
+        """Drop sessions whose clients went away without calling stop"""
+        # Never block here: a concurrent stop() holds the lock while it waits for this thread
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            for session_id, last_seen in list(self.sessions.items()):
+                if now - last_seen > self.session_timeout:
+                    del self.sessions[session_id]
+            if not self.sessions:
+                self.stop_event.set()
+        finally:
+            self.lock.release()
+
+    def _run(self, source, pipeline):
+        """The estimation loop, run on the engine thread; stops the source when it exits"""
+        try:
+            self._estimate(source, pipeline)
+        finally:
+            # The loop also ends when every session expired, with nobody calling stop()
+            source.stop()
+            if isinstance(pipeline, MultiChannelPipeline):
+                pipeline.close()
+
+    def _estimate(self, source, pipeline):
+        read_timer = self.metrics.timer('read')
+        publish_timer = self.metrics.timer('publish')
+        last_expiry_check = time.monotonic()
+        spectrum_running = False
+        while not self.stop_event.is_set():
+            # Wait for the next captured block, checking regularly whether we should stop
+            with read_timer:
+                audio = source.read(timeout=0.5)
+
+            # Spectrogram rows for listening displays; a display that comes back starts from a fresh stream
+            if audio is not None and self.spectrum_listeners:
+                rows = self.spectrum.process(audio[:, 0] if self.channels > 1 else audio)
+                if len(rows):
+                    self.spectrum_broadcaster.publish(rows)
+                spectrum_running = True
+            elif spectrum_running and not self.spectrum_listeners:
+                self.spectrum.reset()
+                spectrum_running = False
+
+            # Publish every new estimate to polling and streaming clients
+            if audio is not None and self.channels > 1:
+                self._publish_channels(pipeline.process(audio), publish_timer)
+            elif audio is not None:
+                for result in pipeline.process(audio):
+                    with publish_timer:
+                        self.latest = {'estimated_pitch': result.frequency, 'confidence': result.confidence,
+                                       'decibels': result.decibels}
+                        self.broadcaster.publish(self.latest)
+
+            if time.monotonic() - last_expiry_check > 1:
+                last_expiry_check = time.monotonic()
+                self._expire_sessions()
+
+    def _publish_channels(self, channel_results, publish_timer):
+        """Publish one update holding the newest estimate of every channel that produced one"""
+        if not any(channel_results):
+            return
+        with publish_timer:
+            channels = list(self.latest['channels'])
+            for channel, results in enumerate(channel_results):
+                if results:
+                    channels[channel] = {'estimated_pitch': results[-1].frequency,
+                                         'confidence': results[-1].confidence, 'decibels': results[-1].decibels}
+            self.latest = dict(channels[0], channels=channels)
+            self.broadcaster.publish(self.latest)
+
+    def _relay(self, worker):
+        """Publish the results of the worker process, run on the engine thread in worker mode; stops the worker when it exits"""
+        try:
+            self._forward(worker)
+        finally:
+            # Stops the process and unlinks its shared-memory ring, also when every session expired
+            worker.stop()
+
+    def _forward(self, worker):
+        publish_timer = self.metrics.timer('publish')
+        last_expiry_check = time.monotonic()
+        while not self.stop_event.is_set():
+            # Only the newest result matters to clients; the broadcaster coalesces anyway
+            results = worker.read()
+            if len(results):
+                with publish_timer:
+                    self.latest = {'estimated_pitch': float(results[-1]['frequency']),
+                                   'confidence': float(results[-1]['confidence']),
+                                   'decibels': float(results[-1]['decibels'])}
+                    self.broadcaster.publish(self.latest)
+            elif worker.status == FAILED:
+                break
+            else:
+                self.stop_event.wait(RELAY_INTERVAL)
+
+            if time.monotonic() - last_expiry_check > 1:
+                last_expiry_check = time.monotonic()
+                self._expire_sessions()
@@ -0,0 +1,153 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# A full estimate is run at least this often (in seconds), even on a steady note
+MAX_STALENESS = 0.25
+
+# Onset detection: the newest samples of each window are compared with those of the previous window
+ONSET_FRAME_SIZE = 512
+ONSET_FLUX_THRESHOLD = 0.5
+ONSET_LEVEL_JUMP_DB = 6.0
+
+# Compression of the magnitude spectrum before taking the flux, log(1 + gamma * |X|)
+FLUX_COMPRESSION = 100.0
+
+# Pitch tracking between onsets: search within this fraction of the previous period,
+# and give up when the normalized difference at the best lag is above the threshold
+TRACK_SEARCH = 0.03
+TRACK_THRESHOLD = 0.2
+
+# What the scheduler decided for a window
+ESTIMATE = 'estimate'
+TRACK = 'track'
+
+
+class OnsetDetector:
+    """
+    A cheap onset detector based on spectral flux and level jumps.
+
+    The newest `frame_size` samples of every window are tapered and
+    transformed; an onset is reported when the positive change of the
+    log-compressed magnitude spectrum since the previous window (the flux),
+    or the rise in level, exceeds its threshold.
+
+    Attributes:
+        frame_size (int): The number of newest samples of a window that are examined.
+        flux_threshold (float): The mean positive log-magnitude change that counts as an onset.
+        level_jump_db (float): The rise in level that counts as an onset.
+    """
+
+    def __init__(self, frame_size=ONSET_FRAME_SIZE, flux_threshold=ONSET_FLUX_THRESHOLD,
+                 level_jump_db=ONSET_LEVEL_JUMP_DB):
+        self.frame_size = frame_size
+        self.flux_threshold = flux_threshold
+        self.level_jump_db = level_jump_db
+        self.taper = np.hanning(frame_size).astype(np.float32)
+        self.frame = np.zeros(frame_size, dtype=np.float32)
+        self.spectrum = np.zeros(frame_size // 2 + 1)
+        self.previous_spectrum = np.zeros(frame_size // 2 + 1)
+        self.previous_decibels = None
+        self.flux = 0.0
+
+    def detect(self, window, decibels):
+        """Whether a window (at `decibels`) starts a new note relative to the previous one"""
+        np.multiply(window[-self.frame_size:], self.taper, out=self.frame)
+        np.abs(np.fft.rfft(self.frame), out=self.spectrum)
+        np.multiply(self.spectrum, FLUX_COMPRESSION, out=self.spectrum)
+        np.log1p(self.spectrum, out=self.spectrum)
+
+        # Swap the buffers so the difference can be taken in place
+        self.spectrum, self.previous_spectrum = self.previous_spectrum, self.spectrum
+        np.subtract(self.previous_spectrum, self.spectrum, out=self.spectrum)
+        np.maximum(self.spectrum, 0.0, out=self.spectrum)
+        self.flux = float(self.spectrum.mean())
+
+        first = self.previous_decibels is None
+        jump = not first and decibels - self.previous_decibels > self.level_jump_db
+        self.previous_decibels = decibels
+        return first or jump or self.flux > self.flux_threshold
+
+    def reset(self):
+        self.previous_spectrum[:] = 0.0
+        self.previous_decibels = None
+
+
+def track_pitch(window, frequency, sample_rate, search=TRACK_SEARCH, threshold=TRACK_THRESHOLD):
+    """
+    Refine a known pitch on a new window by evaluating the normalized
+    difference function only at lags near the previous period.
+
+    Returns:
+        tuple: (frequency, confidence), or None if the pitch has moved outside
+        the search range or the window is no longer periodic there.
+    """
+    period = sample_rate / frequency
+    low = max(2, int(period * (1 - search)) - 1)
+    high = int(np.ceil(period * (1 + search))) + 1
+    length = len(window) - high
+    if length < high:
+        return None
+
+    # Lagged copies of the window are views; only the products are computed
+    reference = window[:length]
+    lagged = as_strided(window[low:], shape=(high + 1 - low, length), strides=(window.strides[0],) * 2, writeable=False)
+    cross = lagged @ reference
+    energies = np.einsum('ij,ij->i', lagged, lagged)
+    energy = float(reference @ reference)
+    difference = 1 - 2 * cross / np.maximum(energy + energies, 1e-12)
+
+    best = int(np.argmin(difference))
+    if best == 0 or best == len(difference) - 1 or difference[best] > threshold:
+        return None
+
+    # Parabolic interpolation around the best lag
+    left, center, right = difference[best - 1], difference[best], difference[best + 1]
+    curvature = left - 2 * center + right
+    shift = 0.5 * (left - right) / curvature if curvature > 0 else 0.0
+    return sample_rate / (low + best + shift), float(1 - center)
+
+
+class EstimationScheduler:
+    """
+    Decides for each voiced window whether the (expensive) estimator must run.
+
+    A full estimate is requested at an onset, after the pitch tracker loses
+    the note, and whenever the last full estimate is older than
+    `max_staleness`. In between, the previous pitch is followed with
+    `track_pitch`, which only looks at lags near the previous period.
+
+    Attributes:
+        sample_rate (int): The sample rate of the analysed audio.
+        max_staleness (float): The longest time in seconds between full estimates.
+        onsets (OnsetDetector): The onset detector.
+        last_estimate_time (float): When the last full estimate was made, in seconds.
+    """
+
+    def __init__(self, sample_rate, max_staleness=MAX_STALENESS, onsets=None):
+        self.sample_rate = sample_rate
+        self.max_staleness = max_staleness
+        self.onsets = onsets if onsets is not None else OnsetDetector()
+        self.last_estimate_time = None
+
+    def decide(self, window, decibels, time):
+        """Return ESTIMATE or TRACK for a voiced window ending at `time`"""
+        onset = self.onsets.detect(window, decibels)
+        if onset or self.last_estimate_time is None or time - self.last_estimate_time >= self.max_staleness:
+            self.estimated(time)
+            return ESTIMATE
+        return TRACK
+
+    def estimated(self, time):
+        """Record that a full estimate was made for the window ending at `time`"""
+        self.last_estimate_time = time
+
+    def track(self, window, frequency):
+        """Follow the previous pitch on a window; returns (frequency, confidence) or None if it was lost"""
+        if frequency <= 0:
+            return None
+        return track_pitch(window, frequency, self.sample_rate)
+
+    def reset(self):
+        """Forget the current note, e.g. after a silent window"""
+        self.onsets.reset()
+        self.last_estimate_time = None
@@ -0,0 +1,253 @@
+"""
+Capture and estimation in a separate process.
+
+The worker process owns the audio source, the pipeline and the estimator
+(and with them TensorFlow, for CREPE), so inference never competes with the
+GUI or the web server for the GIL. Results are handed back through a
+single-producer ring of fixed-size records in `multiprocessing.shared_memory`:
+the reader copies new records straight out of the shared buffer, with no
+pickling, no queue and no locks, and audio never leaves the worker.
+"""
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_source import create_source
+from estimation_scheduler import EstimationScheduler
+from pitch_estimators import DEFAULT_ESTIMATOR, create_estimator
+from pitch_pipeline import PitchPipeline, WINDOW_SIZE, HOP_SIZE
+from pitch_smoothing import PitchSmoother
+
+# Number of results the ring holds; a reader that falls further behind skips the oldest
+RING_CAPACITY = 1024
+
+# One published result. `sequence` is the record's position in the stream plus one,
+# or 0 while the record is being written; `published` is the time.monotonic() of publication.
+RESULT_DTYPE = np.dtype([('sequence', '<u8'), ('time', '<f8'), ('frequency', '<f8'), ('confidence', '<f8'),
+                         ('decibels', '<f8'), ('published', '<f8')])
+
+HEADER_DTYPE = np.dtype([('count', '<u8'), ('capacity', '<u8'), ('status', '<i8'), ('dropped_blocks', '<u8')])
+HEADER_SIZE = 64
+
+# Worker states, as stored in the ring header
+STARTING = 0
+RUNNING = 1
+STOPPED = 2
+FAILED = -1
+
+
+class ResultRing:
+    """
+    A lock-free single-producer ring of pitch results in shared memory.
+
+    The writer marks a record as in progress (sequence 0), fills it in, stamps
+    its sequence number and only then advances the shared count. A reader
+    copies the records between its own position and the count, then checks
+    that each record's sequence was the expected one both before and after the
+    copy (a seqlock), discarding records the writer overwrote meanwhile.
+
+    Attributes:
+        name (str): The shared memory block name, used to attach from another process.
+        capacity (int): The number of records in the ring.
+        read_count (int): The stream position up to which this reader has read.
+        skipped (int): Results this reader lost because it fell behind.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, name=None):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RESULT_DTYPE.itemsize)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.memory.buf)
+        if name is None:
+            self.header['capacity'] = capacity
+        self.capacity = int(self.header['capacity'])
+        self.records = np.ndarray(self.capacity, dtype=RESULT_DTYPE, buffer=self.memory.buf, offset=HEADER_SIZE)
+        self.read_count = 0
+        self.skipped = 0
+
+    @property
+    def status(self):
+        return int(self.header['status'])
+
+    def set_status(self, status):
+        self.header['status'] = status
+
+    def write(self, result):
+        """Publish a PitchResult (writer process only)"""
+        count = int(self.header['count'])
+        record = self.records[count % self.capacity:count % self.capacity + 1]
+        record['sequence'] = 0
+        record['time'] = result.time
+        record['frequency'] = result.frequency
+        record['confidence'] = result.confidence
+        record['decibels'] = result.decibels
+        record['published'] = time.monotonic()
+        record['sequence'] = count + 1
+        self.header['count'] = count + 1
+
+    def read(self):
+        """Return the results published since the last read, as a structured array copied out of the ring"""
+        count = int(self.header['count'])
+        start = max(self.read_count, count - self.capacity)
+        self.skipped += start - self.read_count
+        self.read_count = count
+        if start == count:
+            return self.records[:0].copy()
+
+        # Copy first, then check the sequence numbers again in case the writer lapped us during the copy
+        expected = np.arange(start + 1, count + 1, dtype=np.uint64)
+        indices = np.arange(start, count) % self.capacity
+        snapshot = self.records[indices]
+        valid = (snapshot['sequence'] == expected) & (self.records['sequence'][indices] == expected)
+        if not valid.all():
+            self.skipped += int(np.count_nonzero(~valid))
+            snapshot = snapshot[valid]
+        return snapshot
+
+    def latest(self):
+        """Return the newest result without advancing this reader, or None"""
+        count = int(self.header['count'])
+        if count == 0:
+            return None
+        record = self.records[(count - 1) % self.capacity].copy()
+        return record if record['sequence'] == count else None
+
+    def close(self):
+        # Drop the views before closing, as the buffer cannot be released while they exist
+        self.header = self.records = None
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+
+def run_worker(ring_name, settings, stop_event, errors):
+    """The entry point of the worker process"""
+    ring = ResultRing(name=ring_name)
+    source = None
+    try:
+        try:
+            estimator = create_estimator(settings['estimator'], settings['sample_rate'], **settings['estimator_options'])
+            scheduler = (EstimationScheduler(settings['sample_rate'], settings['max_staleness'])
+                         if settings['max_staleness'] else None)
+            pipeline = PitchPipeline(estimator, settings['sample_rate'], settings['window_size'], settings['hop_size'],
+                                     max_block_size=settings['block_size'], scheduler=scheduler,
+                                     smoother=PitchSmoother())
+            source = create_source(settings['source_spec'], settings['sample_rate'], settings['block_size'])
+            source.start()
+        except Exception as error:
+            errors.put(f'{type(error).__name__}: {error}')
+            ring.set_status(FAILED)
+            return
+
+        ring.set_status(RUNNING)
+        while not stop_event.is_set():
+            audio = source.read(timeout=0.5)
+            if audio is None:
+                continue
+            for result in pipeline.process(audio):
+                ring.write(result)
+            ring.header['dropped_blocks'] = source.dropped_blocks
+        ring.set_status(STOPPED)
+    finally:
+        if source is not None:
+            source.stop()
+        ring.close()
+
+
+class EstimationWorker:
+    """
+    Runs capture and estimation in a child process and reads its results from shared memory.
+
+    The child is started with the 'spawn' method, so it never inherits the
+    parent's threads, Qt state or loaded models.
+
+    Attributes:
+        sample_rate (int): The capture sample rate in Hz.
+        block_size (int): The number of frames per captured block.
+        source_spec (str): The audio source passed to `create_source` in the child.
+        ring (ResultRing): The parent's view of the result ring, while running.
+        error (str): Why the worker failed to start, if it did.
+    """
+
+    def __init__(self, sample_rate, block_size, source_spec='microphone', capacity=RING_CAPACITY):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.source_spec = source_spec
+        self.capacity = capacity
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = None
+        self.process = None
+        self.stop_event = None
+        self.errors = None
+        self.error = None
+
+    def start(self, estimator=DEFAULT_ESTIMATOR, estimator_options=None, window_size=WINDOW_SIZE, hop_size=HOP_SIZE,
+              max_staleness=None):
+        """Start the worker process; use `wait_until_running` to find out whether it came up"""
+        settings = {'estimator': estimator, 'estimator_options': estimator_options or {},
+                    'window_size': window_size, 'hop_size': hop_size, 'max_staleness': max_staleness,
+                    'sample_rate': self.sample_rate, 'block_size': self.block_size, 'source_spec': self.source_spec}
+        self.ring = ResultRing(self.capacity)
+        self.stop_event = self.context.Event()
+        self.errors = self.context.Queue()
+        self.error = None
+        self.process = self.context.Process(target=run_worker, name='EstimationWorker', daemon=True,
+                                            args=(self.ring.name, settings, self.stop_event, self.errors))
+        self.process.start()
+
+    @property
+    def status(self):
+        if self.ring is None:
+            return STOPPED
+        status = self.ring.status
+        if status in (STARTING, RUNNING) and not self.process.is_alive():
+            return FAILED
+        return status
+
+    def failure(self):
+        """Return why the worker failed, or None if it has not failed"""
+        if self.status != FAILED:
+            return None
+        if self.error is None:
+            try:
+                self.error = self.errors.get(timeout=1)
+            except Exception:
+                self.error = f'worker process exited with code {self.process.exitcode}'
+        return self.error
+
+    def wait_until_running(self, timeout=None):
+        """Block until the worker is capturing; raises RuntimeError if it failed to start"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.status == STARTING:
+            if deadline is not None and time.monotonic() > deadline:
+                raise RuntimeError('estimation worker did not start in time')
+            time.sleep(0.01)
+        if self.status == FAILED:
+            raise RuntimeError(self.failure())
+
+    def read(self):
+        """Return the results published since the last read, as a structured array (see RESULT_DTYPE)"""
+        return self.ring.read()
+
+    @property
+    def dropped_blocks(self):
+        return int(self.ring.header['dropped_blocks']) if self.ring is not None else 0
+
+    def stop(self):
+        """Stop the worker process and release the shared memory"""
+        if self.process is not None:
+            self.stop_event.set()
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+            self.process = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
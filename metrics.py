@@ -0,0 +1,160 @@
+import threading
+import time
+
+import numpy as np
+
+# Histogram bucket upper bounds in seconds, from 50 us to 1 s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Number of recent observations kept per stage for percentiles
+ROLLING_WINDOW = 1024
+
+
+class StageHistogram:
+    """
+    Timing statistics for one pipeline stage.
+
+    Keeps cumulative Prometheus-style buckets plus a ring of the most recent
+    observations, from which rolling percentiles are computed.
+    """
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = np.zeros(ROLLING_WINDOW)
+        self.recent_index = 0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.recent[self.recent_index % ROLLING_WINDOW] = seconds
+        self.recent_index += 1
+
+    def percentiles(self, quantiles=(50, 90, 99)):
+        """Percentiles of the recent observations, in seconds"""
+        recent = self.recent[:min(self.recent_index, ROLLING_WINDOW)]
+        if not len(recent):
+            return {q: 0.0 for q in quantiles}
+        return dict(zip(quantiles, np.percentile(recent, quantiles)))
+
+
+class StageTimer:
+    """
+    A reusable context manager that times one stage.
+
+    The start time is kept per thread, so pipelines on several threads can
+    share the timer of a stage. When metrics are disabled, entering and
+    leaving it only checks a flag.
+    """
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.local = threading.local()
+
+    def __enter__(self):
+        self.local.start = time.perf_counter() if self.metrics.enabled else None
+        return self
+
+    def __exit__(self, *exc_info):
+        start = self.local.start
+        if start is not None:
+            self.metrics.observe(self.stage, time.perf_counter() - start)
+
+
+class Metrics:
+    """
+    Hot-path instrumentation for the estimation loop.
+
+    Stages are timed with `timer(stage)`, events are counted with `increment`
+    and gauges (such as the capture queue depth) are read from callbacks when
+    the metrics are exported. Everything is a no-op while `enabled` is False.
+
+    Attributes:
+        enabled (bool): Whether observations are recorded; may be toggled at any time.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def timer(self, stage):
+        """Return the (shared) timer for a stage"""
+        timer = self.timers.get(stage)
+        if timer is None:
+            timer = self.timers.setdefault(stage, StageTimer(self, stage))
+        return timer
+
+    def observe(self, stage, seconds):
+        """Record the duration of one run of a stage"""
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+    def increment(self, counter, amount=1):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def gauge(self, name, callback):
+        """Register a callback whose value is exported as a gauge (None removes it)"""
+        with self.lock:
+            if callback is None:
+                self.gauges.pop(name, None)
+            else:
+                self.gauges[name] = callback
+
+    def summary(self):
+        """Rolling per-stage statistics and current counters, for display"""
+        with self.lock:
+            stages = {stage: {'count': histogram.count, **{f'p{q}': value for q, value in histogram.percentiles().items()}}
+                      for stage, histogram in self.stages.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        return {'stages': stages, 'counters': counters, 'gauges': {name: callback() for name, callback in gauges.items()}}
+
+    def render_prometheus(self, prefix='tuner'):
+        """Export the metrics in the Prometheus text exposition format"""
+        with self.lock:
+            stages = {stage: (list(h.bucket_counts), h.count, h.total) for stage, h in self.stages.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        lines = [f'# HELP {prefix}_metrics_enabled Whether hot-path instrumentation is recording',
+                 f'# TYPE {prefix}_metrics_enabled gauge',
+                 f'{prefix}_metrics_enabled {int(self.enabled)}']
+
+        if stages:
+            lines += [f'# HELP {prefix}_stage_seconds Time spent in each stage of the estimation loop',
+                      f'# TYPE {prefix}_stage_seconds histogram']
+            for stage, (bucket_counts, count, total) in sorted(stages.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        for counter, value in sorted(counters.items()):
+            lines += [f'# TYPE {prefix}_{counter}_total counter', f'{prefix}_{counter}_total {value}']
+
+        for name, callback in sorted(gauges.items()):
+            lines += [f'# TYPE {prefix}_{name} gauge', f'{prefix}_{name} {callback()}']
+
+        return '\n'.join(lines) + '\n'
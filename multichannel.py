@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MultiChannelPipeline:
+    """
+    Runs one PitchPipeline per channel of a multi-channel capture.
+
+    Every channel keeps its own conditioning, gate, estimator and smoother
+    state, since the instruments are independent. A block's channels are
+    handed to the pipelines as strided column views, without deinterleaving
+    copies. When the estimator can run on several threads at once (see
+    `PitchEstimator.concurrency`), the channels are processed on a thread
+    pool of that many workers, so backends that release the GIL overlap
+    across channels; otherwise they run one after another.
+
+    Attributes:
+        pipelines (list): The PitchPipeline of every channel.
+        channels (int): The number of channels.
+    """
+
+    def __init__(self, create_pipeline, channels):
+        self.pipelines = [create_pipeline(channel) for channel in range(channels)]
+        self.channels = channels
+        concurrency = self.pipelines[0].estimator.concurrency
+        workers = channels if concurrency is None else min(channels, concurrency)
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='Channel') if workers > 1 else None
+
+    def process(self, block):
+        """Push a (frames, channels) block through every channel's pipeline and return one result list per channel"""
+        columns = [block[:, channel] for channel in range(self.channels)]
+        if self.pool is None:
+            return [pipeline.process(column) for pipeline, column in zip(self.pipelines, columns)]
+        return list(self.pool.map(lambda args: args[0].process(args[1]), zip(self.pipelines, columns)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -0,0 +1,50 @@
+import threading
+
+
+class PitchBroadcaster:
+    """
+    Publishes the latest estimate to any number of waiting consumers.
+
+    Only the most recent value is kept. Each consumer remembers the version
+    it last saw, so a slow consumer simply skips to the newest estimate
+    instead of building up a backlog.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.latest = None
+        self.version = 0
+
+    def publish(self, data):
+        """Store a new estimate and wake every waiting consumer"""
+        with self.condition:
+            self.latest = data
+            self.version += 1
+            self.condition.notify_all()
+
+    def subscribe(self):
+        """Create a subscription that receives estimates published from now on"""
+        with self.condition:
+            return Subscription(self, self.version)
+
+
+class Subscription:
+    """
+    A consumer's view of a PitchBroadcaster.
+
+    Attributes:
+        seen_version (int): The version of the last estimate returned by `wait`.
+    """
+
+    def __init__(self, broadcaster, seen_version):
+        self.broadcaster = broadcaster
+        self.seen_version = seen_version
+
+    def wait(self, timeout=None):
+        """Block until a newer estimate is published and return it, or None on timeout"""
+        condition = self.broadcaster.condition
+        with condition:
+            if not condition.wait_for(lambda: self.broadcaster.version != self.seen_version, timeout):
+                return None
+            self.seen_version = self.broadcaster.version
+            return self.broadcaster.latest
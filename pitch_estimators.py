@@ -0,0 +1,489 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+# CREPE model constants: 1024-sample frames at 16 kHz, 360 bins spaced 20 cents apart
+CREPE_SAMPLE_RATE = 16000
+CREPE_FRAME_SIZE = 1024
+CREPE_BINS = 360
+CREPE_CENTS = np.linspace(0, 7180, CREPE_BINS) + 1997.3794084376191
+CREPE_CAPACITIES = ('tiny', 'small', 'medium', 'large', 'full')
+
+# Exported CREPE models (see tools/export_crepe.py) are run with the runtime matching their file extension
+CREPE_MODEL_EXTENSIONS = {'.onnx': 'onnx', '.tflite': 'tflite'}
+
+# Loaded CREPE models by capacity, model file and thread count; TensorFlow or the
+# exported model's runtime is only imported when the first one is needed
+_crepe_models = {}
+_crepe_models_lock = threading.Lock()
+
+
+def load_crepe_model(model_capacity, model_path=None, threads=None):
+    """
+    Load the CREPE model on first use, then return the cached model. Without a
+    `model_path` this is the stock Keras model for `model_capacity`; otherwise
+    an exported ONNX or TFLite model, run on the CPU with `threads` threads.
+    Every model has the Keras `predict_on_batch(frames)` interface, and may be
+    called from several threads at once (e.g. by a multi-channel pipeline).
+    """
+    key = (model_capacity, model_path, threads)
+    with _crepe_models_lock:
+        model = _crepe_models.get(key)
+        if model is None:
+            if model_path is None:
+                import crepe.core
+                # A second Keras model would double the memory, so concurrent callers take turns instead
+                model = CrepeModelPool(lambda: crepe.core.build_and_load_model(model_capacity), size=1)
+            else:
+                runtime = CREPE_MODEL_EXTENSIONS.get(os.path.splitext(model_path)[1].lower())
+                if runtime is None:
+                    raise ValueError(f"Unknown CREPE model format '{model_path}'. Use one of: "
+                                     f"{', '.join(CREPE_MODEL_EXTENSIONS)}")
+                if runtime == 'onnx':
+                    model = OnnxCrepeModel(model_path, threads)  # Sessions may be run from several threads
+                else:
+                    model = CrepeModelPool(lambda: TFLiteCrepeModel(model_path, threads))
+            _crepe_models[key] = model
+        return model
+
+
+def crepe_runtime_options(environ=os.environ):
+    """
+    CrepeEstimator options selecting an exported model from the environment:
+    TUNER_CREPE_MODEL is its path (with an optional '{capacity}' placeholder,
+    e.g. 'models/crepe-{capacity}-int8.onnx') and TUNER_CREPE_THREADS the
+    number of CPU threads it may use.
+    """
+    options = {}
+    if environ.get('TUNER_CREPE_MODEL'):
+        options['model_path'] = environ['TUNER_CREPE_MODEL']
+    if environ.get('TUNER_CREPE_THREADS'):
+        options['threads'] = int(environ['TUNER_CREPE_THREADS'])
+    return options
+
+
+def normalize_frames(windows):
+    """Stack the most recent CREPE frame of each window, normalized like crepe.get_activation"""
+    frames = np.stack([window[-CREPE_FRAME_SIZE:] for window in windows]).astype(np.float32)
+    frames -= np.mean(frames, axis=1, keepdims=True)
+    frames /= np.clip(np.std(frames, axis=1, keepdims=True), 1e-8, None)
+    return frames
+
+
+class CrepeModelPool:
+    """
+    Shares a CREPE model that must not run on two threads at once.
+
+    A TFLite interpreter is resized and invoked in place, and a Keras model is
+    not safe to predict with concurrently, so every call checks out an idle
+    instance and returns it afterwards. While all instances are busy another
+    one is created, up to `size` instances, after which callers wait. The
+    first instance is created immediately, so loading errors surface at once.
+
+    Attributes:
+        size (int): The maximum number of instances, or None for no limit.
+    """
+
+    def __init__(self, create, size=None):
+        self.create = create
+        self.size = size
+        self.idle = [create()]
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(size) if size else None
+
+    def predict_on_batch(self, frames):
+        if self.slots is not None:
+            self.slots.acquire()
+        try:
+            with self.lock:
+                model = self.idle.pop() if self.idle else None
+            if model is None:
+                model = self.create()
+            try:
+                return model.predict_on_batch(frames)
+            finally:
+                with self.lock:
+                    self.idle.append(model)
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+
+class OnnxCrepeModel:
+    """
+    An exported CREPE model run with ONNX Runtime on the CPU.
+
+    Attributes:
+        path (str): The .onnx file.
+        threads (int): The intra-op thread count, or None for the runtime default.
+    """
+
+    def __init__(self, path, threads=None):
+        import onnxruntime
+        self.path = path
+        self.threads = threads
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_on_batch(self, frames):
+        return self.session.run(None, {self.input_name: frames})[0]
+
+
+class TFLiteCrepeModel:
+    """
+    An exported CREPE model run with the TensorFlow Lite interpreter on the CPU.
+
+    The standalone `tflite_runtime` package is preferred, so TensorFlow itself
+    is not needed. The interpreter's batch dimension is resized whenever the
+    batch size changes, and int8 inputs and outputs are (de)quantized here.
+    One instance must not be used from two threads at once; `load_crepe_model`
+    pools them.
+
+    Attributes:
+        path (str): The .tflite file.
+        threads (int): The interpreter thread count, or None for the runtime default.
+    """
+
+    def __init__(self, path, threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.path = path
+        self.threads = threads
+        self.interpreter = Interpreter(model_path=path, num_threads=threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+
+    def predict_on_batch(self, frames):
+        if len(frames) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input['index'], [len(frames), CREPE_FRAME_SIZE])
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = len(frames)
+
+        scale, zero_point = self.input['quantization']
+        if self.input['dtype'] != np.float32 and scale:
+            limits = np.iinfo(self.input['dtype'])
+            frames = np.clip(np.round(frames / scale + zero_point), limits.min, limits.max).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], frames)
+        self.interpreter.invoke()
+        activations = self.interpreter.get_tensor(self.output['index'])
+        scale, zero_point = self.output['quantization']
+        if self.output['dtype'] != np.float32 and scale:
+            activations = (activations.astype(np.float32) - zero_point) * scale
+        return activations
+
+
+class PitchEstimator:
+    """
+    Base class for pitch estimation backends.
+
+    Subclasses implement `estimate`, which takes a mono float32 buffer and
+    returns a (frequency, confidence) tuple. A frequency of 0 means no pitch
+    was found. Backends that benefit from batching override `estimate_batch`.
+
+    Attributes:
+        name (str): The name used to select the backend.
+        sample_rate (int): The sample rate of the audio passed to `estimate`.
+        concurrency (int): How many threads can run estimates of this backend at
+            once to any benefit, or None for no limit.
+    """
+
+    name = None
+    concurrency = 1
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def estimate(self, audio):
+        raise NotImplementedError
+
+    def estimate_batch(self, windows):
+        """Estimate the pitch of consecutive windows, returning one tuple per window"""
+        return [self.estimate(window) for window in windows]
+
+    def reset(self):
+        """Forget any state carried between windows (e.g. after a silent gap)"""
+
+
+class YinEstimator(PitchEstimator):
+    """
+    A vectorized NumPy implementation of the YIN pitch estimator.
+
+    The difference function is computed from an FFT autocorrelation and a
+    running energy sum, so the cost per buffer is a couple of FFTs instead of
+    a neural network forward pass.
+    """
+
+    name = 'yin'
+
+    def __init__(self, sample_rate, min_frequency=60.0, max_frequency=1200.0, threshold=0.1):
+        super().__init__(sample_rate)
+        self.threshold = threshold
+        self.min_lag = max(2, int(sample_rate / max_frequency))
+        self.max_lag = int(np.ceil(sample_rate / min_frequency))
+
+    def estimate(self, audio):
+        audio = np.asarray(audio, dtype=np.float64)
+        max_lag = min(self.max_lag, len(audio) // 2)
+        if max_lag <= self.min_lag:
+            return 0.0, 0.0
+        width = len(audio) - max_lag
+        if not np.any(audio):
+            return 0.0, 0.0
+
+        # Autocorrelation r(tau) = sum_j x[j] * x[j + tau] over the integration window
+        fft_size = 1 << int(np.ceil(np.log2(len(audio) + width)))
+        spectrum = np.fft.rfft(audio, fft_size) * np.conj(np.fft.rfft(audio[:width], fft_size))
+        autocorr = np.fft.irfft(spectrum, fft_size)[:max_lag + 1]
+
+        # Difference function d(tau) = E(0) + E(tau) - 2 r(tau) using a running energy sum
+        energy = np.concatenate(([0.0], np.cumsum(audio * audio)))
+        lags = np.arange(max_lag + 1)
+        difference = energy[width] + energy[lags + width] - energy[lags] - 2 * autocorr
+        difference[0] = 0.0
+
+        # Cumulative mean normalized difference function
+        cmndf = np.ones(max_lag + 1)
+        running_sum = np.cumsum(difference[1:])
+        running_sum[running_sum == 0] = np.finfo(np.float64).tiny
+        cmndf[1:] = difference[1:] * lags[1:] / running_sum
+
+        # Take the first dip below the threshold, or the global minimum if there is none
+        search = cmndf[self.min_lag:max_lag]
+        below = np.flatnonzero(search < self.threshold)
+        if len(below):
+            lag = below[0] + self.min_lag
+            while lag + 1 < max_lag and cmndf[lag + 1] < cmndf[lag]:
+                lag += 1
+        else:
+            lag = int(np.argmin(search)) + self.min_lag
+
+        confidence = float(np.clip(1.0 - cmndf[lag], 0.0, 1.0))
+
+        # Parabolic interpolation around the chosen lag for sub-sample precision
+        if 0 < lag < max_lag:
+            left, centre, right = cmndf[lag - 1], cmndf[lag], cmndf[lag + 1]
+            denominator = left - 2 * centre + right
+            shift = 0.5 * (left - right) / denominator if denominator != 0 else 0.0
+        else:
+            shift = 0.0
+
+        return float(self.sample_rate / (lag + shift)), confidence
+
+
+class CrepeEstimator(PitchEstimator):
+    """
+    Pitch estimation using the CREPE neural network.
+
+    All windows handed to `estimate_batch` go through the model in a single
+    forward pass. The activations are decoded with an online Viterbi pass
+    whose state carries over between calls, so smoothing works across
+    batches without re-decoding the whole history.
+
+    With a `model_path`, an exported (and possibly int8-quantized) ONNX or
+    TFLite model replaces the Keras one; '{capacity}' in the path is replaced
+    with the model capacity.
+
+    Attributes:
+        model_capacity (str): One of 'tiny', 'small', 'medium', 'large' or 'full'.
+        model_path (str): The exported model file, or None for the stock Keras model.
+        threads (int): The CPU threads an exported model may use, or None for the runtime default.
+    """
+
+    name = 'crepe'
+
+    def __init__(self, sample_rate, model_capacity='full', max_batch_size=64, model_path=None, threads=None):
+        if sample_rate != CREPE_SAMPLE_RATE:
+            raise ValueError(f'CREPE requires audio sampled at {CREPE_SAMPLE_RATE} Hz')
+        if model_capacity not in CREPE_CAPACITIES:
+            raise ValueError(f"Unknown CREPE model capacity '{model_capacity}'. Choose from: {', '.join(CREPE_CAPACITIES)}")
+        super().__init__(sample_rate)
+        self.model_capacity = model_capacity
+        self.max_batch_size = max_batch_size
+        self.model_path = model_path.format(capacity=model_capacity) if model_path else None
+        self.threads = threads
+        self.model = load_crepe_model(model_capacity, self.model_path, threads)
+        # Inference releases the GIL; a pooled model runs as many calls at once as its size allows
+        self.concurrency = self.model.size if isinstance(self.model, CrepeModelPool) else None
+        self.viterbi = OnlineViterbi()
+
+    def estimate(self, audio):
+        return self.estimate_batch([audio])[0]
+
+    def estimate_batch(self, windows):
+        if not windows:
+            return []
+
+        # CREPE looks at the most recent 1024 samples of each window
+        frames = normalize_frames(windows)
+
+        activations = np.concatenate([
+            self.model.predict_on_batch(frames[start:start + self.max_batch_size])
+            for start in range(0, len(frames), self.max_batch_size)
+        ])
+
+        results = []
+        for activation in activations:
+            centre = self.viterbi.step(activation)
+            cents = local_average_cents(activation, centre)
+            results.append((float(10 * 2 ** (cents / 1200)), float(activation.max())))
+        return results
+
+    def reset(self):
+        self.viterbi.reset()
+
+
+class OnlineViterbi:
+    """
+    Incremental Viterbi decoding over the 360 CREPE pitch bins.
+
+    Uses the same transition and emission model as crepe's offline Viterbi
+    decoder, but keeps only the forward log-probabilities, so each frame costs
+    O(bins * transition width) and the rolling history is summarized in one
+    vector.
+    """
+
+    def __init__(self, bins=CREPE_BINS, transition_width=12, self_emission=0.1):
+        self.bins = bins
+
+        # Banded transition matrix as in crepe.core.to_viterbi_cents, stored per offset
+        offsets = np.arange(-transition_width + 1, transition_width)
+        weights = (transition_width - np.abs(offsets)).astype(np.float64)
+        rows = np.arange(bins)
+        targets = rows[:, None] + offsets[None, :]
+        valid = (targets >= 0) & (targets < bins)
+        row_sums = (weights[None, :] * valid).sum(axis=1)
+        self.offsets = offsets
+        with np.errstate(divide='ignore'):
+            self.log_transition = np.where(valid, np.log(weights[None, :] / row_sums[:, None]), -np.inf)
+
+        self.log_hit = np.log(self_emission + (1 - self_emission) / bins)
+        self.log_miss = np.log((1 - self_emission) / bins)
+        self.reset()
+
+    def reset(self):
+        self.log_delta = None
+
+    def step(self, activation):
+        """Advance the decoder by one frame and return the most likely current bin"""
+        observation = int(np.argmax(activation))
+        log_emission = np.full(self.bins, self.log_miss)
+        log_emission[observation] = self.log_hit
+
+        if self.log_delta is None:
+            self.log_delta = log_emission - np.log(self.bins)
+        else:
+            # delta[j] = max_i(delta[i] + log T[i, j]), evaluated one diagonal of the band at a time
+            best = np.full(self.bins, -np.inf)
+            for index, offset in enumerate(self.offsets):
+                source = slice(max(0, -offset), self.bins - max(0, offset))
+                target = slice(max(0, offset), self.bins - max(0, -offset))
+                np.maximum(best[target], self.log_delta[source] + self.log_transition[source, index], out=best[target])
+            self.log_delta = best + log_emission
+            self.log_delta -= self.log_delta.max()  # Keep the values bounded
+
+        return int(np.argmax(self.log_delta))
+
+
+def local_average_cents(activation, centre):
+    """Weighted average of the cents values in the nine bins around `centre`, as in crepe"""
+    start = max(0, centre - 4)
+    end = min(len(activation), centre + 5)
+    weights = activation[start:end]
+    total = np.sum(weights)
+    if total <= 0:
+        return float(CREPE_CENTS[centre])
+    return float(np.dot(weights, CREPE_CENTS[start:end]) / total)
+
+
+# Available estimator backends, keyed by name
+ESTIMATORS = {
+    YinEstimator.name: YinEstimator,
+    CrepeEstimator.name: CrepeEstimator,
+}
+
+DEFAULT_ESTIMATOR = YinEstimator.name
+
+
+def create_estimator(name, sample_rate, **options):
+    """Create the estimator backend registered under the given name, passing any backend options"""
+    try:
+        estimator_class = ESTIMATORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown pitch estimator '{name}'. Choose from: {', '.join(ESTIMATORS)}")
+    return estimator_class(sample_rate, **options)
+
+
+class EstimatorWarmup:
+    """
+    Loads an estimator backend on a background thread and runs one dummy
+    inference, so model building and graph tracing happen before the first
+    real buffer arrives.
+
+    Attributes:
+        name (str): The estimator backend being warmed up.
+        ready (threading.Event): Set when warm-up has finished, successfully or not.
+        error (Exception): The error raised while loading, if any.
+        load_time (float): Seconds taken by the warm-up.
+    """
+
+    def __init__(self, name, sample_rate, **options):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.options = options
+        self.ready = threading.Event()
+        self.error = None
+        self.load_time = None
+        self.thread = threading.Thread(target=self._run, name=f'Warmup-{name}', daemon=True)
+
+    @property
+    def status(self):
+        if not self.ready.is_set():
+            return 'loading'
+        return 'failed' if self.error is not None else 'ready'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Wait for the warm-up to finish; returns False on timeout"""
+        return self.ready.wait(timeout)
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            estimator = create_estimator(self.name, self.sample_rate, **self.options)
+            noise = np.random.default_rng(0).standard_normal(2 * CREPE_FRAME_SIZE).astype(np.float32) * 0.1
+            estimator.estimate_batch([noise])
+        except Exception as error:
+            self.error = error
+        finally:
+            self.load_time = time.perf_counter() - start
+            self.ready.set()
+
+
+_warmups = {}
+_warmups_lock = threading.Lock()
+
+
+def warm_up(name, sample_rate, **options):
+    """Start warming up an estimator backend in the background (once per configuration) and return its EstimatorWarmup"""
+    key = (name, sample_rate, tuple(sorted(options.items())))
+    with _warmups_lock:
+        warmup = _warmups.get(key)
+        if warmup is None or warmup.status == 'failed':
+            warmup = _warmups[key] = EstimatorWarmup(name, sample_rate, **options).start()
+        return warmup
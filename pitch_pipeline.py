@@ -0,0 +1,121 @@
+from collections import namedtuple
+
+from audio_buffer import SlidingWindow
+from conditioning import SignalConditioner, calculate_decibels, THRESHOLD_DB
+from estimation_scheduler import ESTIMATE
+from metrics import Metrics
+
+# Default analysis settings: 128 ms windows resolve low E, 32 ms hops keep the display responsive
+WINDOW_SIZE = 2048
+HOP_SIZE = 512
+
+# The result of analysing one window. `time` is the end of the window in seconds.
+PitchResult = namedtuple('PitchResult', ['time', 'frequency', 'confidence', 'decibels'])
+
+
+class PitchPipeline:
+    """
+    The shared analysis pipeline: conditioning, sliding windows, an RMS gate and a pitch estimator.
+
+    Capture blocks of any size are pushed in with `process`, which returns one
+    PitchResult per hop. Blocks are high-pass filtered first; windows below the
+    (noise-adaptive) gate threshold are reported with a frequency of 0 without
+    running the estimator; the voiced windows of each block are handed to the
+    estimator as one batch. With a scheduler, only windows at an onset (or
+    once the last estimate is too old) are estimated, and the pitch is
+    tracked cheaply in between. With a smoother, the reported frequency and
+    confidence are the smoothed ones, while tracking follows the raw estimates.
+
+    Attributes:
+        estimator (PitchEstimator): The pitch estimator backend.
+        sample_rate (int): The sample rate of the incoming audio.
+        conditioner (SignalConditioner): Filters blocks, gates and tapers windows.
+        scheduler (EstimationScheduler): Decides which windows need the estimator, or None for all of them.
+        smoother (PitchSmoother): Smooths the reported pitch across frames, or None to report raw estimates.
+        metrics (Metrics): Receives stage timings and gated/estimated/tracked frame counts.
+    """
+
+    def __init__(self, estimator, sample_rate, window_size=WINDOW_SIZE, hop_size=HOP_SIZE,
+                 max_block_size=4096, threshold_db=THRESHOLD_DB, metrics=None, conditioner=None, scheduler=None,
+                 smoother=None):
+        self.estimator = estimator
+        self.scheduler = scheduler
+        self.smoother = smoother
+        self.last_estimate = (0.0, 0.0)  # (frequency, confidence) of the previous voiced window
+        self.sample_rate = sample_rate
+        self.hop_seconds = hop_size / sample_rate
+        self.conditioner = conditioner if conditioner is not None else SignalConditioner(
+            sample_rate, window_size, threshold_db=threshold_db)
+        self.windows = SlidingWindow(window_size, hop_size, max_block_size)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.condition_timer = self.metrics.timer('condition')
+        self.level_timer = self.metrics.timer('level')
+        self.estimate_timer = self.metrics.timer('estimate')
+        self.track_timer = self.metrics.timer('track')
+
+    @property
+    def threshold_db(self):
+        """The current gate threshold in decibels"""
+        return self.conditioner.threshold
+
+    def process(self, block):
+        """Push a capture block through the pipeline and return the new results"""
+        results = []
+        pending = []  # (end, decibels, window, decision) for voiced windows awaiting one batched estimate
+
+        with self.condition_timer:
+            block = self.conditioner.filter(block)
+
+        for end, window in self.windows.push(block):
+            with self.level_timer:
+                decibels = calculate_decibels(window)
+                voiced = self.conditioner.gate(decibels, self.hop_seconds)
+            if voiced:
+                decision = self.scheduler.decide(window, decibels, end / self.sample_rate) if self.scheduler else ESTIMATE
+                pending.append((end, decibels, window, decision))
+            else:
+                self.metrics.increment('frames_gated')
+                # A silent window ends the current note: estimate what we have and reset the estimator
+                results.extend(self._estimate(pending))
+                pending = []
+                self.estimator.reset()
+                if self.scheduler is not None:
+                    self.scheduler.reset()
+                if self.smoother is not None:
+                    self.smoother.reset()
+                self.last_estimate = (0.0, 0.0)
+                results.append(PitchResult(end / self.sample_rate, 0.0, 0.0, decibels))
+
+        results.extend(self._estimate(pending))
+        return results
+
+    def _estimate(self, pending):
+        """Run the estimator once over all pending windows that need it, and track the pitch on the others"""
+        if not pending:
+            return []
+        windows = [window for end, decibels, window, decision in pending if decision == ESTIMATE]
+        if windows:
+            with self.estimate_timer:
+                estimates = iter(self.estimator.estimate_batch(self.conditioner.taper(windows)))
+            self.metrics.increment('frames_estimated', len(windows))
+
+        results = []
+        for end, decibels, window, decision in pending:
+            if decision == ESTIMATE:
+                self.last_estimate = next(estimates)
+            else:
+                with self.track_timer:
+                    tracked = self.scheduler.track(window, self.last_estimate[0])
+                if tracked is not None:
+                    self.last_estimate = tracked
+                    self.metrics.increment('frames_tracked')
+                else:
+                    # The tracker lost the note (or there was no pitch to follow): estimate this window after all
+                    with self.estimate_timer:
+                        self.last_estimate = self.estimator.estimate_batch(self.conditioner.taper([window]))[0]
+                    self.scheduler.estimated(end / self.sample_rate)
+                    self.metrics.increment('frames_estimated')
+            self.conditioner.estimated(decibels, self.hop_seconds, *self.last_estimate)
+            frequency, confidence = self.smoother.step(*self.last_estimate) if self.smoother else self.last_estimate
+            results.append(PitchResult(end / self.sample_rate, frequency, confidence, decibels))
+        return results
@@ -0,0 +1,110 @@
+import math
+
+# Frames below this confidence do not move the displayed pitch; it is held instead
+MIN_CONFIDENCE = 0.3
+
+# Kalman filter noise in cents: how far the true pitch may drift per frame, and the
+# measurement error of a fully confident estimate (less confident frames count as noisier)
+PROCESS_NOISE_CENTS = 2.0
+MEASUREMENT_NOISE_CENTS = 3.0
+
+# A frame this many cents from the smoothed pitch is a jump; a jump within this tolerance of a
+# whole octave is treated as an octave error and folded back onto the current note
+JUMP_CENTS = 60.0
+OCTAVE_TOLERANCE_CENTS = 50.0
+
+# A jump is only followed once this many consecutive frames agree on the new pitch
+JUMP_CONFIRM_FRAMES = 2
+OCTAVE_CONFIRM_FRAMES = 4
+
+# Weight of the newest frame in the reported confidence
+CONFIDENCE_SMOOTHING = 0.5
+
+
+class PitchSmoother:
+    """
+    Streaming confidence-weighted smoothing of per-frame pitch estimates.
+
+    The pitch is followed in cents by a one-dimensional Kalman filter whose
+    measurement noise grows as the frame's confidence falls, so confident
+    frames settle the reading within a few hops and doubtful ones barely move
+    it. Frames that jump a whole octave are folded back onto the current note
+    (the typical YIN and CREPE error), and any other jump only takes effect
+    once the following frames confirm it, so single-frame outliers never
+    reach the display. All state is a handful of scalars.
+
+    Attributes:
+        frequency (float): The smoothed pitch in Hz, or 0 when no note is held.
+        confidence (float): The smoothed confidence of the held note.
+        octave_corrections (int): Frames folded back onto the current note.
+        rejected_frames (int): Frames ignored as outliers or for low confidence.
+    """
+
+    def __init__(self, min_confidence=MIN_CONFIDENCE, process_noise_cents=PROCESS_NOISE_CENTS,
+                 measurement_noise_cents=MEASUREMENT_NOISE_CENTS, jump_cents=JUMP_CENTS):
+        self.min_confidence = min_confidence
+        self.process_variance = process_noise_cents ** 2
+        self.measurement_variance = measurement_noise_cents ** 2
+        self.jump_cents = jump_cents
+        self.octave_corrections = 0
+        self.rejected_frames = 0
+        self.reset()
+
+    @property
+    def frequency(self):
+        return 2 ** (self.cents / 1200) if self.cents is not None else 0.0
+
+    def reset(self):
+        """Forget the current note, e.g. after a silent window"""
+        self.cents = None  # The smoothed pitch, in cents above 1 Hz
+        self.variance = 0.0
+        self.confidence = 0.0
+        self.candidate = None  # The pitch (in cents) of an unconfirmed jump, and how many frames agreed on it
+        self.candidate_frames = 0
+
+    def step(self, frequency, confidence):
+        """Account for one frame's estimate and return the smoothed (frequency, confidence)"""
+        if frequency <= 0 or confidence < self.min_confidence:
+            self.rejected_frames += 1
+            return self.frequency, self.confidence
+        cents = 1200 * math.log2(frequency)
+        if self.cents is None:
+            self._restart(cents, confidence)
+            return self.frequency, self.confidence
+
+        # Fold octave errors onto the current note; anything else that jumps must be confirmed first
+        offset = cents - self.cents
+        octaves = round(offset / 1200)
+        confirm_frames = JUMP_CONFIRM_FRAMES
+        if octaves and abs(offset - 1200 * octaves) < OCTAVE_TOLERANCE_CENTS:
+            confirm_frames = OCTAVE_CONFIRM_FRAMES
+        if abs(offset) > self.jump_cents:
+            if self.candidate is not None and abs(cents - self.candidate) <= self.jump_cents:
+                self.candidate_frames += 1
+            else:
+                self.candidate, self.candidate_frames = cents, 1
+            if self.candidate_frames >= confirm_frames:
+                self._restart(cents, confidence)
+                return self.frequency, self.confidence
+            if confirm_frames == OCTAVE_CONFIRM_FRAMES:
+                self.octave_corrections += 1
+                cents -= 1200 * octaves
+            else:
+                self.rejected_frames += 1
+                return self.frequency, self.confidence
+        else:
+            self.candidate = None
+
+        # Kalman update in cents, trusting confident frames more
+        self.variance += self.process_variance
+        gain = self.variance / (self.variance + self.measurement_variance / (confidence * confidence))
+        self.cents += gain * (cents - self.cents)
+        self.variance *= 1 - gain
+        self.confidence += CONFIDENCE_SMOOTHING * (confidence - self.confidence)
+        return self.frequency, self.confidence
+
+    def _restart(self, cents, confidence):
+        self.cents = cents
+        self.variance = self.measurement_variance / (confidence * confidence)
+        self.confidence = confidence
+        self.candidate = None
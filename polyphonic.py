@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+import numpy as np
+
+from audio_buffer import RingBuffer
+from pitch_pipeline import calculate_decibels, THRESHOLD_DB
+
+# Default strum analysis settings: 512 ms windows separate neighbouring strings, zero-padded 4x
+STRUM_WINDOW_SIZE = 8192
+STRUM_FFT_SIZE = 32768
+STRUM_HOP_SIZE = 4096
+
+# Number of partials scored per string, and how far from the target each string is searched
+STRUM_HARMONICS = 6
+SEARCH_CENTS = 100.0
+
+# Overtones this close to a partial of another string are left out of the string's comb
+OVERLAP_CENTS = 60.0
+
+# Strings whose comb stands out less than this above the median of their search range are reported as not
+# sounding; on random guitar chords with muted strings this misses and invents well under 1% of strings
+MIN_STRENGTH = 1.2
+
+
+def comb_weights(valid, partials):
+    """Comb weights falling as 1/k over the valid partials, normalized to sum to one per candidate"""
+    weights = np.where(valid, 1.0 / partials, 0.0)
+    total = weights.sum(axis=-1, keepdims=True)
+    return np.divide(weights, total, out=np.zeros_like(weights), where=total > 0)
+
+
+# The deviation of one string in a strum. `cents` is None when the string was not detected.
+StringDeviation = namedtuple('StringDeviation', ['target', 'frequency', 'cents', 'strength'])
+
+
+class StrumAnalyzer:
+    """
+    Estimates the tuning of every string of an instrument from one strummed chord.
+
+    Because the nominal string frequencies are known, the analysis does not
+    have to separate the chord blindly: for each string it scores a grid of
+    candidate fundamentals within `search_cents` of the target by summing the
+    (log-compressed) magnitude spectrum at the candidate's first partials, a
+    harmonic comb, looked up in a single zero-padded FFT. Strings are judged
+    from the lowest up: partials that land on a peak of a string already found
+    do not count towards a string's strength, so a muted string is not found
+    on the overtones of a sounding one. A best candidate at the edge of the grid
+    counts as not detected; otherwise it is refined by parabolic interpolation.
+
+    Attributes:
+        targets (np.ndarray): The nominal string frequencies in Hz.
+        sample_rate (int): The sample rate of the analysed audio.
+        window_size (int): The number of samples analysed per strum.
+        min_strength (float): Detection threshold for the comb score.
+    """
+
+    def __init__(self, string_frequencies, sample_rate, window_size=STRUM_WINDOW_SIZE, fft_size=STRUM_FFT_SIZE,
+                 harmonics=STRUM_HARMONICS, search_cents=SEARCH_CENTS, step_cents=1.0, min_strength=MIN_STRENGTH):
+        self.targets = np.asarray(string_frequencies, dtype=np.float64)
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self.fft_size = max(fft_size, window_size)
+        self.min_strength = min_strength
+        self.step_cents = step_cents
+        self.window = np.hanning(window_size).astype(np.float32)
+        self.windowed = np.zeros(window_size, dtype=np.float32)
+
+        # Candidate fundamentals, (strings, offsets), and their partials in fractional FFT bins
+        self.offsets = np.arange(-search_cents, search_cents + step_cents / 2, step_cents)
+        self.candidates = self.targets[:, None] * 2 ** (self.offsets / 1200)
+        partials = np.arange(1, harmonics + 1)
+        bins = self.candidates[:, :, None] * partials * self.fft_size / sample_rate
+
+        # Partials above Nyquist do not count, nor do overtones that land on a partial of another string
+        # (the low E's third and fourth partials are the B and high E strings); lower partials weigh more
+        valid = bins < self.fft_size // 2 - 1
+        nominal = self.targets[:, None] * partials
+        distance = np.abs(1200 * np.log2(nominal[:, :, None, None] / nominal[None, None, :, :]))
+        distance[np.arange(len(self.targets)), :, np.arange(len(self.targets)), :] = np.inf
+        shared = (distance < OVERLAP_CENTS).any(axis=(2, 3))
+        shared[:, 0] = False
+        valid &= ~shared[:, None, :]
+        self.weights = comb_weights(valid, partials)
+        bins = np.where(valid, bins, 0.0)
+        self.partials = partials
+        self.partial_bins = bins
+        self.order = np.argsort(self.targets)
+        self.mainlobe_bins = 2 * self.fft_size / window_size  # Half width of a partial's peak in the padded FFT
+        self.bin_index = np.floor(bins).astype(np.intp)
+        self.bin_fraction = (bins - self.bin_index).astype(np.float32)
+
+    def analyze(self, audio):
+        """
+        Estimate every string from the last `window_size` samples of `audio`,
+        which must hold at least that many samples.
+
+        Returns:
+            list: One StringDeviation per target, in the order of the targets.
+        """
+        np.multiply(audio[-self.window_size:], self.window, out=self.windowed)
+        magnitude = np.abs(np.fft.rfft(self.windowed, self.fft_size))
+
+        # Compress relative to the noise floor so one loud string cannot mask the others
+        spectrum = np.log1p(magnitude / (np.median(magnitude) + 1e-12)).astype(np.float32)
+
+        # Low strings first, so partials of the strings already found are known when a higher string is judged
+        deviations = [None] * len(self.targets)
+        found = np.empty(0)
+        for string in self.order:
+            index, fraction = self.bin_index[string], self.bin_fraction[string]
+            values = spectrum[index] * (1 - fraction) + spectrum[index + 1] * fraction
+            scores = np.einsum('oh,oh->o', values, self.weights[string])
+
+            # The B and high E are the low E's third and fourth partials: partials that land on a peak of a lower
+            # string are no evidence that the string itself sounds, so only the rest count towards its strength
+            evidence = scores
+            if len(found):
+                bins = self.partial_bins[string]
+                overlap = (np.abs(bins[:, :, None] - found) <= self.mainlobe_bins).any(axis=2)
+                weights = comb_weights((self.weights[string] > 0) & ~overlap, self.partials)
+                evidence = np.einsum('oh,oh->o', values, weights)
+
+            deviation = self._deviation(string, scores, evidence)
+            deviations[string] = deviation
+            if deviation.cents is not None:
+                found = np.append(found, deviation.frequency * self.partials * self.fft_size / self.sample_rate)
+        return deviations
+
+    def _deviation(self, string, scores, evidence):
+        """The StringDeviation of one string, located by the comb scores and judged by the evidence scores"""
+        target = float(self.targets[string])
+        best = int(np.argmax(scores))
+        strength = float(evidence[best] - np.median(evidence))
+
+        # A maximum at or next to the edge of the grid is the flank of something outside the search range
+        if strength < self.min_strength or best <= 1 or best >= len(scores) - 2:
+            return StringDeviation(target, 0.0, None, strength)
+
+        # Refine the best candidate by parabolic interpolation
+        left, center, right = scores[best - 1], scores[best], scores[best + 1]
+        curvature = left - 2 * center + right
+        shift = float(np.clip(0.5 * (left - right) / curvature, -0.5, 0.5)) if curvature < 0 else 0.0
+        cents = float(self.offsets[best] + shift * self.step_cents)
+        return StringDeviation(target, target * 2 ** (cents / 1200), cents, strength)
+
+
+class StrumTracker:
+    """
+    Runs a StrumAnalyzer over a stream of capture blocks.
+
+    Blocks are kept in a ring buffer and the chord is re-analysed every
+    `hop_size` samples while the signal is above the gate threshold.
+
+    Attributes:
+        analyzer (StrumAnalyzer): The analyzer for the selected instrument.
+        hop_size (int): The number of samples between analyses.
+        threshold_db (float): The gate threshold in decibels.
+    """
+
+    def __init__(self, analyzer, hop_size=STRUM_HOP_SIZE, max_block_size=4096, threshold_db=THRESHOLD_DB):
+        self.analyzer = analyzer
+        self.hop_size = hop_size
+        self.threshold_db = threshold_db
+        self.buffer = RingBuffer(analyzer.window_size + max_block_size)
+        self.next_end = analyzer.window_size
+
+    def process(self, block):
+        """Append a capture block and return the deviations of the newest strum analysis, or None"""
+        self.buffer.write(block)
+        if self.buffer.count < self.next_end:
+            return None
+
+        # Only the newest window matters; skip analyses the stream has already moved past
+        self.next_end += -(-(self.buffer.count - self.next_end + 1) // self.hop_size) * self.hop_size
+        window = self.buffer.window(self.analyzer.window_size)
+        if calculate_decibels(window) <= self.threshold_db:
+            return None
+        return self.analyzer.analyze(window)
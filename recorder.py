@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from wav_io import WavWriter
+
+
+class StreamingRecorder:
+    """
+    Records captured audio straight to a temporary WAV file on disk.
+
+    The capture thread calls `write` with every block it reads; the GUI thread
+    calls `stop` and then moves the finished file to wherever the user wants
+    it with `save_as`, or throws it away with `discard`.
+
+    Attributes:
+        path (str): The path of the temporary WAV file.
+        is_recording (bool): False once the recording has been stopped.
+    """
+
+    def __init__(self, sample_rate, channels=1, sample_format='float32'):
+        handle, self.path = tempfile.mkstemp(prefix='tuner_recording_', suffix='.wav')
+        os.close(handle)
+        self.lock = threading.Lock()
+        self.writer = WavWriter(self.path, sample_rate, channels, sample_format)
+        self.is_recording = True
+
+    @property
+    def frames(self):
+        """The number of frames recorded so far"""
+        return self.writer.frames
+
+    def write(self, audio):
+        """Append a captured block (called from the capture thread)"""
+        with self.lock:
+            if self.is_recording:
+                self.writer.write(audio)
+
+    def stop(self):
+        """Finish the file; later writes are ignored"""
+        with self.lock:
+            if self.is_recording:
+                self.is_recording = False
+                self.writer.close()
+
+    def save_as(self, path):
+        """Move the finished recording to its final location"""
+        self.stop()
+        shutil.move(self.path, path)
+
+    def discard(self):
+        """Delete the temporary recording"""
+        self.stop()
+        if os.path.exists(self.path):
+            os.remove(self.path)
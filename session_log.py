@@ -0,0 +1,218 @@
+"""
+Compact binary session logs of what the estimator heard and reported.
+
+A log starts with a header holding the sample rate and the analysis
+settings as JSON, followed by chunks that are appended as the session runs:
+raw float32 capture blocks and the per-frame results computed from them.
+Every chunk is a 16-byte header (tag, record count, stream position) and a
+payload padded to 8 bytes, so the whole file can be memory-mapped and every
+chunk viewed as a NumPy array without copying. A log cut short by a crash
+simply ends at its last complete chunk.
+
+`replay` feeds a log back through the live pipeline as fast as possible and
+`compare_results` diffs the outputs, for reproducing field reports and for
+regression-testing estimator changes on real recordings.
+"""
+import json
+import struct
+import threading
+import time
+
+import numpy as np
+
+from estimation_scheduler import EstimationScheduler
+from pitch_estimators import create_estimator
+from pitch_pipeline import PitchPipeline
+from pitch_smoothing import PitchSmoother
+
+LOG_MAGIC = b'TUNERLOG'
+LOG_VERSION = 1
+
+# File header after the magic: version, sample rate, settings JSON length
+LOG_HEADER = struct.Struct('<IIQ')
+
+# Chunk header: tag, record count, stream position (first frame of an audio block, first result index)
+CHUNK_HEADER = struct.Struct('<4sIQ')
+AUDIO_CHUNK = b'AUDI'
+RESULT_CHUNK = b'RSLT'
+
+# One logged result; `target` is the pitch the user was tuning to (0 if none)
+RESULT_DTYPE = np.dtype([('time', '<f8'), ('frequency', '<f8'), ('confidence', '<f4'), ('decibels', '<f4'),
+                         ('target', '<f8')])
+
+# Replayed pitches further than this from the logged ones count as differences
+DIFF_TOLERANCE_CENTS = 1.0
+
+
+def padding(size):
+    return -size % 8
+
+
+class SessionLogger:
+    """
+    Appends capture blocks and pitch results to a session log.
+
+    The capture thread calls `write_block` and `write_results`; any thread
+    may call `close`, after which writes are ignored.
+
+    Attributes:
+        path (str): The path of the log file.
+        frames (int): The number of audio frames logged so far.
+        results (int): The number of results logged so far.
+    """
+
+    def __init__(self, path, sample_rate, settings):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'wb')
+        self.frames = 0
+        self.results = 0
+
+        settings = dict(settings, created=time.time())
+        encoded = json.dumps(settings).encode()
+        self.file.write(LOG_MAGIC + LOG_HEADER.pack(LOG_VERSION, sample_rate, len(encoded)))
+        self.file.write(encoded + b'\0' * padding(len(encoded)))
+
+    def _write_chunk(self, tag, count, position, payload):
+        self.file.write(CHUNK_HEADER.pack(tag, count, position))
+        self.file.write(payload)
+        self.file.write(b'\0' * padding(len(payload)))
+
+    def write_block(self, audio):
+        """Append a mono capture block"""
+        audio = np.ascontiguousarray(audio, dtype='<f4')
+        with self.lock:
+            if self.file is not None:
+                self._write_chunk(AUDIO_CHUNK, len(audio), self.frames, memoryview(audio).cast('B'))
+                self.frames += len(audio)
+
+    def write_results(self, results, target=0.0):
+        """Append the PitchResults computed from the latest block, with the target pitch at the time"""
+        if not results:
+            return
+        records = np.array([(result.time, result.frequency, result.confidence, result.decibels, target)
+                            for result in results], dtype=RESULT_DTYPE)
+        with self.lock:
+            if self.file is not None:
+                self._write_chunk(RESULT_CHUNK, len(records), self.results, memoryview(records).cast('B'))
+                self.results += len(records)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class SessionLog:
+    """
+    A memory-mapped session log.
+
+    Attributes:
+        sample_rate (int): The capture sample rate in Hz.
+        settings (dict): The analysis settings the session ran with.
+        blocks (list): The logged capture blocks, as float32 views into the file.
+        results (np.ndarray): All logged results, a RESULT_DTYPE array.
+    """
+
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.data[:len(LOG_MAGIC)]) != LOG_MAGIC:
+            raise ValueError(f'{path} is not a session log')
+        offset = len(LOG_MAGIC)
+        version, self.sample_rate, settings_length = LOG_HEADER.unpack_from(self.data, offset)
+        if version != LOG_VERSION:
+            raise ValueError(f'Unsupported session log version {version}')
+        offset += LOG_HEADER.size
+        self.settings = json.loads(bytes(self.data[offset:offset + settings_length]))
+        offset += settings_length + padding(settings_length)
+
+        self.blocks = []
+        result_chunks = []
+        while offset + CHUNK_HEADER.size <= len(self.data):
+            tag, count, position = CHUNK_HEADER.unpack_from(self.data, offset)
+            offset += CHUNK_HEADER.size
+            itemsize = 4 if tag == AUDIO_CHUNK else RESULT_DTYPE.itemsize
+            if offset + count * itemsize > len(self.data):
+                break  # Truncated by a crash; keep what was complete
+            if tag == AUDIO_CHUNK:
+                self.blocks.append(self.data[offset:offset + count * 4].view('<f4'))
+            elif tag == RESULT_CHUNK:
+                result_chunks.append(self.data[offset:offset + count * itemsize].view(RESULT_DTYPE))
+            else:
+                raise ValueError(f'Unknown session log chunk {tag!r}')
+            offset += count * itemsize + padding(count * itemsize)
+        self.results = np.concatenate(result_chunks) if result_chunks else np.zeros(0, dtype=RESULT_DTYPE)
+
+    @property
+    def frames(self):
+        return sum(len(block) for block in self.blocks)
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+
+def create_session_pipeline(settings, sample_rate, metrics=None):
+    """Build the pipeline a session ran with from its logged settings"""
+    estimator = create_estimator(settings['estimator'], sample_rate, **settings.get('estimator_options', {}))
+    max_staleness = settings.get('max_staleness')
+    scheduler = EstimationScheduler(sample_rate, max_staleness) if max_staleness else None
+    smoother = PitchSmoother() if settings.get('smoothing', True) else None
+    return PitchPipeline(estimator, sample_rate, settings['window_size'], settings['hop_size'],
+                         max_block_size=settings.get('block_size', 4096), metrics=metrics, scheduler=scheduler,
+                         smoother=smoother)
+
+
+def replay(log, settings=None, metrics=None):
+    """
+    Feed a log's audio through a pipeline, block by block as it was captured.
+
+    Args:
+        log (SessionLog): The log to replay.
+        settings (dict): Overrides of the logged settings (e.g. another estimator).
+
+    Returns:
+        np.ndarray: The replayed results, a RESULT_DTYPE array with the logged targets.
+    """
+    pipeline = create_session_pipeline(dict(log.settings, **(settings or {})), log.sample_rate, metrics)
+    results = [result for block in log.blocks for result in pipeline.process(block)]
+    replayed = np.zeros(len(results), dtype=RESULT_DTYPE)
+    if results:
+        replayed['time'], replayed['frequency'], replayed['confidence'], replayed['decibels'] = zip(*results)
+        # Each frame gets the target of the latest logged frame at or before it
+        if len(log.results):
+            index = np.searchsorted(log.results['time'], replayed['time'], side='right') - 1
+            replayed['target'] = np.where(index >= 0, log.results['target'][np.maximum(index, 0)], 0.0)
+    return replayed
+
+
+def compare_results(logged, replayed, tolerance_cents=DIFF_TOLERANCE_CENTS):
+    """
+    Diff replayed results against logged ones, matching frames by their time.
+
+    Returns:
+        dict: Matched and unmatched frame counts, voicing disagreements, pitch
+        differences in cents and the indices (into `logged`) of the frames that differ.
+    """
+    # Frames end on whole samples, so the times of the same window are identical floats
+    times, logged_index, replayed_index = np.intersect1d(logged['time'], replayed['time'], return_indices=True)
+    unmatched = len(logged) + len(replayed) - 2 * len(times)
+    logged, replayed = logged[logged_index], replayed[replayed_index]
+    count = len(times)
+    logged_voiced = logged['frequency'] > 0
+    replayed_voiced = replayed['frequency'] > 0
+    both = logged_voiced & replayed_voiced
+
+    cents = np.zeros(count)
+    cents[both] = 1200 * np.log2(replayed['frequency'][both] / logged['frequency'][both])
+    differs = (logged_voiced != replayed_voiced) | (np.abs(cents) > tolerance_cents)
+    return {
+        'frames': count,
+        'voiced_frames': int(np.count_nonzero(logged_voiced)),
+        'voicing_mismatches': int(np.count_nonzero(logged_voiced != replayed_voiced)),
+        'max_cents': float(np.abs(cents).max()) if count else 0.0,
+        'mean_abs_cents': float(np.abs(cents[both]).mean()) if both.any() else 0.0,
+        'unmatched_frames': unmatched,
+        'differing_frames': logged_index[differs],
+    }
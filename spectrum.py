@@ -0,0 +1,96 @@
+import numpy as np
+
+from audio_buffer import SlidingWindow
+
+# Analysis frames: 256 ms resolve the partials of low E 4 Hz apart; one row per 64 ms capture block
+SPECTRUM_FRAME_SIZE = 4096
+SPECTRUM_HOP_SIZE = 1024
+
+# Displayed frequency range, on a log axis: below the lowest string (and mains hum) up to the partials that matter
+SPECTRUM_MIN_FREQUENCY = 40.0
+SPECTRUM_MAX_FREQUENCY = 4000.0
+
+# Number of display columns; rows are quantized to 8 bits between the floor and the ceiling
+SPECTRUM_BINS = 256
+SPECTRUM_FLOOR_DB = -100.0
+SPECTRUM_CEILING_DB = -10.0
+
+
+class SpectrumAnalyzer:
+    """
+    An incremental log-frequency spectrum of the capture stream, for display.
+
+    Frames are taken from the stream with a SlidingWindow, tapered by a
+    window computed once and transformed at one fixed size, so NumPy reuses
+    its cached FFT plan. The power spectrum is reduced straight to display
+    resolution: every display column takes the strongest FFT bin between
+    its log-spaced edges, with one `np.maximum.reduceat` over edges that
+    are precomputed once (columns narrower than an FFT bin repeat it).
+    Each frame becomes one row of `bins` bytes, quantized between
+    `floor_db` and `ceiling_db`, ready for an indexed image or the wire.
+
+    Attributes:
+        sample_rate (int): The sample rate of the incoming audio.
+        bins (int): The number of display columns per row.
+        min_frequency (float): The frequency at the left edge of the first column, in Hz.
+        max_frequency (float): The frequency at the right edge of the last column, in Hz.
+        floor_db (float): The level that maps to 0.
+        ceiling_db (float): The level that maps to 255.
+    """
+
+    def __init__(self, sample_rate, bins=SPECTRUM_BINS, min_frequency=SPECTRUM_MIN_FREQUENCY,
+                 max_frequency=SPECTRUM_MAX_FREQUENCY, frame_size=SPECTRUM_FRAME_SIZE, hop_size=SPECTRUM_HOP_SIZE,
+                 floor_db=SPECTRUM_FLOOR_DB, ceiling_db=SPECTRUM_CEILING_DB, max_block_size=4096):
+        self.sample_rate = sample_rate
+        self.bins = bins
+        self.min_frequency = min_frequency
+        self.max_frequency = min(max_frequency, sample_rate / 2)
+        self.floor_db = floor_db
+        self.ceiling_db = ceiling_db
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.max_block_size = max_block_size
+        self.windows = SlidingWindow(frame_size, hop_size, max_block_size)
+
+        # The taper, scaled so a full-scale sine peaks at 0 dB, and the buffers reused for every frame
+        taper = np.hanning(frame_size)
+        self.taper = (taper * 2 / taper.sum()).astype(np.float32)
+        self.frame = np.zeros(frame_size, dtype=np.float32)
+        self.power = np.zeros(frame_size // 2 + 1)
+
+        # Column edges in FFT bins; reduceat takes the maximum from each start up to the next one
+        edges = np.geomspace(self.min_frequency, self.max_frequency, bins + 1) * frame_size / sample_rate
+        self.starts = np.minimum(np.floor(edges[:-1]).astype(np.intp), frame_size // 2)
+        self.stop = min(max(int(np.ceil(edges[-1])), self.starts[-1] + 1), frame_size // 2 + 1)
+
+        # Level to byte: 255 * (dB - floor) / (ceiling - floor), with dB = 10 log10(power)
+        self.scale = 255 * 10 / (ceiling_db - floor_db)
+        self.offset = -255 * floor_db / (ceiling_db - floor_db)
+
+    def reset(self):
+        """Start again from an empty stream, e.g. after the display was hidden"""
+        self.windows = SlidingWindow(self.frame_size, self.hop_size, self.max_block_size)
+
+    def column_frequency(self, column):
+        """The centre frequency of a display column (fractional columns allowed), in Hz"""
+        ratio = self.max_frequency / self.min_frequency
+        return self.min_frequency * ratio ** ((column + 0.5) / self.bins)
+
+    def frequency_column(self, frequency):
+        """The display column (fractional) of a frequency, the inverse of `column_frequency`"""
+        return self.bins * np.log(frequency / self.min_frequency) / np.log(self.max_frequency / self.min_frequency) - 0.5
+
+    def process(self, block):
+        """Push a capture block and return the rows it completed, a (rows, bins) uint8 array"""
+        frames = self.windows.push(block)
+        rows = np.empty((len(frames), self.bins), dtype=np.uint8)
+        for row, (end, window) in zip(rows, frames):
+            np.multiply(window, self.taper, out=self.frame)
+            spectrum = np.fft.rfft(self.frame)
+            np.multiply(spectrum.real, spectrum.real, out=self.power)
+            self.power += spectrum.imag * spectrum.imag
+            columns = np.maximum.reduceat(self.power[:self.stop], self.starts)
+            levels = np.log10(np.maximum(columns, 1e-20)) * self.scale + self.offset
+            np.clip(levels, 0, 255, out=levels)
+            row[:] = levels
+        return rows
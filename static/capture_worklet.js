@@ -0,0 +1,13 @@
+// Forwards microphone samples from the audio rendering thread to the page
+class CaptureProcessor extends AudioWorkletProcessor {
+    process(inputs) {
+        const input = inputs[0];
+        if (input.length > 0) {
+            // Copy the first channel; the render quantum buffer is reused by the browser
+            this.port.postMessage(input[0].slice(0));
+        }
+        return true;
+    }
+}
+
+registerProcessor('capture-processor', CaptureProcessor);
@@ -0,0 +1,133 @@
+from collections import namedtuple
+
+import numpy as np
+
+from audio_buffer import SlidingWindow
+from conditioning import calculate_decibels, THRESHOLD_DB
+
+# Analysis frames: 64 ms resolve the partials of low E; a 16 ms hop keeps the phase unambiguous to +-31 Hz
+STROBE_FRAME_SIZE = 1024
+STROBE_HOP_SIZE = 256
+
+# Number of partials of the target that are demodulated
+STROBE_PARTIALS = 4
+
+# Phase increments over this many hops are averaged, so the reading is a long-baseline phase slope
+STROBE_HISTORY = 16
+
+# Partials weaker than this fraction of the strongest one are ignored
+MIN_PARTIAL_RATIO = 0.1
+
+# Frames in which the demodulated partials carry less than this share of the power are another note or noise
+# (a note a fifth away shares a partial and would read as in tune); they end the current reading like silence
+MIN_STROBE_CONFIDENCE = 0.2
+
+# One strobe reading. `partial_cents` holds the offset seen on each partial (nan where it was too weak);
+# `confidence` is the share of the frame's power carried by the demodulated partials.
+StrobeReading = namedtuple('StrobeReading', ['time', 'frequency', 'cents', 'partial_cents', 'confidence', 'decibels'])
+
+
+class StrobeTuner:
+    """
+    A strobe tuner: measures the offset from one known target frequency.
+
+    Each frame is demodulated at the target and its first partials by a
+    small bank of windowed complex oscillators (a heterodyne, or Goertzel
+    bank evaluated as one matrix-vector product), O(frame size * partials).
+    A partial that is exactly in tune keeps a constant phase against its
+    oscillator; a mistuned one rotates at the frequency difference. The
+    rotation between hops is unwrapped on every partial using the strongest
+    partial's prediction, converted to cents and averaged over the last
+    `history` hops, weighted by partial power, which resolves fractions of
+    a cent.
+
+    Attributes:
+        target (float): The target frequency in Hz.
+        sample_rate (int): The sample rate of the incoming audio.
+        partials (np.ndarray): The partial numbers that are demodulated (1 is the fundamental).
+        threshold_db (float): Frames below this level end the current reading.
+        min_confidence (float): Frames whose partials carry less of the power end the current reading.
+    """
+
+    def __init__(self, target, sample_rate, partials=STROBE_PARTIALS, frame_size=STROBE_FRAME_SIZE,
+                 hop_size=STROBE_HOP_SIZE, history=STROBE_HISTORY, max_block_size=4096, threshold_db=THRESHOLD_DB,
+                 min_confidence=MIN_STROBE_CONFIDENCE):
+        self.target = target
+        self.sample_rate = sample_rate
+        self.hop_size = hop_size
+        self.threshold_db = threshold_db
+        self.min_confidence = min_confidence
+        self.windows = SlidingWindow(frame_size, hop_size, max_block_size)
+
+        # Partials above Nyquist are dropped; the oscillators are tapered so neighbouring partials do not leak in
+        count = max(1, min(partials, int(sample_rate / 2 / target) - 1))
+        self.partials = np.arange(1, count + 1)
+        self.omega = 2 * np.pi * target * self.partials / sample_rate
+        taper = np.hanning(frame_size)
+        self.bank = (taper * np.exp(-1j * np.outer(self.omega, np.arange(frame_size)))).astype(np.complex64)
+        self.gain = 2 / taper.sum()  # Turns |z| into the amplitude of the partial
+
+        # Power-weighted phase increments of every partial over the last `history` hops, as a ring
+        self.weighted_rotations = np.zeros((history, len(self.partials)))
+        self.weights = np.zeros((history, len(self.partials)))
+        self.reset()
+
+    def reset(self):
+        """Forget the phase history, e.g. after a silent frame or one where the target is not heard"""
+        self.previous = None
+        self.weighted_rotations[:] = 0.0
+        self.weights[:] = 0.0
+        self.slot = 0
+
+    def process(self, block):
+        """Push a capture block and return a StrobeReading per completed hop (None where there is none)"""
+        frames = list(self.windows.push(block))
+        if not frames:
+            return []
+
+        # Demodulate all frames of the block at once, then refer every partial to its oscillator's phase at the frame start
+        windows = np.stack([window for end, window in frames])
+        starts = np.array([end for end, window in frames]) - windows.shape[1]
+        demodulated = windows @ self.bank.T
+        demodulated *= np.exp(-1j * np.mod(np.outer(starts, self.omega), 2 * np.pi))
+
+        readings = []
+        for (end, window), z in zip(frames, demodulated):
+            decibels = calculate_decibels(window)
+            if decibels <= self.threshold_db:
+                self.reset()
+                readings.append(None)
+            else:
+                readings.append(self._reading(end / self.sample_rate, z, decibels, window))
+        return readings
+
+    def _reading(self, time, z, decibels, window):
+        power = z.real ** 2 + z.imag ** 2
+        partial_power = self.gain ** 2 * power.sum() / 2
+        confidence = min(1.0, float(partial_power * len(window) / max(np.dot(window, window), 1e-12)))
+        if confidence < self.min_confidence:
+            self.reset()
+            return None
+        previous, self.previous = self.previous, z
+        if previous is None:
+            return None
+
+        # Unwrap every partial's rotation around what the strongest partial predicts for it
+        reference = int(np.argmax(power))
+        rotation = np.angle(z * np.conj(previous))
+        expected = rotation[reference] * self.partials / self.partials[reference]
+        rotation = expected + np.angle(np.exp(1j * (rotation - expected)))
+        weight = np.where(power >= MIN_PARTIAL_RATIO ** 2 * power[reference], power, 0.0)
+        self.weighted_rotations[self.slot] = rotation * weight
+        self.weights[self.slot] = weight
+        self.slot = (self.slot + 1) % len(self.weights)
+
+        # The mean rotation per hop over the history is the phase slope; each partial gives a frequency offset
+        total = self.weights.sum(axis=0)
+        heard = total > 0
+        mean_rotation = np.divide(self.weighted_rotations.sum(axis=0), total, out=np.zeros_like(total), where=heard)
+        offsets = mean_rotation * self.sample_rate / (2 * np.pi * self.hop_size * self.partials)
+        partial_cents = np.where(heard, 1200 * np.log2(1 + offsets / self.target), np.nan)
+
+        cents = float(np.dot(partial_cents[heard], total[heard]) / total[heard].sum())
+        return StrobeReading(time, self.target * 2 ** (cents / 1200), cents, partial_cents, confidence, decibels)
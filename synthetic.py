@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def pluck(frequency, duration, sample_rate, harmonics=6, decay=3.0, detune_cents=0.0, noise_db=-60.0,
+          amplitude=0.5, seed=None):
+    """
+    Generate a synthetic plucked-string tone.
+
+    Args:
+        frequency (float): The nominal fundamental frequency in Hz.
+        duration (float): The length of the tone in seconds.
+        sample_rate (int): The sample rate in Hz.
+        harmonics (int): The number of partials, with amplitudes falling as 1/k.
+        decay (float): The exponential decay rate of the fundamental per second;
+            higher partials decay proportionally faster.
+        detune_cents (float): Offset of the played pitch from `frequency` in cents.
+        noise_db (float): The level of added white noise relative to full scale.
+        amplitude (float): The peak amplitude of the attack.
+        seed (int): Seed for the noise generator.
+
+    Returns:
+        np.ndarray: The float32 signal.
+    """
+    played = frequency * 2 ** (detune_cents / 1200)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    signal = np.zeros(len(t))
+    for k in range(1, harmonics + 1):
+        if k * played >= sample_rate / 2:
+            break
+        signal += np.sin(2 * np.pi * k * played * t) * np.exp(-decay * k ** 0.5 * t) / k
+    signal *= amplitude / max(np.max(np.abs(signal)), 1e-12)
+
+    if noise_db is not None:
+        rng = np.random.default_rng(seed)
+        signal += rng.standard_normal(len(t)) * 10 ** (noise_db / 20)
+
+    return signal.astype(np.float32)
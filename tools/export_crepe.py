@@ -0,0 +1,103 @@
+"""
+Exports CREPE models to ONNX or TFLite for the lightweight CPU runtimes.
+
+The stock Keras model of each capacity is converted once (this needs
+TensorFlow, plus tf2onnx and onnx for ONNX); the tuner then runs the
+exported file with ONNX Runtime or the TFLite interpreter, without
+TensorFlow. With --quantize the weights and activations are quantized to
+int8, calibrated on synthetic plucked strings normalized exactly like the
+frames CrepeEstimator feeds the model.
+
+Usage:
+    python tools/export_crepe.py --capacity tiny full --format onnx --quantize
+    TUNER_CREPE_MODEL='models/crepe-{capacity}-int8.onnx' TUNER_CREPE_THREADS=2 python "Guitar Tuner.py"
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pitch_estimators import CREPE_CAPACITIES, CREPE_FRAME_SIZE, CREPE_SAMPLE_RATE, normalize_frames
+from synthetic import pluck
+
+# Calibration material: the strings of the supported instruments across their range, with detuning
+CALIBRATION_FREQUENCIES = [73.42, 82.41, 110.00, 146.83, 196.00, 246.94, 329.63, 392.00, 440.00, 659.26]
+CALIBRATION_FRAMES = 256
+
+
+def calibration_frames(count=CALIBRATION_FRAMES, seed=0):
+    """Normalized CREPE input frames from decaying synthetic plucks and a little noise"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for index in range(count):
+        frequency = CALIBRATION_FREQUENCIES[index % len(CALIBRATION_FREQUENCIES)]
+        tone = pluck(frequency, 1.0, CREPE_SAMPLE_RATE, detune_cents=rng.uniform(-50, 50),
+                     decay=rng.uniform(1, 6), noise_db=rng.uniform(-70, -40), seed=index)
+        start = rng.integers(0, len(tone) - CREPE_FRAME_SIZE)
+        frames.append(tone[start:start + CREPE_FRAME_SIZE])
+    return normalize_frames(frames)
+
+
+def export_onnx(model, path, quantize):
+    import tensorflow as tf
+    import tf2onnx
+
+    signature = [tf.TensorSpec([None, CREPE_FRAME_SIZE], tf.float32, name='frames')]
+    if not quantize:
+        tf2onnx.convert.from_keras(model, input_signature=signature, opset=13, output_path=path)
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class Frames(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(calibration_frames())
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            return None if frame is None else {'frames': frame[None]}
+
+    float_path = path.replace('-int8.onnx', '.onnx')
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=13, output_path=float_path)
+    quantize_static(float_path, path, Frames(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+
+
+def export_tflite(model, path, quantize):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        # Full int8 kernels; inputs and outputs stay float32 so the model is a drop-in replacement
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([frame[None]] for frame in calibration_frames())
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export CREPE models to ONNX or TFLite.')
+    parser.add_argument('--capacity', choices=CREPE_CAPACITIES, nargs='+', default=['full'], help='Model capacities')
+    parser.add_argument('--format', choices=['onnx', 'tflite'], default='onnx')
+    parser.add_argument('--quantize', action='store_true', help='Quantize weights and activations to int8')
+    parser.add_argument('--output-dir', default='models')
+    args = parser.parse_args(argv)
+
+    import crepe.core
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for capacity in args.capacity:
+        model = crepe.core.build_and_load_model(capacity)
+        name = f"crepe-{capacity}{'-int8' if args.quantize else ''}.{args.format}"
+        path = os.path.join(args.output_dir, name)
+        (export_onnx if args.format == 'onnx' else export_tflite)(model, path, args.quantize)
+        print(f'{path}: {os.path.getsize(path) / 1e6:.1f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""
+Load test of the tuner's web endpoints with simulated browser clients.
+
+Starts app.py on a local port with the synthetic audio source (or targets
+a running server with --url and --pid) and runs N clients that behave
+like the browser page: each one starts estimation, polls /estimate_pitch
+every 100 ms (or listens to /stream_pitch), sometimes reloads the page
+mid-session (a second start under the same session), and then stops or
+just walks away, leaving the engine to expire its session. After a think
+time it comes back with a fresh session.
+
+Every --interval seconds the harness samples the request rate, latency
+percentiles, errors, the server's thread count, CPU and RSS (from /proc,
+including child processes such as estimation workers) and the session
+gauges from /metrics. The report is that time series plus per-endpoint
+latencies and the growth of threads and RSS over the run, so leaks and
+thread pile-ups from repeated starts stand out.
+
+Usage:
+    python tools/load_test.py --clients 50 --duration 120
+    python tools/load_test.py --clients 200 --stream-fraction 0.5 --output load.md
+    TUNER_AUDIO_SOURCE=synthetic python app.py & python tools/load_test.py --url http://127.0.0.1:5000 --pid $!
+"""
+import argparse
+import http.cookiejar
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The browser page polls at this interval when it cannot stream
+POLL_INTERVAL = 0.1
+
+# Mean seconds a client keeps tuning, and mean seconds before it comes back
+SESSION_SECONDS = 20.0
+THINK_SECONDS = 5.0
+
+# Chance that a client reloads the page mid-session, and that it closes the tab without calling stop
+RELOAD_PROBABILITY = 0.2
+ABANDON_PROBABILITY = 0.3
+
+# Requests taking longer than this count as errors
+REQUEST_TIMEOUT = 10.0
+
+# How long to wait for a spawned server to answer
+SERVER_START_TIMEOUT = 30.0
+
+# The server run by the harness: the Flask app without the debugger and reloader, which would fork a second process
+SERVER_SNIPPET = '''
+import sys
+sys.path.insert(0, {root!r})
+from app import app
+app.run(host='127.0.0.1', port={port}, debug=False, threaded=True)
+'''
+
+
+class Stats:
+    """
+    Request outcomes shared by the client threads.
+
+    Latencies accumulate per endpoint for the whole run and per sampling
+    interval, which `take_interval` hands over and resets. Opening a stream
+    counts as a request; the waits between its events are kept apart.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}  # Endpoint -> every latency of the run
+        self.errors = {}  # Endpoint -> error count of the run
+        self.interval_latencies = []
+        self.interval_errors = 0
+        self.active_clients = 0
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(latency)
+                self.interval_latencies.append(latency)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+                self.interval_errors += 1
+
+    def record_event(self, endpoint, wait):
+        """Record the wait for a streamed event; events are not requests, so they stay out of the interval figures"""
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(wait)
+
+    def take_interval(self):
+        with self.lock:
+            latencies, errors = self.interval_latencies, self.interval_errors
+            self.interval_latencies, self.interval_errors = [], 0
+            return latencies, errors
+
+
+class Client(threading.Thread):
+    """One simulated browser tab, cycling through tuning sessions until the run ends"""
+
+    def __init__(self, url, stats, stop_event, stream, estimator, seed):
+        super().__init__(daemon=True)
+        self.url = url
+        self.stats = stats
+        self.stop_event = stop_event
+        self.stream = stream
+        self.estimator = estimator
+        self.random = random.Random(seed)
+
+    def request(self, endpoint, query=''):
+        """GET an endpoint under this client's session and record the outcome; returns the response body or None"""
+        sent = time.perf_counter()
+        try:
+            with self.opener.open(f'{self.url}{endpoint}{query}', timeout=REQUEST_TIMEOUT) as response:
+                body = response.read()
+        except (urllib.error.URLError, OSError):
+            self.stats.record(endpoint, time.perf_counter() - sent, False)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - sent, True)
+        return body
+
+    def run(self):
+        # Stagger the arrivals so the clients do not start in lockstep
+        self.stop_event.wait(self.random.uniform(0, THINK_SECONDS))
+        while not self.stop_event.is_set():
+            # A fresh cookie jar is a fresh browser session
+            self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            with self.stats.lock:
+                self.stats.active_clients += 1
+            self.session()
+            with self.stats.lock:
+                self.stats.active_clients -= 1
+            self.stop_event.wait(self.random.expovariate(1 / THINK_SECONDS))
+
+    def session(self):
+        self.request('/start_estimation', f'?estimator={self.estimator}')
+        end = time.monotonic() + self.random.expovariate(1 / SESSION_SECONDS)
+        reload_at = time.monotonic() + self.random.uniform(0, end - time.monotonic()) \
+            if self.random.random() < RELOAD_PROBABILITY else None
+
+        while not self.stop_event.is_set() and time.monotonic() < end:
+            if reload_at is not None and time.monotonic() >= reload_at:
+                self.request('/start_estimation', f'?estimator={self.estimator}')
+                reload_at = None
+            if self.stream:
+                self.listen(min(end, reload_at or end))
+            else:
+                self.request('/estimate_pitch')
+                self.stop_event.wait(POLL_INTERVAL)
+
+        if self.random.random() >= ABANDON_PROBABILITY:
+            self.request('/stop_estimation')
+
+    def listen(self, until):
+        """Read Server-Sent Events until the given time; the latency recorded is the wait for each event"""
+        sent = time.perf_counter()
+        try:
+            response = self.opener.open(f'{self.url}/stream_pitch', timeout=REQUEST_TIMEOUT)
+        except (urllib.error.URLError, OSError):
+            self.stats.record('/stream_pitch', time.perf_counter() - sent, False)
+            self.stop_event.wait(POLL_INTERVAL)
+            return
+        self.stats.record('/stream_pitch', time.perf_counter() - sent, True)
+        with response:
+            waited = time.perf_counter()
+            while not self.stop_event.is_set() and time.monotonic() < until:
+                try:
+                    line = response.readline()
+                except OSError:
+                    self.stats.record('/stream_pitch events', time.perf_counter() - waited, False)
+                    return
+                if not line:
+                    return  # The server closed the stream
+                if line.startswith(b'data:'):
+                    self.stats.record_event('/stream_pitch events', time.perf_counter() - waited)
+                    waited = time.perf_counter()
+
+
+def process_tree(pid):
+    """The pid and all its descendants, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_stats(pid):
+    """Thread count, CPU seconds and RSS in MB of a process and its children, or None where /proc is unavailable"""
+    threads, cpu_seconds, rss_mb = 0, 0.0, 0.0
+    ticks = os.sysconf('SC_CLK_TCK')
+    if not os.path.exists(f'/proc/{pid}/stat'):
+        return None
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue  # A child that exited meanwhile
+        # Fields after the command name: state is 0, utime 11, stime 12, num_threads 17, rss pages 21
+        cpu_seconds += (int(fields[11]) + int(fields[12])) / ticks
+        threads += int(fields[17])
+        rss_mb += int(fields[21]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    return threads, cpu_seconds, rss_mb
+
+
+def session_gauges(url):
+    """The engine and upload session counts exported at /metrics"""
+    try:
+        with urllib.request.urlopen(f'{url}/metrics', timeout=REQUEST_TIMEOUT) as response:
+            text = response.read().decode()
+    except (urllib.error.URLError, OSError):
+        return None, None
+    gauges = dict(line.split() for line in text.splitlines() if line and not line.startswith('#') and '{' not in line)
+    return gauges.get('tuner_sessions'), gauges.get('tuner_upload_sessions')
+
+
+def start_server(port, environ):
+    """Run the app on a local port with the synthetic source and wait until it answers"""
+    env = dict(os.environ, TUNER_AUDIO_SOURCE='synthetic', **environ)
+    server = subprocess.Popen([sys.executable, '-c', SERVER_SNIPPET.format(root=ROOT, port=port)], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'The server exited with code {server.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/model_status', timeout=1).close()
+            return server
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'The server did not answer within {SERVER_START_TIMEOUT:.0f} s')
+
+
+def milliseconds(values, percentile):
+    return f'{1000 * np.percentile(values, percentile):.1f}' if len(values) else '-'
+
+
+def growth_per_minute(times, values):
+    """Slope of a sampled quantity over the second half of the run, per minute"""
+    half = len(times) // 2
+    if len(times) - half < 2:
+        return float('nan')
+    return 60 * float(np.polyfit(times[half:], values[half:], 1)[0])
+
+
+def run_load(args, url, pid):
+    """Run the clients against `url`, sampling the server process `pid` if given, and return the report lines"""
+    stats = Stats()
+    stop_event = threading.Event()
+    streaming = round(args.clients * args.stream_fraction)
+    clients = [Client(url, stats, stop_event, index < streaming, args.estimator, args.seed + index)
+               for index in range(args.clients)]
+
+    lines = [f'{args.clients} clients ({streaming} streaming), {args.estimator}, {args.duration:.0f} s against {url}', '',
+             '| t (s) | active | req/s | p50 (ms) | p95 (ms) | p99 (ms) | errors | threads | CPU (%) | RSS (MB) '
+             '| sessions | upload sessions |',
+             '|---|---|---|---|---|---|---|---|---|---|---|---|']
+    samples = []  # (t, threads, rss) for the growth estimates
+    try:
+        started = time.monotonic()
+        previous = process_stats(pid) if pid else None
+        previous_time = started
+        for client in clients:
+            client.start()
+
+        while time.monotonic() - started < args.duration:
+            time.sleep(min(args.interval, max(0.0, args.duration - (time.monotonic() - started))))
+            now = time.monotonic()
+            latencies, errors = stats.take_interval()
+            current = process_stats(pid) if pid else None
+            sessions, upload_sessions = session_gauges(url)
+
+            if current is not None and previous is not None:
+                threads, cpu_seconds, rss_mb = current
+                cpu = f'{100 * (cpu_seconds - previous[1]) / (now - previous_time):.0f}'
+                resources = f'{threads} | {cpu} | {rss_mb:.1f}'
+                samples.append((now - started, threads, rss_mb))
+            else:
+                resources = '- | - | -'
+            previous, previous_time = current, now
+
+            row = (f'| {now - started:.0f} | {stats.active_clients} | {len(latencies) / args.interval:.0f} '
+                   f'| {milliseconds(latencies, 50)} | {milliseconds(latencies, 95)} | {milliseconds(latencies, 99)} '
+                   f'| {errors} | {resources} | {sessions or "-"} | {upload_sessions or "-"} |')
+            lines.append(row)
+            print(row, file=sys.stderr)
+    finally:
+        stop_event.set()
+        for client in clients:
+            client.join(REQUEST_TIMEOUT)
+
+    lines += ['', '| endpoint | requests | errors | p50 (ms) | p95 (ms) | p99 (ms) | max (ms) |', '|---|---|---|---|---|---|---|']
+    for endpoint in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = stats.latencies.get(endpoint, [])
+        lines.append(f'| {endpoint} | {len(latencies)} | {stats.errors.get(endpoint, 0)} | {milliseconds(latencies, 50)} '
+                     f'| {milliseconds(latencies, 95)} | {milliseconds(latencies, 99)} | {milliseconds(latencies, 100)} |')
+
+    if samples:
+        times, threads, rss = (np.array(column, dtype=np.float64) for column in zip(*samples))
+        lines += ['', f'Threads {threads[0]:.0f} -> {threads[-1]:.0f} (max {threads.max():.0f}), '
+                      f'RSS {rss[0]:.1f} -> {rss[-1]:.1f} MB; growth over the second half: '
+                      f'{growth_per_minute(times, threads):+.1f} threads/min, {growth_per_minute(times, rss):+.2f} MB/min']
+
+    # Once every client has gone, the engine should release capture; leftover sessions or threads are leaks
+    if pid:
+        time.sleep(1.0)
+        sessions, upload_sessions = session_gauges(url)
+        after = process_stats(pid)
+        lines.append(f'After the clients left: {sessions or "-"} sessions, '
+                     f'{after[0] if after else "-"} threads (abandoned sessions expire after the engine timeout)')
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the tuner endpoints with simulated browser clients.')
+    parser.add_argument('--clients', type=int, default=20, help='Number of simulated browser tabs')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds to run')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between samples')
+    parser.add_argument('--stream-fraction', type=float, default=0.0,
+                        help='Share of the clients that listen to /stream_pitch instead of polling')
+    parser.add_argument('--estimator', default='yin')
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--pid', type=int, help='Process id of the server given by --url, for thread/CPU/RSS samples')
+    parser.add_argument('--port', type=int, default=5077, help='Port of the server started by the harness')
+    parser.add_argument('--worker-process', action='store_true', help='Start the server with TUNER_WORKER_PROCESS=1')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Also write the report to this Markdown file')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url, pid = args.url.rstrip('/'), args.pid
+    else:
+        server = start_server(args.port, {'TUNER_WORKER_PROCESS': '1'} if args.worker_process else {})
+        url, pid = f'http://127.0.0.1:{args.port}', server.pid
+
+    try:
+        lines = run_load(args, url, pid)
+    finally:
+        # Also on errors and Ctrl-C, so a spawned server does not keep the port
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = '\n'.join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
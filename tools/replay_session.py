@@ -0,0 +1,83 @@
+"""
+Replays session logs through the pitch pipeline and diffs the results.
+
+Each log (written by the Qt tuner with TUNER_SESSION_LOG=<directory>) is fed
+back block by block through a pipeline built from its recorded settings, as
+fast as the estimator allows. The replayed pitches are compared frame by
+frame with the logged ones; any estimator or setting can be overridden to
+measure how a change behaves on real recordings.
+
+Usage:
+    python tools/replay_session.py logs/session_20260101_120000.tlog
+    python tools/replay_session.py logs/*.tlog --estimator crepe --model-capacity tiny --show 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pitch_estimators import ESTIMATORS, CREPE_CAPACITIES
+from session_log import SessionLog, replay, compare_results, DIFF_TOLERANCE_CENTS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay session logs and diff the pitch results.')
+    parser.add_argument('logs', nargs='+', help='Session log files')
+    parser.add_argument('--estimator', choices=list(ESTIMATORS), help='Replay with another estimator')
+    parser.add_argument('--model-capacity', choices=CREPE_CAPACITIES, help='CREPE model capacity')
+    parser.add_argument('--window-size', type=int)
+    parser.add_argument('--hop-size', type=int)
+    parser.add_argument('--max-staleness', type=float, help='Estimate at onsets only (0 to estimate every window)')
+    parser.add_argument('--no-smoothing', action='store_true', help='Replay without the pitch smoother')
+    parser.add_argument('--tolerance', type=float, default=DIFF_TOLERANCE_CENTS,
+                        help='Cents a replayed pitch may differ before the frame counts as different')
+    parser.add_argument('--show', type=int, default=10, help='Number of differing frames to print per log')
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    if args.estimator:
+        overrides['estimator'] = args.estimator
+        overrides['estimator_options'] = {}
+    if args.model_capacity:
+        overrides['estimator_options'] = {'model_capacity': args.model_capacity}
+    if args.window_size:
+        overrides['window_size'] = args.window_size
+    if args.hop_size:
+        overrides['hop_size'] = args.hop_size
+    if args.max_staleness is not None:
+        overrides['max_staleness'] = args.max_staleness or None
+    if args.no_smoothing:
+        overrides['smoothing'] = False
+
+    differing_logs = 0
+    for path in args.logs:
+        log = SessionLog(path)
+        start = time.perf_counter()
+        replayed = replay(log, overrides)
+        elapsed = time.perf_counter() - start
+        diff = compare_results(log.results, replayed, args.tolerance)
+
+        speed = log.duration / elapsed if elapsed > 0 else float('inf')
+        print(f'{path}: {log.duration:.1f} s of audio replayed in {elapsed:.2f} s ({speed:.0f}x real time)')
+        print(f"  {diff['frames']} frames ({diff['voiced_frames']} voiced, {diff['unmatched_frames']} unmatched), "
+              f"{len(diff['differing_frames'])} differ: {diff['voicing_mismatches']} voicing, "
+              f"max {diff['max_cents']:.2f} c, mean {diff['mean_abs_cents']:.3f} c")
+
+        matched = np.searchsorted(replayed['time'], log.results['time'])
+        for index in diff['differing_frames'][:args.show]:
+            logged = log.results[index]
+            new = replayed[min(matched[index], len(replayed) - 1)]
+            print(f"  t={logged['time']:8.3f} s  logged {logged['frequency']:8.2f} Hz ({logged['confidence']:.2f})  "
+                  f"replayed {new['frequency']:8.2f} Hz ({new['confidence']:.2f})  target {logged['target']:.2f} Hz")
+        if len(diff['differing_frames']):
+            differing_logs += 1
+
+    return 1 if differing_logs else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Drives the /upload_audio endpoint with synthetic plucked strings.
+
+Acts like a browser client: posts raw PCM chunks under one session cookie
+and checks the returned pitch against the frequency that was played.
+
+Usage:
+    python app.py &
+    python tools/synthetic_client.py --url http://127.0.0.1:5000 --realtime
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import pluck
+
+SAMPLE_RATE = 16000
+
+# Open guitar strings, low to high
+DEFAULT_FREQUENCIES = [82.41, 110.00, 146.83, 196.00, 246.94, 329.63]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Post synthetic plucked strings to /upload_audio.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the tuner server')
+    parser.add_argument('--frequencies', type=float, nargs='+', default=DEFAULT_FREQUENCIES)
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds per plucked note')
+    parser.add_argument('--detune', type=float, default=0.0, help='Detuning of every note in cents')
+    parser.add_argument('--format', choices=['float32', 'int16'], default='float32')
+    parser.add_argument('--chunk-frames', type=int, default=2048)
+    parser.add_argument('--estimator', default='yin')
+    parser.add_argument('--realtime', action='store_true', help='Pace uploads at the audio rate')
+    args = parser.parse_args()
+
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    query = f'format={args.format}&sample_rate={SAMPLE_RATE}&estimator={args.estimator}'
+
+    for frequency in args.frequencies:
+        audio = pluck(frequency, args.duration, SAMPLE_RATE, detune_cents=args.detune, noise_db=-70)
+        if args.format == 'int16':
+            audio = (audio * 32767).astype('<i2')
+
+        estimates = []
+        latencies = []
+        for start in range(0, len(audio), args.chunk_frames):
+            chunk = audio[start:start + args.chunk_frames]
+            request = urllib.request.Request(f'{args.url}/upload_audio?{query}', data=chunk.tobytes(), method='POST',
+                                             headers={'Content-Type': 'application/octet-stream'})
+            sent = time.perf_counter()
+            with opener.open(request) as response:
+                data = json.load(response)
+            latencies.append(time.perf_counter() - sent)
+            estimates.extend(result['estimated_pitch'] for result in data['results'] if result['estimated_pitch'] > 0)
+
+            if args.realtime:
+                time.sleep(max(0.0, len(chunk) / SAMPLE_RATE - latencies[-1]))
+
+        expected = frequency * 2 ** (args.detune / 1200)
+        median = float(np.median(estimates)) if estimates else 0.0
+        error = 1200 * np.log2(median / expected) if median > 0 else float('nan')
+        print(f'{expected:8.2f} Hz -> median {median:8.2f} Hz ({error:+6.2f} cents), '
+              f'{len(estimates)} estimates, p50 latency {1000 * np.median(latencies):.1f} ms')
+
+    opener.open(urllib.request.Request(f'{args.url}/stop_upload', data=b'', method='POST')).close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import bisect
+import math
+import re
+
+# Reference pitch of A4 in Hz, and its MIDI note number
+A4_FREQUENCY = 440.0
+A4_MIDI = 69
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+FLAT_NAMES = {'Db': 'C#', 'Eb': 'D#', 'Gb': 'F#', 'Ab': 'G#', 'Bb': 'A#'}
+
+# A note within this many cents of its target counts as in tune
+IN_TUNE_CENTS = 5.0
+
+NOTE_PATTERN = re.compile(r'^([A-G][#b]?)(-?\d+)$')
+
+
+class GuitarString:
+    """
+    Represents a guitar string with a name and frequency.
+
+    Attributes:
+        name (str): The name of the guitar string (e.g., 'E', 'A', 'D', 'G', 'B', 'E').
+        frequency (float): The frequency of the guitar string in Hz.
+        note (str): The note with its octave (e.g., 'E2'), if known.
+    """
+
+    def __init__(self, name, frequency, note=None):
+        self.name = name
+        self.frequency = frequency
+        self.note = note
+
+
+def cents_between(frequency, reference):
+    """Return the interval from `reference` to `frequency` in cents"""
+    return 1200 * math.log2(frequency / reference)
+
+
+def note_to_midi(note):
+    """Convert a note name with octave (e.g. 'E2', 'F#3', 'Bb3') to its MIDI number"""
+    match = NOTE_PATTERN.match(note)
+    if match is None:
+        raise ValueError(f"Invalid note name '{note}'")
+    name, octave = match.groups()
+    name = FLAT_NAMES.get(name, name)
+    if name not in NOTE_NAMES:
+        raise ValueError(f"Invalid note name '{note}'")
+    return NOTE_NAMES.index(name) + 12 * (int(octave) + 1)
+
+
+class NoteTable:
+    """
+    Precomputed equal-temperament note frequencies for one reference pitch.
+
+    The geometric midpoints between neighbouring notes are kept sorted, so the
+    nearest note of any frequency is found with a binary search instead of a
+    logarithm and rounding per lookup.
+
+    Attributes:
+        reference (float): The frequency of A4 in Hz.
+        frequencies (list): The frequency of every MIDI note 0-127 in Hz.
+        names (list): The name with octave of every MIDI note (e.g. 'A4').
+    """
+
+    def __init__(self, reference=A4_FREQUENCY):
+        self.reference = reference
+        self.frequencies = [reference * 2 ** ((midi - A4_MIDI) / 12) for midi in range(128)]
+        self.names = [f'{NOTE_NAMES[midi % 12]}{midi // 12 - 1}' for midi in range(128)]
+        self.boundaries = [reference * 2 ** ((midi + 0.5 - A4_MIDI) / 12) for midi in range(127)]
+
+    def frequency(self, note):
+        """Return the frequency of a note name with octave (e.g. 'E2')"""
+        return self.frequencies[note_to_midi(note)]
+
+    def nearest(self, frequency):
+        """
+        Find the nearest note to a frequency.
+
+        Returns:
+            tuple: (MIDI number, note name, offset from the note in cents)
+        """
+        midi = bisect.bisect_left(self.boundaries, frequency)
+        return midi, self.names[midi], cents_between(frequency, self.frequencies[midi])
+
+
+# Alternate tunings per instrument, as notes in string order; the first tuning is the default.
+# The banjo lists its short fifth (drone) string first, as banjo players number it.
+TUNINGS = {
+    'Guitar': {
+        'Standard': ['E2', 'A2', 'D3', 'G3', 'B3', 'E4'],
+        'Drop D': ['D2', 'A2', 'D3', 'G3', 'B3', 'E4'],
+        'Half Step Down': ['Eb2', 'Ab2', 'Db3', 'Gb3', 'Bb3', 'Eb4'],
+        'DADGAD': ['D2', 'A2', 'D3', 'G3', 'A3', 'D4'],
+        'Open G': ['D2', 'G2', 'D3', 'G3', 'B3', 'D4'],
+        'Open D': ['D2', 'A2', 'D3', 'F#3', 'A3', 'D4'],
+    },
+    'Banjo': {
+        'Open G': ['G4', 'D3', 'G3', 'B3', 'D4'],
+        'Double C': ['G4', 'C3', 'G3', 'C4', 'D4'],
+        'Open D': ['F#4', 'D3', 'F#3', 'A3', 'D4'],
+    },
+    'Ukulele': {
+        'Standard': ['G4', 'C4', 'E4', 'A4'],
+        'Low G': ['G3', 'C4', 'E4', 'A4'],
+        'Baritone': ['D3', 'G3', 'B3', 'E4'],
+    },
+    'Violin': {
+        'Standard': ['G3', 'D4', 'A4', 'E5'],
+    },
+}
+
+# Note tables are cached per reference pitch
+note_tables = {}
+
+
+def note_table(reference=A4_FREQUENCY):
+    """Return the (cached) NoteTable for a reference pitch"""
+    table = note_tables.get(reference)
+    if table is None:
+        table = note_tables[reference] = NoteTable(reference)
+    return table
+
+
+def nearest_note(frequency, reference=A4_FREQUENCY):
+    """Return the nearest equal-tempered note name and the offset from it in cents ('' and 0 for no pitch)"""
+    if frequency <= 0:
+        return '', 0.0
+    midi, name, cents = note_table(reference).nearest(frequency)
+    return name, cents
+
+
+class Tuning:
+    """
+    The target strings of an instrument in one tuning.
+
+    Attributes:
+        instrument (str): The instrument name, a key of TUNINGS.
+        name (str): The tuning name (e.g. 'Drop D').
+        reference (float): The frequency of A4 in Hz.
+        strings (list): The GuitarString targets in string order.
+    """
+
+    def __init__(self, instrument, name=None, reference=A4_FREQUENCY):
+        tunings = TUNINGS[instrument]
+        self.instrument = instrument
+        self.name = name or next(iter(tunings))
+        self.reference = reference
+        table = note_table(reference)
+        self.strings = [GuitarString(NOTE_PATTERN.match(note).group(1), table.frequency(note), note)
+                        for note in tunings[self.name]]
+
+        # Sorted frequencies and the midpoints between them (in cents) for the closest-string search
+        self.by_frequency = sorted(self.strings, key=lambda string: string.frequency)
+        self.boundaries = [math.sqrt(low.frequency * high.frequency)
+                           for low, high in zip(self.by_frequency, self.by_frequency[1:])]
+
+    def closest_string(self, frequency):
+        """Return the string closest to a frequency in cents"""
+        return self.by_frequency[bisect.bisect_left(self.boundaries, frequency)]
+
+
+def tuning_strings(instrument, tuning=None, reference=A4_FREQUENCY):
+    """Return the strings of an instrument in a tuning (the default tuning if None)"""
+    return Tuning(instrument, tuning, reference).strings
+
+
+guitar_strings = tuning_strings('Guitar')
+banjo_strings = tuning_strings('Banjo')
+ukulele_strings = tuning_strings('Ukulele')
+violin_strings = tuning_strings('Violin')
+
+# Instrument tunings by name, as listed in the instrument dropdown
+INSTRUMENTS = {
+    'Guitar': guitar_strings,
+    'Banjo': banjo_strings,
+    'Ukulele': ukulele_strings,
+    'Violin': violin_strings,
+}
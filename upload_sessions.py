@@ -0,0 +1,72 @@
+import threading
+import time
+
+# Upload pipelines that have not received audio for this many seconds are discarded
+UPLOAD_SESSION_TIMEOUT = 120
+
+
+class UploadSession:
+    """
+    The analysis state for one client that uploads its own audio.
+
+    Attributes:
+        pipeline (PitchPipeline): The client's pipeline, with its own ring buffer and estimator.
+        lock (threading.Lock): Serializes chunks from the same client.
+        last_seen (float): Monotonic time of the last upload.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+
+class UploadSessionStore:
+    """
+    Per-session pipelines for browser-captured audio, created on first use
+    and expired when the client goes quiet.
+    """
+
+    def __init__(self, timeout=UPLOAD_SESSION_TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.last_sweep = time.monotonic()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, session_id, create_pipeline):
+        """
+        Return the session for `session_id`, building its pipeline with
+        `create_pipeline()` if needed.
+
+        The pipeline is built outside the store lock, since loading a model
+        can take seconds and must not stall the other clients' uploads. If
+        two first chunks of one client race, the pipeline stored first wins.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_sweep > self.timeout / 4:
+                self._sweep(now)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_seen = now
+                return session
+
+        created = UploadSession(create_pipeline())
+        with self.lock:
+            session = self.sessions.setdefault(session_id, created)
+            session.last_seen = time.monotonic()
+            return session
+
+    def discard(self, session_id):
+        """Forget a session and its pipeline"""
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def _sweep(self, now):
+        self.last_sweep = now
+        for session_id, session in list(self.sessions.items()):
+            if now - session.last_seen > self.timeout:
+                del self.sessions[session_id]
@@ -0,0 +1,178 @@
+import struct
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavReader:
+    """
+    A streaming reader for PCM (8/16/24/32-bit) and float32 WAV files.
+
+    Unlike the `wave` module it also understands IEEE float and extensible
+    WAV files. Samples are returned as float32 in the range [-1, 1].
+
+    Attributes:
+        sample_rate (int): The sample rate of the file in Hz.
+        channels (int): The number of interleaved channels.
+        frames (int): The total number of frames in the file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self._read_header()
+        except Exception:
+            self.file.close()
+            raise
+        self.position = 0
+
+    def _read_header(self):
+        riff, size, wave_id = struct.unpack('<4sI4s', self.file.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError('Not a RIFF/WAVE file')
+
+        fmt = None
+        while True:
+            header = self.file.read(8)
+            if len(header) < 8:
+                raise ValueError('WAV file has no data chunk')
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = self.file.read(chunk_size)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError('WAV data chunk precedes the fmt chunk')
+                self.data_size = chunk_size
+                break
+            else:
+                self.file.seek(chunk_size, 1)
+            if chunk_size % 2:
+                self.file.seek(1, 1)  # Chunks are padded to an even size
+
+        format_tag, self.channels, self.sample_rate, byte_rate, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            format_tag = struct.unpack('<H', fmt[24:26])[0]  # First two bytes of the sub-format GUID
+
+        if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+            self.dtype, self.scale = np.dtype('<f4'), 1.0
+        elif format_tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+            self.dtype = {8: np.dtype('u1'), 16: np.dtype('<i2'), 24: np.dtype('u1'), 32: np.dtype('<i4')}[bits]
+            self.scale = 1.0 / (1 << (bits - 1))
+        else:
+            raise ValueError(f'Unsupported WAV format {format_tag} with {bits} bits per sample')
+
+        self.bits = bits
+        self.block_align = block_align
+        self.frames = self.data_size // block_align
+
+    def read(self, frames):
+        """Read up to `frames` frames as a float32 array of shape (frames, channels)"""
+        frames = min(frames, self.frames - self.position)
+        data = self.file.read(frames * self.block_align)
+        frames = len(data) // self.block_align
+        self.position += frames
+
+        if self.bits == 24:
+            # Assemble little-endian 24-bit integers from their three bytes
+            raw = np.frombuffer(data, dtype=np.uint8, count=frames * self.block_align).reshape(-1, 3)
+            samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+            samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+        else:
+            samples = np.frombuffer(data, dtype=self.dtype, count=frames * self.channels)
+            if self.bits == 8:
+                samples = samples.astype(np.int16) - 128  # 8-bit WAV samples are unsigned
+
+        audio = samples.astype(np.float32)
+        if self.scale != 1.0:
+            audio *= self.scale
+        return audio.reshape(frames, self.channels)
+
+    def blocks(self, block_size):
+        """Yield consecutive blocks of up to `block_size` frames until the end of the file"""
+        while self.position < self.frames:
+            block = self.read(block_size)
+            if not len(block):
+                break
+            yield block
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class WavWriter:
+    """
+    A streaming WAV writer.
+
+    Blocks are written straight to disk as they arrive and the header sizes
+    are patched when the file is closed, so memory use does not grow with
+    the length of the recording. Samples are stored as 32-bit float, or as
+    16-bit PCM with clipping and conversion.
+
+    Attributes:
+        sample_rate (int): The sample rate of the file in Hz.
+        channels (int): The number of interleaved channels.
+        sample_format (str): 'float32' or 'int16'.
+        frames (int): The number of frames written so far.
+    """
+
+    def __init__(self, path, sample_rate, channels=1, sample_format='float32'):
+        if sample_format not in ('float32', 'int16'):
+            raise ValueError(f"Unsupported sample format '{sample_format}'")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frames = 0
+        self.file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        """Write (or rewrite) the RIFF header for the frames written so far"""
+        is_float = self.sample_format == 'float32'
+        sample_width = 4 if is_float else 2
+        block_align = self.channels * sample_width
+        data_size = self.frames * block_align
+
+        if is_float:
+            # Non-PCM formats carry an extension size field and a fact chunk with the frame count
+            fmt = struct.pack('<HHIIHHH', WAVE_FORMAT_IEEE_FLOAT, self.channels, self.sample_rate,
+                              self.sample_rate * block_align, block_align, 32, 0)
+            extra = b'fact' + struct.pack('<II', 4, self.frames)
+        else:
+            fmt = struct.pack('<HHIIHH', WAVE_FORMAT_PCM, self.channels, self.sample_rate,
+                              self.sample_rate * block_align, block_align, 16)
+            extra = b''
+
+        header = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + extra + b'data' + struct.pack('<I', data_size)
+        self.file.seek(0)
+        self.file.write(b'RIFF' + struct.pack('<I', len(header) + data_size) + header)
+        self.file.seek(0, 2)
+
+    def write(self, audio):
+        """Append float32 samples, either 1-D (mono) or shaped (frames, channels)"""
+        audio = np.asarray(audio, dtype=np.float32)
+        if self.sample_format == 'int16':
+            audio = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+        self.file.write(audio.tobytes())
+        self.frames += len(audio) if audio.ndim > 1 else len(audio) // self.channels
+
+    def close(self):
+        """Patch the header with the final sizes and close the file"""
+        if self.file.closed:
+            return
+        self._write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()